@@ -1,432 +1,2775 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait
+from requests.adapters import HTTPAdapter
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby, islice, repeat
+from operator import itemgetter, mul, sub, truediv
+from urllib.parse import urlparse
 import requests
+import base64
+import contextvars
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import math
+import queue
+import random
+import re
+import sqlite3
+import sys
+import threading
 import time
 import os 
 
 app = Flask(__name__)
 CORS(app)
 
-ETHERSCAN_API = "https://api.etherscan.io/v2/api"
-COINGECKO_API = "https://api.coingecko.com/api/v3"
+# App log (LOG_LEVEL=DEBUG adds a line per upstream call and price lookup); library loggers
+# such as httpx's per-request INFO lines are left at the root logger's defaults
+log = logging.getLogger('verifil')
+if not log.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    log.addHandler(_log_handler)
+    log.propagate = False
+log.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+# Upstream base URLs; overridable so the offline benchmark can point them at its stand-in server
+ETHERSCAN_API = os.environ.get('ETHERSCAN_API_URL', "https://api.etherscan.io/v2/api")
+COINGECKO_API = os.environ.get('COINGECKO_API_URL', "https://api.coingecko.com/api/v3")
+HONEYPOT_API = os.environ.get('HONEYPOT_API_URL', "https://api.honeypot.is/v2/IsHoneypot")
+ONEINCH_API = os.environ.get('ONEINCH_API_URL', "https://api.1inch.dev/price/v1.1")  # + /<chain id>/<contract>
+
+def upstream_host(url):
+    """Key for per-upstream timeouts, rate limits and stats: host, plus port when one is given"""
+    return urlparse(url).netloc
+
+ETHERSCAN_HOST = upstream_host(ETHERSCAN_API)
+COINGECKO_HOST = upstream_host(COINGECKO_API)
+HONEYPOT_HOST = upstream_host(HONEYPOT_API)
+ONEINCH_HOST = upstream_host(ONEINCH_API)
 
 ETHERSCAN_API_KEY = os.environ.get('ETHERSCAN_API_KEY', '')
 
-def get_eth_balance(address):
-    """Get ETH balance for a wallet address"""
-    try:
-        params = {
-            'chainid': '1',
-            'module': 'account',
-            'action': 'balance',
-            'address': address,
-            'tag': 'latest',
-            'apikey': ETHERSCAN_API_KEY
-        }
-        response = requests.get(ETHERSCAN_API, params=params)
-        data = response.json()
-        
-        if data['status'] == '1':
-            balance_wei = int(data['result'])
-            balance_eth = balance_wei / 10**18
-            return balance_eth
+# Chains served through the one Etherscan V2 endpoint, selected by chainid. Each names its
+# CoinGecko asset platform, its native coin's CoinGecko id and the wrapped native token 1inch
+# prices when CoinGecko can't. Ethereum keeps the unprefixed routes and storage keys.
+DEFAULT_CHAIN = 'ethereum'
+CHAINS = {
+    'ethereum': {'chain_id': 1, 'name': 'Ethereum', 'platform': 'ethereum', 'native_symbol': 'ETH',
+                 'native_coin': 'ethereum', 'wrapped_native': '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2'},
+    'base': {'chain_id': 8453, 'name': 'Base', 'platform': 'base', 'native_symbol': 'ETH',
+             'native_coin': 'ethereum', 'wrapped_native': '0x4200000000000000000000000000000000000006'},
+    'arbitrum': {'chain_id': 42161, 'name': 'Arbitrum One', 'platform': 'arbitrum-one', 'native_symbol': 'ETH',
+                 'native_coin': 'ethereum', 'wrapped_native': '0x82af49447d8a07e3bd95bd0d56f35241523fbab1'},
+    'optimism': {'chain_id': 10, 'name': 'OP Mainnet', 'platform': 'optimistic-ethereum', 'native_symbol': 'ETH',
+                 'native_coin': 'ethereum', 'wrapped_native': '0x4200000000000000000000000000000000000006'},
+    'polygon': {'chain_id': 137, 'name': 'Polygon', 'platform': 'polygon-pos', 'native_symbol': 'POL',
+                'native_coin': 'polygon-ecosystem-token', 'wrapped_native': '0x0d500b1d8e8ef31e21c99d1db9a6444d3adf1270'},
+    'bsc': {'chain_id': 56, 'name': 'BNB Smart Chain', 'platform': 'binance-smart-chain', 'native_symbol': 'BNB',
+            'native_coin': 'binancecoin', 'wrapped_native': '0xbb4cdb9cbd36b01bd1cbb33eba14c9bac6ddf10f'},
+}
+CHAIN_CONVERTER = f"any({', '.join(CHAINS)})"  # URL converter matching a supported chain name
+
+def chain_key(key, chain):
+    """Per-chain namespace for a stored wallet address or contract; Ethereum keys stay bare"""
+    return key if chain == DEFAULT_CHAIN else f"{chain}:{key}"
+
+# Shared upstream HTTP client: one keep-alive session with a connection pool per host,
+# sized so every gunicorn worker thread can hold a connection to each upstream at once
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 32))
+UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 2))
+UPSTREAM_BACKOFF_BASE = 0.25  # Seconds, doubled on every retry (full jitter)
+UPSTREAM_BACKOFF_MAX = 4
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# (connect, read) timeouts in seconds per upstream host
+UPSTREAM_TIMEOUTS = {
+    ETHERSCAN_HOST: (3.05, 10),
+    COINGECKO_HOST: (3.05, 5),
+    ONEINCH_HOST: (3.05, 3),
+    HONEYPOT_HOST: (3.05, 5),
+}
+DEFAULT_UPSTREAM_TIMEOUT = (3.05, 10)
+
+upstream_session = requests.Session()
+upstream_adapter = HTTPAdapter(
+    pool_connections=len(UPSTREAM_TIMEOUTS) + 4,
+    pool_maxsize=UPSTREAM_POOL_SIZE
+)
+upstream_session.mount('https://', upstream_adapter)
+upstream_session.mount('http://', upstream_adapter)
+
+upstream_stats_lock = threading.Lock()
+upstream_stats = {}  # host -> {'requests', 'retries', 'errors'}
+
+def _record_upstream(host, field, amount=1):
+    with upstream_stats_lock:
+        host_stats = upstream_stats.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0})
+        host_stats[field] = host_stats.get(field, 0) + amount
+
+# Tracing and metrics: every upstream attempt becomes a span (host, action, status, latency,
+# bytes) in the current request's trace, and requests, upstream calls and rate-limit waits
+# feed Prometheus-style histograms served at /api/metrics. With SERVER_TIMING=1 each
+# response gets a Server-Timing header splitting its time between upstreams and our CPU.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '') == '1'
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+UPSTREAM_NAMES = {
+    ETHERSCAN_HOST: 'etherscan',
+    COINGECKO_HOST: 'coingecko',
+    HONEYPOT_HOST: 'honeypot',
+    ONEINCH_HOST: '1inch',
+}
+ADDRESS_PATTERN = re.compile(r'0x[0-9a-fA-F]{40}')
+
+class Histogram:
+    """Latency histogram over METRIC_BUCKETS (per-bucket counts; the last slot is +Inf)"""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(METRIC_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(METRIC_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+metrics_lock = threading.Lock()
+request_metrics = {}  # (method, endpoint, status) -> Histogram
+upstream_metrics = {}  # (host, action, status) -> Histogram
+rate_limit_wait_metrics = {}  # host -> Histogram of seconds waited per upstream call
+upstream_bytes = {}  # host -> response bytes received
+
+def observe(metric, labels, value):
+    with metrics_lock:
+        histogram = metric.get(labels)
+        if histogram is None:
+            histogram = metric[labels] = Histogram()
+        histogram.observe(value)
+
+def covered_seconds(intervals):
+    """Length of the union of (start, stop) intervals"""
+    covered, end = 0, None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            covered += stop - start
+            end = stop
+        elif stop > end:
+            covered += stop - end
+            end = stop
+    return covered
+
+class Trace:
+    """Spans collected while serving one request (shared with the tasks it fans out)"""
+    __slots__ = ('started', 'cpu_started', 'spans')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        self.spans = []
+
+    def server_timing(self, total, cpu=None):
+        """Server-Timing value: per-upstream time in flight and time spent waiting on rate
+        limits (overlapping intervals counted once), request-thread CPU and the total, in ms"""
+        intervals = {}
+        waits = []
+        for span in list(self.spans):
+            intervals.setdefault(span['host'], []).append((span['start'], span['start'] + span['duration']))
+            if span['rate_limit_wait']:
+                waits.append((span['start'] - span['rate_limit_wait'], span['start']))
+
+        entries = []
+        for host, spans in intervals.items():
+            name = UPSTREAM_NAMES.get(host) or re.sub(r'[^A-Za-z0-9]', '-', host)
+            entries.append(f'{name};dur={covered_seconds(spans) * 1000:.1f};desc="{len(spans)} calls"')
+        if waits:
+            entries.append(f'ratelimit;dur={covered_seconds(waits) * 1000:.1f}')
+        if cpu is not None:
+            entries.append(f'cpu;dur={cpu * 1000:.1f}')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+def upstream_action(url, params):
+    """Low-cardinality label for an upstream call: the Etherscan action or the URL path
+    with addresses masked"""
+    if params and params.get('action'):
+        return params['action']
+    return ADDRESS_PATTERN.sub(':address', urlparse(url).path)
+
+def record_span(host, action, status, started, duration, nbytes=0, rate_limit_wait=0, coalesced=False):
+    """Add an upstream span to the current trace; calls actually sent also feed the metrics.
+    A coalesced span is a caller waiting on an identical call already in flight"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.spans.append({'host': host, 'action': action, 'status': status, 'start': started,
+                            'duration': duration, 'bytes': nbytes, 'rate_limit_wait': rate_limit_wait,
+                            'coalesced': coalesced})
+    if not coalesced:
+        observe(upstream_metrics, (host, action, status), duration)
+        with metrics_lock:
+            upstream_bytes[host] = upstream_bytes.get(host, 0) + nbytes
+    log.debug("upstream host=%s action=%s status=%s duration_ms=%.1f bytes=%d wait_ms=%.1f coalesced=%s",
+              host, action, status, duration * 1000, nbytes, rate_limit_wait * 1000, coalesced)
+
+def record_rate_limit_wait(host, waited):
+    if host not in UPSTREAM_RATE_LIMITS:
+        return
+    observe(rate_limit_wait_metrics, host, waited)
+    if waited:
+        _record_upstream(host, 'rate_limit_wait_seconds', round(waited, 3))
+
+@app.before_request
+def start_trace():
+    current_trace.set(Trace())
+
+@app.after_request
+def finish_trace(response):
+    """Record the request in the endpoint histogram (streams: time until headers are sent)"""
+    trace = current_trace.get()
+    if trace is None:
+        return response
+    total = time.perf_counter() - trace.started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    observe(request_metrics, (request.method, endpoint, str(response.status_code)), total)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = trace.server_timing(total, time.thread_time() - trace.cpu_started)
+    return response
+
+def metric_labels(names, values):
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+def histogram_lines(name, help_text, metric, label_names):
+    with metrics_lock:
+        samples = sorted((labels if isinstance(labels, tuple) else (labels,), list(h.counts), h.total, h.count)
+                         for labels, h in metric.items())
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, counts, total, count in samples:
+        base = metric_labels(label_names, labels)
+        cumulative = 0
+        for bound, bucket_count in zip(METRIC_BUCKETS + ('+Inf',), counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{base}}} {total:.6f}')
+        lines.append(f'{name}_count{{{base}}} {count}')
+    return lines
+
+def sample_lines(name, kind, help_text, samples):
+    """samples: [(label names, label values, value)]"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for label_names, values, value in samples:
+        labels = metric_labels(label_names, values)
+        lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+    return lines
+
+CACHE_EVENTS = ('hits', 'negative_hits', 'misses', 'expired', 'evictions', 'not_modified', 'uncacheable')
+
+def render_metrics():
+    """Prometheus text exposition of this process's request, upstream, rate-limit and cache metrics"""
+    lines = histogram_lines('verifil_request_duration_seconds', 'Time to serve a request by route and status.',
+                            request_metrics, ('method', 'endpoint', 'status'))
+    lines += histogram_lines('verifil_upstream_duration_seconds', 'Latency of each upstream attempt (status 429 includes Etherscan rate-limit errors).',
+                             upstream_metrics, ('host', 'action', 'status'))
+    lines += histogram_lines('verifil_rate_limit_wait_seconds', 'Time an upstream call waited on the rate-limit governor.',
+                             rate_limit_wait_metrics, ('host',))
+
+    upstream = get_upstream_stats()
+    with metrics_lock:
+        received = dict(upstream_bytes)
+    lines += sample_lines('verifil_upstream_response_bytes_total', 'counter', 'Upstream response body bytes received.',
+                          [(('host',), (host,), count) for host, count in sorted(received.items())])
+    fields = sorted({field for counts in upstream.values() for field in counts})
+    for field in fields:
+        kind = 'gauge' if field.endswith('ratio') else 'counter'
+        name = f'verifil_upstream_{field}' if kind == 'gauge' else f'verifil_upstream_{field}_total'
+        lines += sample_lines(name, kind, f'Upstream {field.replace("_", " ")} per host.',
+                              [(('host',), (host,), counts[field]) for host, counts in sorted(upstream.items()) if field in counts])
+
+    caches = {
+        'price': get_price_cache_stats(),
+        'token_facts': get_token_fact_stats(),
+        'responses': get_response_cache_stats(),
+        'snapshots': get_snapshot_stats(),
+    }
+    events, entries, ratios = [], [], []
+    for cache, stats in caches.items():
+        events += [(('cache', 'event'), (cache, event), stats[event]) for event in CACHE_EVENTS if event in stats]
+        if 'entries' in stats:
+            entries.append((('cache',), (cache,), stats['entries']))
+        hits = stats.get('hits', 0) + stats.get('negative_hits', 0)
+        lookups = hits + stats.get('misses', 0)
+        ratios.append((('cache',), (cache,), round(hits / lookups, 4) if lookups else 0))
+    lines += sample_lines('verifil_cache_events_total', 'counter', 'Cache lookups and evictions by outcome.', events)
+    lines += sample_lines('verifil_cache_entries', 'gauge', 'Entries currently held per cache.', entries)
+    lines += sample_lines('verifil_cache_hit_ratio', 'gauge', 'Hits (including negative hits) over lookups since start.', ratios)
+
+    circuits = get_circuit_stats()
+    lines += sample_lines('verifil_circuit_state', 'gauge', 'Price provider circuit: 0 closed, 1 half-open, 2 open.',
+                          [(('provider',), (name,), CIRCUIT_STATES.index(c['state'])) for name, c in circuits.items()])
+    lines += sample_lines('verifil_circuit_rejected_total', 'counter', 'Calls rejected by an open circuit.',
+                          [(('provider',), (name,), c['rejected']) for name, c in circuits.items()])
+    lines += sample_lines('verifil_circuit_opened_total', 'counter', 'Times a price provider circuit opened.',
+                          [(('provider',), (name,), c['opened']) for name, c in circuits.items()])
+
+    refresh = get_price_refresh_stats()
+    lines += sample_lines('verifil_stale_prices_served_total', 'counter', 'Expired prices served while being revalidated.',
+                          [((), (), refresh['stale_served'])])
+    return '\n'.join(lines) + '\n'
+
+# Rate-limit governor: a token bucket per upstream host and API key.
+# Limits are (requests per second, burst size) and apply to each API key separately.
+UPSTREAM_RATE_LIMITS = {
+    ETHERSCAN_HOST: (float(os.environ.get('ETHERSCAN_RATE_PER_SEC', 5)), 5),
+    COINGECKO_HOST: (float(os.environ.get('COINGECKO_RATE_PER_MIN', 30)) / 60, 5),
+    HONEYPOT_HOST: (float(os.environ.get('HONEYPOT_RATE_PER_SEC', 5)), 5),
+}
+RATE_LIMIT_PENALTY_SECONDS = 1  # Pause after a 429 without Retry-After
+
+# With RATE_LIMIT_SHARED=1 buckets live in the SQLite store, so every gunicorn worker
+# process draws from the same budget instead of each getting the full rate
+RATE_LIMIT_SHARED = os.environ.get('RATE_LIMIT_SHARED', '') == '1'
+
+# Background work (the snapshot worker) runs at 'background' priority: it only spends a
+# token while the bucket holds more than BACKGROUND_RATE_RESERVE of its burst, so live
+# requests always find budget left. Executors copy the priority into the tasks they run.
+BACKGROUND_RATE_RESERVE = 0.5
+upstream_priority = contextvars.ContextVar('upstream_priority', default='live')
+
+rate_limit_lock = threading.Lock()
+rate_limit_buckets = {}  # bucket name -> {'tokens', 'updated', 'blocked_until'}
+
+def rate_limit_bucket(host, api_key=''):
+    """Bucket name for a host and API key (the key itself is never stored)"""
+    if not api_key:
+        return host
+    return f"{host}:{hashlib.sha256(api_key.encode()).hexdigest()[:12]}"
+
+def _refill(bucket, now, rate, burst):
+    bucket['tokens'] = min(burst, bucket['tokens'] + max(0, now - bucket['updated']) * rate)
+    bucket['updated'] = now
+
+def _take_token(bucket, now, rate, reserve=0):
+    """Spend a token if one is available above `reserve`; returns 0 or the seconds to wait before retrying"""
+    if bucket['blocked_until'] > now:
+        return bucket['blocked_until'] - now
+    if bucket['tokens'] >= 1 + reserve:
+        bucket['tokens'] -= 1
         return 0
-    except Exception as e:
-        print(f"Error fetching ETH balance: {e}")
+    return (1 + reserve - bucket['tokens']) / rate
+
+def _take_token_local(name, rate, burst, reserve):
+    with rate_limit_lock:
+        now = time.time()
+        bucket = rate_limit_buckets.setdefault(name, {'tokens': burst, 'updated': now, 'blocked_until': 0})
+        _refill(bucket, now, rate, burst)
+        return _take_token(bucket, now, rate, reserve)
+
+def _take_token_shared(name, rate, burst, reserve):
+    conn = get_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        now = time.time()
+        row = conn.execute('SELECT tokens, updated, blocked_until FROM rate_limits WHERE bucket = ?', (name,)).fetchone()
+        bucket = {'tokens': row[0], 'updated': row[1], 'blocked_until': row[2]} if row else \
+            {'tokens': burst, 'updated': now, 'blocked_until': 0}
+        _refill(bucket, now, rate, burst)
+        delay = _take_token(bucket, now, rate, reserve)
+        conn.execute('INSERT OR REPLACE INTO rate_limits (bucket, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)',
+                     (name, bucket['tokens'], bucket['updated'], bucket['blocked_until']))
+        conn.execute('COMMIT')
+        return delay
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+def take_rate_limit_token(host, api_key=''):
+    """Try to spend a request from the host/key bucket; returns 0 or seconds to wait first"""
+    if host not in UPSTREAM_RATE_LIMITS:
         return 0
+    rate, burst = UPSTREAM_RATE_LIMITS[host]
+    name = rate_limit_bucket(host, api_key)
+    reserve = burst * BACKGROUND_RATE_RESERVE if upstream_priority.get() == 'background' else 0
+    
+    if RATE_LIMIT_SHARED:
+        try:
+            return _take_token_shared(name, rate, burst, reserve)
+        except Exception as e:
+            log.warning("Shared rate limiter unavailable, using local bucket: %s", e)
+    return _take_token_local(name, rate, burst, reserve)
 
-def get_token_balances(address):
-    """Get ERC-20 token balances for a wallet address"""
+def wait_for_rate_limit(host, api_key=''):
+    """Block until the host/key bucket allows another request; returns seconds waited"""
+    waited = 0
+    while True:
+        delay = take_rate_limit_token(host, api_key)
+        if not delay:
+            break
+        time.sleep(delay)
+        waited += delay
+    
+    record_rate_limit_wait(host, waited)
+    return waited
+
+def penalize_rate_limit(host, api_key='', seconds=RATE_LIMIT_PENALTY_SECONDS):
+    """Feed an upstream 429 back into the bucket: drain it and pause it for a while"""
+    if host not in UPSTREAM_RATE_LIMITS:
+        return
+    _record_upstream(host, 'rate_limited')
+    name = rate_limit_bucket(host, api_key)
+    blocked_until = time.time() + seconds
+    
+    if RATE_LIMIT_SHARED:
+        try:
+            conn = get_db()
+            conn.execute('INSERT OR REPLACE INTO rate_limits (bucket, tokens, updated, blocked_until) VALUES (?, 0, ?, ?)',
+                         (name, time.time(), blocked_until))
+            return
+        except Exception as e:
+            log.warning("Shared rate limiter unavailable, using local bucket: %s", e)
+    with rate_limit_lock:
+        rate_limit_buckets[name] = {'tokens': 0, 'updated': time.time(), 'blocked_until': blocked_until}
+
+def is_rate_limited_response(host, response):
+    """429, or Etherscan's rate-limit error which arrives with a 200 status"""
+    if response.status_code == 429:
+        return True
+    return host == ETHERSCAN_HOST and b'rate limit reached' in response.content
+
+def should_retry_response(host, api_key, response):
+    """Feed rate-limit signals back into the governor; True when the response is worth retrying"""
+    if is_rate_limited_response(host, response):
+        retry_after = response.headers.get('Retry-After', '')
+        penalize_rate_limit(host, api_key, int(retry_after) if retry_after.isdigit() else RATE_LIMIT_PENALTY_SECONDS)
+        return True
+    return response.status_code in RETRY_STATUS_CODES
+
+def _backoff_delay(attempt, response=None):
+    """Jittered exponential backoff, honoring Retry-After when the upstream sends one"""
+    if response is not None and response.headers.get('Retry-After', '').isdigit():
+        return min(int(response.headers['Retry-After']), UPSTREAM_BACKOFF_MAX)
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+# Circuit breakers for the price providers: a provider whose recent calls mostly failed (or ran
+# slower than CIRCUIT_SLOW_CALL_SECONDS) is opened and its calls rejected on the spot, so an
+# outage costs a lock check per call instead of a timeout. After a cooldown single probe calls
+# are let through; a failed probe doubles the cooldown, a good one closes the breaker.
+CIRCUIT_OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', 15))
+CIRCUIT_MAX_OPEN_SECONDS = 300
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get('CIRCUIT_SLOW_CALL_SECONDS', 2))
+CIRCUIT_WINDOW = 20  # Recent calls the failure ratio is computed over
+CIRCUIT_MIN_CALLS = 5
+CIRCUIT_FAILURE_RATIO = 0.5
+CIRCUIT_CONSECUTIVE_FAILURES = 3  # Opens at once, before CIRCUIT_MIN_CALLS is reached
+CIRCUIT_STATES = ('closed', 'half_open', 'open')
+
+class CircuitOpenError(Exception):
+    """A call was rejected because its provider's circuit breaker is open"""
+
+class CircuitBreaker:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.outcomes = deque(maxlen=CIRCUIT_WINDOW)  # True = failed or slow
+        self.consecutive_failures = 0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.opened_at = 0
+        self.probe_started = None
+        self.latency = None  # Moving average of call latency, seconds
+        self.stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rate_limited': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self):
+        """True if a call may go out now; in half-open state only one probe at a time"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            cooling = self.state == 'open' and now - self.opened_at < self.open_seconds
+            # A probe that never reported back (e.g. an unexpected exception) is given up on
+            probing = self.probe_started is not None and now - self.probe_started < self.open_seconds
+            if cooling or probing:
+                self.stats['rejected'] += 1
+                return False
+            self.state = 'half_open'
+            self.probe_started = now
+            return True
+
+    def record(self, ok, seconds, rate_limited=False):
+        """Outcome of one logical call (after its retries). A rate-limited answer says nothing
+        about the provider's health: it only ends a probe, leaving the next call to probe again"""
+        with self.lock:
+            if rate_limited:
+                self.stats['rate_limited'] += 1
+                self.probe_started = None
+                return
+            slow = ok and seconds > CIRCUIT_SLOW_CALL_SECONDS
+            failed = not ok or slow
+            self.stats['calls'] += 1
+            self.stats['failures'] += not ok
+            self.stats['slow_calls'] += slow
+            self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+            if self.state == 'half_open':
+                if failed:
+                    self._open(min(self.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS))
+                else:
+                    self.state = 'closed'
+                    self.open_seconds = CIRCUIT_OPEN_SECONDS
+                    self.outcomes.clear()
+                    self.consecutive_failures = 0
+                self.probe_started = None
+                return
+            if self.state == 'open':
+                return  # A call that was already in flight when the breaker opened
+
+            self.outcomes.append(failed)
+            self.consecutive_failures = self.consecutive_failures + 1 if failed else 0
+            if self.consecutive_failures >= CIRCUIT_CONSECUTIVE_FAILURES or (
+                    len(self.outcomes) >= CIRCUIT_MIN_CALLS and
+                    sum(self.outcomes) / len(self.outcomes) >= CIRCUIT_FAILURE_RATIO):
+                self._open(CIRCUIT_OPEN_SECONDS)
+
+    def _open(self, seconds):
+        self.state = 'open'
+        self.opened_at = time.monotonic()
+        self.open_seconds = seconds
+        self.stats['opened'] += 1
+        log.warning("circuit provider=%s state=open seconds=%s", self.name, seconds)
+
+    def rank(self):
+        """Sort key for fallback ordering: state, then failure ratio in steps of 10%"""
+        with self.lock:
+            ratio = sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0
+            return CIRCUIT_STATES.index(self.state), round(ratio, 1)
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['state'] = self.state
+            stats['failure_ratio'] = round(sum(self.outcomes) / len(self.outcomes), 3) if self.outcomes else 0
+            stats['latency_ms'] = round(self.latency * 1000, 1) if self.latency is not None else None
+            if self.state == 'open':
+                stats['retry_in_seconds'] = round(max(0, self.opened_at + self.open_seconds - time.monotonic()), 1)
+        return stats
+
+# One breaker per price provider, keyed by host for the upstream client
+circuit_breakers = {
+    COINGECKO_HOST: CircuitBreaker('coingecko'),
+    ONEINCH_HOST: CircuitBreaker('1inch'),
+}
+provider_breakers = {breaker.name: breaker for breaker in circuit_breakers.values()}
+
+def price_source_order(sources):
+    """Price sources healthiest first; equally healthy ones keep their configured order"""
+    return sorted(sources, key=lambda source: provider_breakers[source].rank())
+
+def get_circuit_stats():
+    return {breaker.name: breaker.snapshot() for breaker in circuit_breakers.values()}
+
+# Single-flight: concurrent identical calls share one in-flight execution and its result
+inflight_lock = threading.Lock()
+inflight_calls = {}  # key -> {'done': Event, 'result', 'error'}
+
+def single_flight(key, fn, *args, **kwargs):
+    """Run fn once per key at a time; callers arriving meanwhile wait for the same result.
+    Returns (result, shared) where shared is True for callers that didn't run fn themselves"""
+    with inflight_lock:
+        call = inflight_calls.get(key)
+        leader = call is None
+        if leader:
+            call = {'done': threading.Event(), 'result': None, 'error': None}
+            inflight_calls[key] = call
+    
+    if not leader:
+        call['done'].wait()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result'], True
+    
     try:
-        params = {
-            'chainid': '1',
-            'module': 'account',
-            'action': 'tokentx',
-            'address': address,
-            'startblock': 0,
-            'endblock': 99999999,
-            'sort': 'desc',
-            'apikey': ETHERSCAN_API_KEY
-        }
-        response = requests.get(ETHERSCAN_API, params=params)
-        data = response.json()
+        call['result'] = fn(*args, **kwargs)
+    except Exception as e:
+        call['error'] = e
+        raise
+    finally:
+        with inflight_lock:
+            inflight_calls.pop(key, None)
+        call['done'].set()
+    return call['result'], False
+
+def upstream_get(url, params=None, timeout=None, retries=UPSTREAM_MAX_RETRIES):
+    """GET an upstream URL through the shared pooled session, coalescing identical in-flight calls"""
+    key = ('GET', url, tuple(sorted((params or {}).items())))
+    started = time.perf_counter()
+    response, shared = single_flight(key, _upstream_get_uncoalesced, url, params, timeout, retries)
+    if shared:
+        host = upstream_host(url)
+        _record_upstream(host, 'coalesced')
+        record_span(host, upstream_action(url, params), str(response.status_code), started,
+                    time.perf_counter() - started, coalesced=True)
+    return response
+
+def _upstream_get_uncoalesced(url, params, timeout, retries):
+    host = upstream_host(url)
+    if timeout is None:
+        timeout = UPSTREAM_TIMEOUTS.get(host, DEFAULT_UPSTREAM_TIMEOUT)
+    
+    api_key = (params or {}).get('apikey', '')
+    action = upstream_action(url, params)
+    breaker = circuit_breakers.get(host)
+    
+    # The breaker sees one outcome per logical call, not one per retry attempt
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} circuit is open")
+    attempt = 0
+    while True:
+        waited = wait_for_rate_limit(host, api_key)
+        _record_upstream(host, 'requests')
+        started = time.perf_counter()
+        try:
+            response = upstream_session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record_span(host, action, type(e).__name__, started, time.perf_counter() - started, rate_limit_wait=waited)
+            _record_upstream(host, 'errors')
+            if attempt >= retries:
+                if breaker is not None:
+                    breaker.record(False, time.perf_counter() - started)
+                raise
+            response = None
+        else:
+            # The body is read here (not streamed), so coalesced callers can share the response safely
+            status = '429' if is_rate_limited_response(host, response) else str(response.status_code)
+            record_span(host, action, status, started, time.perf_counter() - started, len(response.content), waited)
+            if not should_retry_response(host, api_key, response) or attempt >= retries:
+                if breaker is not None:
+                    breaker.record(response.status_code not in RETRY_STATUS_CODES, time.perf_counter() - started,
+                                   rate_limited=status == '429')
+                return response
+            _record_upstream(host, 'errors')
         
-        if data['status'] == '1' and isinstance(data.get('result'), list):
-            token_balances = {}
-            
-            for tx in data['result']:
-                token_name = tx.get('tokenName', 'Unknown')
-                token_symbol = tx.get('tokenSymbol', 'Unknown')
-                decimals = int(tx.get('tokenDecimal', 18))
-                contract = tx['contractAddress']
-                
-                if contract not in token_balances:
-                    token_balances[contract] = {
-                        'name': token_name,
-                        'symbol': token_symbol,
-                        'balance': 0,
-                        'decimals': decimals
-                    }
-                
-                value = int(tx['value'])
-                if tx['to'].lower() == address.lower():
-                    token_balances[contract]['balance'] += value
-                if tx['from'].lower() == address.lower():
-                    token_balances[contract]['balance'] -= value
-            
-            holdings = []
-            for contract, info in token_balances.items():
-                balance = info['balance'] / (10 ** info['decimals'])
-                if balance > 0:
-                    holdings.append({
-                        'name': info['name'],
-                        'symbol': info['symbol'],
-                        'balance': round(balance, 6),
-                        'contract': contract.lower()
-                    })
-            
-            return holdings
-        return []
+        _record_upstream(host, 'retries')
+        time.sleep(_backoff_delay(attempt, response))
+        attempt += 1
+
+def get_upstream_stats():
+    """Per-host request, retry, handshake and connection reuse counts"""
+    with upstream_stats_lock:
+        stats = {host: dict(counts) for host, counts in upstream_stats.items()}
+    
+    pools = upstream_adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        host = pool.host if pool.port in (None, 80, 443) else f'{pool.host}:{pool.port}'
+        host_stats = stats.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0})
+        host_stats['handshakes'] = host_stats.get('handshakes', 0) + pool.num_connections
+        host_stats['pooled_requests'] = host_stats.get('pooled_requests', 0) + pool.num_requests
+    
+    for host_stats in stats.values():
+        handshakes = host_stats.setdefault('handshakes', 0)
+        pooled_requests = host_stats.setdefault('pooled_requests', 0)
+        host_stats['reused_connections'] = max(0, pooled_requests - handshakes)
+        host_stats['reuse_ratio'] = round(host_stats['reused_connections'] / pooled_requests, 3) if pooled_requests else 0
+    
+    return stats
+
+# Local SQLite store shared by all gunicorn workers (WAL mode, one connection per thread)
+DB_PATH = os.environ.get('VERIFIL_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verifil.db'))
+
+DB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_ledger (
+    address TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    name TEXT,
+    symbol TEXT,
+    decimals INTEGER NOT NULL,
+    balance TEXT NOT NULL,
+    PRIMARY KEY (address, contract)
+);
+CREATE TABLE IF NOT EXISTS ledger_state (
+    address TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    bucket TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS token_facts (
+    contract TEXT NOT NULL,
+    fact TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (contract, fact)
+);
+CREATE TABLE IF NOT EXISTS tx_index (
+    address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    tx_index INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    stream INTEGER NOT NULL,
+    row_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    counterparty TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    value REAL NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (address, block_number, tx_index, log_index, stream, row_id)
+);
+CREATE INDEX IF NOT EXISTS tx_index_timestamp ON tx_index (address, timestamp);
+CREATE INDEX IF NOT EXISTS tx_index_counterparty ON tx_index (address, counterparty, block_number);
+CREATE INDEX IF NOT EXISTS tx_index_contract ON tx_index (address, contract, block_number);
+CREATE INDEX IF NOT EXISTS tx_index_direction ON tx_index (address, direction, block_number);
+CREATE TABLE IF NOT EXISTS wallet_snapshots (
+    address TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    block INTEGER,
+    computed_at REAL NOT NULL,
+    etag TEXT NOT NULL,
+    holdings TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (address, kind)
+);
+CREATE TABLE IF NOT EXISTS snapshot_leases (
+    address TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tx_index_state (
+    address TEXT NOT NULL,
+    action TEXT NOT NULL,
+    last_block INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (address, action)
+);
+"""
+
+db_local = threading.local()
+
+def get_db():
+    """Per-thread SQLite connection with the schema in place"""
+    conn = getattr(db_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(DB_SCHEMA)
+        db_local.conn = conn
+    return conn
+
+class TracingExecutor(ThreadPoolExecutor):
+    """Runs each task in the submitter's context, so its upstream spans land in the request's trace"""
+    
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+# Shared executor for overlapping independent upstream fetches within one request
+upstream_executor = TracingExecutor(max_workers=UPSTREAM_POOL_SIZE, thread_name_prefix='upstream')
+
+WALLET_DEADLINE_SECONDS = float(os.environ.get('WALLET_DEADLINE_SECONDS', 20))
+WALLET_MAX_DEADLINE_SECONDS = 60
+
+def result_by_deadline(future, deadline, default):
+    """Wait for a future until the monotonic deadline; returns (value, 'ok' | 'missing')"""
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic())), 'ok'
+    except FuturesTimeout:
+        return default, 'missing'
     except Exception as e:
-        print(f"Error fetching token balances: {e}")
-        return []
+        log.warning("Upstream task failed: %s", e)
+        return default, 'missing'
 
-def get_token_price_by_contract(contract_address):
-    """Get USD price for a token by its contract address using CoinGecko"""
+def eth_balance_params(address, chain=DEFAULT_CHAIN):
+    return {
+        'chainid': CHAINS[chain]['chain_id'],
+        'module': 'account',
+        'action': 'balance',
+        'address': address,
+        'tag': 'latest',
+        'apikey': ETHERSCAN_API_KEY
+    }
+
+def parse_eth_balance(data):
+    if data['status'] == '1':
+        balance_wei = int(data['result'])
+        balance_eth = balance_wei / 10**18
+        return balance_eth
+    return 0
+
+def get_eth_balance(address, chain=DEFAULT_CHAIN):
+    """Get the native coin (ETH on Ethereum and the rollups) balance for a wallet address"""
     try:
-        url = f"{COINGECKO_API}/simple/token_price/ethereum"
-        params = {
-            'contract_addresses': contract_address,
-            'vs_currencies': 'usd'
-        }
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if contract_address.lower() in data:
-            return data[contract_address.lower()].get('usd', 0)
-        return 0
+        response = upstream_get(ETHERSCAN_API, params=eth_balance_params(address, chain))
+        return parse_eth_balance(response.json())
     except Exception as e:
-        print(f"Error fetching price for {contract_address}: {e}")
+        log.warning("Error fetching ETH balance: %s", e)
         return 0
 
-# Cache for ETH price to reduce API calls
-eth_price_cache = {'price': 0, 'timestamp': 0}
-ETH_PRICE_CACHE_DURATION = 60  # Cache for 60 seconds
+BALANCEMULTI_MAX_ADDRESSES = 20  # Etherscan's limit per balancemulti call
+
+def get_eth_balances(addresses, chain=DEFAULT_CHAIN):
+    """ETH balances for many addresses with one balancemulti call per 20 addresses.
+    Addresses whose batch failed are left out of the result"""
+    balances = {}
+    for i in range(0, len(addresses), BALANCEMULTI_MAX_ADDRESSES):
+        batch = addresses[i:i + BALANCEMULTI_MAX_ADDRESSES]
+        try:
+            params = dict(eth_balance_params(','.join(batch), chain), action='balancemulti')
+            data = upstream_get(ETHERSCAN_API, params=params).json()
+            if data['status'] == '1' and isinstance(data.get('result'), list):
+                for entry in data['result']:
+                    balances[entry['account'].lower()] = int(entry['balance']) / 10**18
+        except Exception as e:
+            log.warning("Error fetching ETH balances for %s addresses: %s", len(batch), e)
+    return balances
+
+# Transfers this close to the newest one seen are applied per request but not persisted,
+# so a reorged block is simply re-fetched on the next call
+LEDGER_CONFIRMATIONS = 12
 
-def get_eth_price():
-    """Get current ETH price in USD with caching and fallback"""
-    import time
+# Ledgers hold amounts as exact raw integers in slotted records and transfers as column
+# batches; contract addresses, names and symbols are interned so 100k transfers of one
+# token share a single copy of each
+class TokenBalance:
+    """Raw (undivided) balance of one token in a wallet's ledger"""
+    __slots__ = ('name', 'symbol', 'decimals', 'balance')
     
-    # Check cache first
-    current_time = time.time()
-    if (current_time - eth_price_cache['timestamp']) < ETH_PRICE_CACHE_DURATION and eth_price_cache['price'] > 0:
-        return eth_price_cache['price']
+    def __init__(self, name, symbol, decimals, balance=0):
+        self.name = name
+        self.symbol = symbol
+        self.decimals = decimals
+        self.balance = balance
+    
+    def copy(self):
+        return TokenBalance(self.name, self.symbol, self.decimals, self.balance)
+
+class TransferBatch:
+    """A chunk of transfers (oldest first) as parallel columns: block numbers, interned
+    contracts and raw deltas signed from the wallet's side, plus (name, symbol, decimals)
+    once per contract"""
+    __slots__ = ('blocks', 'contracts', 'deltas', 'tokens')
+    
+    def __init__(self, blocks, contracts, deltas, tokens):
+        self.blocks = blocks
+        self.contracts = contracts
+        self.deltas = deltas
+        self.tokens = tokens
+    
+    def __len__(self):
+        return len(self.blocks)
+    
+    def split(self, block):
+        """(transfers at or before block, transfers after it)"""
+        cut = bisect_right(self.blocks, block)
+        return (TransferBatch(self.blocks[:cut], self.contracts[:cut], self.deltas[:cut], self.tokens),
+                TransferBatch(self.blocks[cut:], self.contracts[cut:], self.deltas[cut:], self.tokens))
+    
+    def net(self):
+        """Net raw delta per contract: sort row indexes by contract, then sum each group"""
+        order = sorted(range(len(self.contracts)), key=self.contracts.__getitem__)
+        return {contract: sum(map(self.deltas.__getitem__, rows))
+                for contract, rows in groupby(order, key=self.contracts.__getitem__)}
+
+def compact_token_transfers(chunk, address):
+    """Turn a chunk of tokentx rows into a TransferBatch, one column at a time.
     
-    # Try CoinGecko first
+    Each field is extracted and converted for the whole chunk with map/itemgetter, which
+    keeps the per-row work in C instead of a Python-level loop body per transfer.
+    """
+    column = lambda field: map(itemgetter(field), chunk)
+    values = list(map(int, column('value')))
+    incoming = map(address.__eq__, map(str.lower, column('to')))
+    outgoing = map(address.__eq__, map(str.lower, column('from')))
+    # delta = value*incoming - value*outgoing (a self-transfer nets to zero)
+    deltas = list(map(sub, map(mul, values, incoming), map(mul, values, outgoing)))
+    contracts = list(map(sys.intern, map(str.lower, column('contractAddress'))))
+    
+    # Token metadata comes from each contract's first row only
+    first_rows = dict(zip(reversed(contracts), reversed(chunk)))
+    tokens = {
+        contract: (sys.intern(tx.get('tokenName', 'Unknown')), sys.intern(tx.get('tokenSymbol', 'Unknown')),
+                   int(tx.get('tokenDecimal', 18) or 18))
+        for contract, tx in first_rows.items()
+    }
+    return TransferBatch(array('q', map(int, column('blockNumber'))), contracts, deltas, tokens)
+
+def load_token_ledger(ledger):
+    """Persisted raw balances per contract and the last block folded into them.
+    `ledger` is the wallet address, namespaced per chain by chain_key()"""
+    conn = get_db()
+    row = conn.execute('SELECT last_block FROM ledger_state WHERE address = ?', (ledger,)).fetchone()
+    if row is None:
+        return {}, -1
+    
+    balances = {}
+    for contract, name, symbol, decimals, balance in conn.execute(
+            'SELECT contract, name, symbol, decimals, balance FROM token_ledger WHERE address = ?', (ledger,)):
+        balances[sys.intern(contract)] = TokenBalance(name, symbol, decimals, int(balance))
+    return balances, row[0]
+
+def save_token_ledger(ledger, balances, last_block, expected_block):
+    """Persist the ledger unless another worker advanced it first; returns True when written"""
+    conn = get_db()
+    conn.execute('BEGIN IMMEDIATE')
     try:
-        response = requests.get(f"{COINGECKO_API}/simple/price", params={
-            'ids': 'ethereum',
-            'vs_currencies': 'usd'
-        })
-        data = response.json()
+        row = conn.execute('SELECT last_block FROM ledger_state WHERE address = ?', (ledger,)).fetchone()
+        if (row[0] if row else -1) != expected_block:
+            conn.execute('ROLLBACK')
+            return False
+        conn.executemany(
+            'INSERT OR REPLACE INTO token_ledger (address, contract, name, symbol, decimals, balance) VALUES (?, ?, ?, ?, ?, ?)',
+            [(ledger, contract, info.name, info.symbol, info.decimals, str(info.balance))
+             for contract, info in balances.items()]
+        )
+        conn.execute('INSERT OR REPLACE INTO ledger_state (address, last_block, updated_at) VALUES (?, ?, ?)',
+                     (ledger, last_block, time.time()))
+        conn.execute('COMMIT')
+        return True
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+def apply_token_transfers(balances, batch):
+    """Fold a TransferBatch into raw per-contract balances (in place).
+    Deltas are netted per contract first, so each ledger record is touched once per batch"""
+    for contract, delta in batch.net().items():
+        info = balances.get(contract)
+        if info is None:
+            info = balances[contract] = TokenBalance(*batch.tokens[contract])
+        info.balance += delta
+
+# Etherscan only serves the first 10,000 rows of a query (page * offset <= 10000)
+ETHERSCAN_PAGE_SIZE = int(os.environ.get('ETHERSCAN_PAGE_SIZE', 1000))
+ETHERSCAN_RESULT_WINDOW = 10000
+
+class UpstreamError(Exception):
+    """An upstream API answered with an error instead of data"""
+
+def record_identity(record):
+    """What tells apart the rows of one transaction: tokentx rows usually carry no logIndex,
+    so the transfers of a swap or batch airdrop differ only in token, sides and amount"""
+    return '|'.join(record.get(field) or '' for field in ('hash', 'traceId', 'contractAddress', 'from', 'to', 'value'))
+
+def _record_key(record):
+    # The same row as tx_position sees it
+    return (record.get('logIndex'), record_identity(record))
+
+class EtherscanPager:
+    """Page/offset walk over an Etherscan account query, oldest first.
+    
+    When a block range saturates the result window the range is split at the last block
+    seen: a new window starts there, skipping the rows of that block already returned.
+    Callers alternate next_params() and feed() until done; the pager does no I/O itself.
+    """
+    
+    def __init__(self, params, startblock=0, endblock=99999999):
+        self.params = params
+        self.endblock = endblock
+        self.window_start = startblock
+        self.boundary_keys = set()  # Rows of block window_start returned by the previous window
+        self.page = 1
+        self.last_block = None
+        self.last_block_keys = set()
+        self.done = False
+    
+    def next_params(self):
+        return dict(self.params, startblock=self.window_start, endblock=self.endblock,
+                    page=self.page, offset=ETHERSCAN_PAGE_SIZE, sort='asc')
+    
+    def feed(self, data):
+        """Consume one page of Etherscan JSON; returns the records not seen before"""
+        if data.get('status') == '1' and isinstance(data.get('result'), list):
+            records = data['result']
+        elif data.get('message') == 'No transactions found':
+            # Etherscan reports an empty range as status 0 with an empty result list
+            records = []
+        else:
+            raise UpstreamError(f"Etherscan {self.params.get('action')} error: {data.get('message')} {data.get('result')}")
         
-        if 'ethereum' in data and 'usd' in data['ethereum']:
-            price = data['ethereum']['usd']
-            eth_price_cache['price'] = price
-            eth_price_cache['timestamp'] = current_time
-            print(f"✓ ETH price: ${price} (CoinGecko)")
-            return price
+        fresh = [record for record in records if _record_key(record) not in self.boundary_keys]
+        
+        for record in records:
+            block = int(record['blockNumber'])
+            if block != self.last_block:
+                self.last_block = block
+                self.last_block_keys = set()
+            self.last_block_keys.add(_record_key(record))
+        
+        if len(records) < ETHERSCAN_PAGE_SIZE:
+            self.done = True
+        elif self.page * ETHERSCAN_PAGE_SIZE < ETHERSCAN_RESULT_WINDOW:
+            self.page += 1
+        else:
+            # Window saturated - continue from the last block seen
+            if self.last_block == self.window_start:
+                raise UpstreamError(f"More than {ETHERSCAN_RESULT_WINDOW} records in block {self.last_block}")
+            self.boundary_keys = self.last_block_keys
+            self.window_start = self.last_block
+            self.page = 1
+            self.last_block = None
+            self.last_block_keys = set()
+        
+        return fresh
+
+def iter_etherscan_records(params, startblock=0, endblock=99999999):
+    """Yield account records (oldest first) in pages of at most ETHERSCAN_PAGE_SIZE rows"""
+    pager = EtherscanPager(params, startblock, endblock)
+    while not pager.done:
+        fresh = pager.feed(upstream_get(ETHERSCAN_API, params=pager.next_params()).json())
+        if fresh:
+            yield fresh
+
+def token_transfer_params(address, chain=DEFAULT_CHAIN):
+    return {
+        'chainid': CHAINS[chain]['chain_id'],
+        'module': 'account',
+        'action': 'tokentx',
+        'address': address,
+        'apikey': ETHERSCAN_API_KEY
+    }
+
+def begin_token_ingest(address, chain=DEFAULT_CHAIN):
+    """Load the persisted ledger and start folding new transfers on top of it.
+    
+    Transfers are folded as they arrive; only the unsettled tail (the newest
+    LEDGER_CONFIRMATIONS blocks, as TransferBatches) is held in memory. Each chain
+    has its own ledger, stored under the chain's key for the address.
+    """
+    ledger = chain_key(address, chain)
+    balances, last_block = load_token_ledger(ledger)
+    return {
+        'address': address,
+        'ledger': ledger,
+        'balances': balances,
+        'last_block': last_block,
+        'newest_block': last_block,
+        'folded_block': last_block,
+        'tail': deque()
+    }
+
+def ingest_token_chunk(state, chunk):
+    """Fold one chunk of tokentx rows (oldest first) into the ingest state"""
+    tail = state['tail']
+    tail.append(compact_token_transfers(chunk, state['address']))
+    state['newest_block'] = max(state['newest_block'], tail[-1].blocks[-1])
+    settled_block = state['newest_block'] - LEDGER_CONFIRMATIONS
+    while tail and tail[0].blocks[0] <= settled_block:
+        settled, unsettled = tail.popleft().split(settled_block)
+        apply_token_transfers(state['balances'], settled)
+        if unsettled:
+            tail.appendleft(unsettled)
+            break
+    state['folded_block'] = max(state['folded_block'], settled_block)
+
+def finish_token_ingest(state):
+    """Persist the settled part of the ledger and build holdings including the tail"""
+    ledger = state['ledger']
+    balances = state['balances']
+    tail = state['tail']
+    
+    try:
+        expected_block = state['last_block']
+        while state['folded_block'] > expected_block and \
+                not save_token_ledger(ledger, balances, state['folded_block'], expected_block):
+            # Another worker advanced the ledger first. Both ledgers grew from the one loaded
+            # at last_block, so whichever reaches the later block contains the other
+            other_balances, other_block = load_token_ledger(ledger)
+            if other_block >= state['folded_block']:
+                # Theirs covers everything folded here; only the tail past it still applies
+                balances = other_balances
+                tail = [batch.split(other_block)[1] for batch in tail]
+                break
+            # Ours reaches further (it holds their blocks and the ones after): write it over theirs
+            expected_block = other_block
     except Exception as e:
-        print(f"CoinGecko ETH price failed: {e}")
+        log.warning("Error saving token ledger: %s", e)
+    
+    if tail:
+        balances = {contract: info.copy() for contract, info in balances.items()}
+        for batch in tail:
+            apply_token_transfers(balances, batch)
     
-    # Fallback: Use a reasonable ETH price estimate
-    fallback_price = 3500  # Reasonable ETH price estimate
-    print(f"⚠️ Using fallback ETH price: ${fallback_price}")
-    eth_price_cache['price'] = fallback_price
-    eth_price_cache['timestamp'] = current_time
-    return fallback_price
+    # Amounts stay integers up to here; balance_raw/decimals carry them exactly to the client
+    held = [(contract, info) for contract, info in balances.items() if info.balance > 0]
+    raw = [info.balance for _, info in held]
+    decimals = [info.decimals for _, info in held]
+    scaled = map(truediv, raw, map(pow, repeat(10), decimals))
+    return [
+        {'name': info.name, 'symbol': info.symbol, 'balance': balance, 'balance_raw': balance_raw,
+         'decimals': info.decimals, 'contract': contract}
+        for (contract, info), balance, balance_raw in zip(held, map(round, scaled, repeat(6)), map(str, raw))
+    ]
 
-def get_price_from_1inch(contract_address):
-    """Try to get price from 1inch API as fallback"""
+def get_token_balances(address, chain=DEFAULT_CHAIN):
+    """Get ERC-20 token balances for a wallet address"""
+    address = address.lower()
     try:
-        # 1inch API doesn't require auth for basic price queries
-        url = f"https://api.1inch.dev/price/v1.1/1/{contract_address}"
-        response = requests.get(url, timeout=3)
-        
-        if response.status_code == 200:
-            data = response.json()
-            # 1inch returns price in USD directly
-            return data.get(contract_address.lower(), 0)
+        state = begin_token_ingest(address, chain)
+    except Exception as e:
+        log.warning("Error loading token ledger: %s", e)
+        return []
+    
+    # Only the transfers after the last persisted block are fetched
+    try:
+        for chunk in iter_etherscan_records(token_transfer_params(address, chain), startblock=state['last_block'] + 1):
+            ingest_token_chunk(state, chunk)
+    except Exception as e:
+        # Keep what was folded so far; the next call resumes from there
+        log.warning("Error fetching token balances: %s", e)
+        state['tail'].clear()
+    
+    return finish_token_ingest(state)
+
+# Shared price cache keyed by (chain, contract, currency), bounded with LRU eviction.
+# A price of 0 is a negative entry: "no price found", cached so junk tokens aren't re-queried.
+PRICE_CACHE_MAX_ENTRIES = int(os.environ.get('PRICE_CACHE_MAX_ENTRIES', 10000))
+TOKEN_PRICE_CACHE_DURATION = 300  # Seconds a found token price stays fresh
+NO_PRICE_CACHE_DURATION = 900  # Seconds to remember that a token has no price
+NATIVE_PRICE_CACHE_DURATION = 60  # Cache for 60 seconds
+NATIVE_STALE_RETRY_SECONDS = 15  # How long a last-known-good native price is served before providers are retried
+NATIVE_TOKEN = 'native'  # Contract slot used for the chain's native coin (ETH, POL, BNB)
+
+price_cache_lock = threading.Lock()
+price_cache = OrderedDict()  # (chain, contract, currency) -> {'price', 'expires', 'updated', 'stale'}
+price_cache_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+def price_cache_get(contract, chain=DEFAULT_CHAIN, currency='usd'):
+    """Cached price (0 for a negative entry), or None when missing or expired"""
+    key = (chain, contract.lower(), currency)
+    with price_cache_lock:
+        entry = price_cache.get(key)
+        if entry is None:
+            price_cache_stats['misses'] += 1
+            return None
+        if entry['expires'] <= time.time():
+            price_cache_stats['expired'] += 1
+            price_cache_stats['misses'] += 1
+            return None
+        price_cache.move_to_end(key)
+        price_cache_stats['negative_hits' if entry['price'] == 0 else 'hits'] += 1
+        return entry['price']
+
+def price_cache_peek(contract, chain=DEFAULT_CHAIN, currency='usd'):
+    """Last cached entry even if expired (for stale fallbacks), without touching counters"""
+    with price_cache_lock:
+        entry = price_cache.get((chain, contract.lower(), currency))
+        return dict(entry) if entry else None
+
+def price_cache_set(contract, price, chain=DEFAULT_CHAIN, currency='usd', ttl=None, updated=None, stale=False):
+    """Store a price (0 = no price found) with a per-entry TTL. A stale entry re-serves an
+    old price (fetched at `updated`) because no provider could be reached"""
+    if ttl is None:
+        ttl = TOKEN_PRICE_CACHE_DURATION if price else NO_PRICE_CACHE_DURATION
+    key = (chain, contract.lower(), currency)
+    now = time.time()
+    with price_cache_lock:
+        price_cache[key] = {'price': price, 'expires': now + ttl, 'updated': updated or now, 'stale': stale}
+        price_cache.move_to_end(key)
+        while len(price_cache) > PRICE_CACHE_MAX_ENTRIES:
+            price_cache.popitem(last=False)
+            price_cache_stats['evictions'] += 1
+
+def get_price_cache_stats():
+    """Hit/miss counters and size of the shared price cache"""
+    with price_cache_lock:
+        stats = dict(price_cache_stats)
+        stats['entries'] = len(price_cache)
+    lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+    stats['max_entries'] = PRICE_CACHE_MAX_ENTRIES
+    stats['hit_ratio'] = round((stats['hits'] + stats['negative_hits']) / lookups, 3) if lookups else 0
+    return stats
+
+def get_token_price_by_contract(contract_address, chain=DEFAULT_CHAIN):
+    """Get USD price for a token by its contract address (healthiest price source first)"""
+    contract = contract_address.lower()
+    record_hot_tokens([contract], chain)
+    cached = price_cache_get(contract, chain)
+    if cached is None:
+        cached = stale_price(contract, chain)
+    if cached is not None:
+        return cached
+    
+    try:
+        return fetch_token_prices([contract], chain)[contract]
+    except Exception as e:
+        log.warning("Error fetching price for %s: %s", contract_address, e)
         return 0
-    except:
+
+def get_native_price(chain=DEFAULT_CHAIN):
+    """Get the current USD price of a chain's native coin with caching and fallback"""
+    
+    # Check cache first
+    record_hot_tokens([NATIVE_TOKEN], chain)
+    cached = price_cache_get(NATIVE_TOKEN, chain)
+    if cached:
+        return cached
+    
+    # Just expired: answer with the old price and let the background worker refresh it
+    stale = stale_price(NATIVE_TOKEN, chain)
+    if stale:
+        return stale
+    
+    # One refresh per expiry, however many requests hit the empty cache at once
+    price, _ = single_flight(('native_price', chain), _refresh_native_price, chain)
+    return price
+
+def _refresh_native_price(chain):
+    cached = price_cache_get(NATIVE_TOKEN, chain)
+    if cached:
+        return cached
+    return fetch_native_price(chain)
+
+NATIVE_PRICE_SOURCES = ('coingecko', '1inch')  # Preferred order while both are healthy
+
+def native_price_params(chain):
+    return {'ids': CHAINS[chain]['native_coin'], 'vs_currencies': 'usd'}
+
+def fetch_native_price_coingecko(chain):
+    response = upstream_get(f"{COINGECKO_API}/simple/price", params=native_price_params(chain))
+    return parse_native_price(response.json(), CHAINS[chain]['native_coin'])
+
+def fetch_native_price_1inch(chain):
+    return get_price_from_1inch(CHAINS[chain]['wrapped_native'], chain) or None
+
+NATIVE_PRICE_FETCHERS = {
+    'coingecko': fetch_native_price_coingecko,
+    '1inch': fetch_native_price_1inch,
+}
+
+def fetch_native_price(chain=DEFAULT_CHAIN):
+    """Native coin price from the healthiest provider that answers, else the last known good price"""
+    for source in price_source_order(NATIVE_PRICE_SOURCES):
+        try:
+            price = NATIVE_PRICE_FETCHERS[source](chain)
+        except CircuitOpenError:
+            continue
+        except Exception as e:
+            log.warning("%s native price from %s failed: %s", chain, source, e)
+            continue
+        if price:
+            return store_native_price(chain, price, source)
+    return last_known_native_price(chain)
+
+def parse_native_price(data, coin_id):
+    """A coin's price from a /simple/price response, or None"""
+    if coin_id in data and 'usd' in data[coin_id]:
+        return data[coin_id]['usd']
+    return None
+
+def store_native_price(chain, price, source):
+    """Cache a fresh native price and persist it as the last known good one"""
+    price_cache_set(NATIVE_TOKEN, price, chain, ttl=NATIVE_PRICE_CACHE_DURATION)
+    set_token_fact(chain_key(NATIVE_TOKEN, chain), 'last_price', {'price': price, 'updated_at': time.time()})
+    log.debug("native_price chain=%s source=%s price=%s", chain, source, price)
+    return price
+
+def last_known_native_price(chain):
+    """Every provider failed: re-serve the newest price we had (in memory or persisted across
+    restarts), cached as stale for a short while. None if there never was one"""
+    candidates = []
+    cached = price_cache_peek(NATIVE_TOKEN, chain)
+    if cached and cached['price']:
+        candidates.append((cached['updated'], cached['price']))
+    stored = get_token_fact(chain_key(NATIVE_TOKEN, chain), 'last_price')
+    if stored:
+        candidates.append((stored['updated_at'], stored['price']))
+    if not candidates:
+        log.warning("native_price chain=%s source=none: no provider answered and no last known price", chain)
+        return None
+    
+    updated, price = max(candidates)
+    log.warning("native_price chain=%s source=last_known_good price=%s age_seconds=%d", chain, price, time.time() - updated)
+    price_cache_set(NATIVE_TOKEN, price, chain, ttl=NATIVE_STALE_RETRY_SECONDS, updated=updated, stale=True)
+    return price
+
+def get_price_from_1inch(contract_address, chain=DEFAULT_CHAIN):
+    """Try to get price from 1inch API as fallback (CircuitOpenError while 1inch is down)"""
+    try:
+        # 1inch API doesn't require auth for basic price queries
+        url = f"{ONEINCH_API}/{CHAINS[chain]['chain_id']}/{contract_address}"
+        response = upstream_get(url)
+        return parse_1inch_price(response, contract_address)
+    except CircuitOpenError:
+        raise
+    except Exception:
         return 0
 
-def get_all_token_prices(contract_addresses):
+def parse_1inch_price(response, contract_address):
+    if response.status_code == 200:
+        data = response.json()
+        # 1inch returns price in USD directly
+        return data.get(contract_address.lower(), 0)
+    return 0
+
+# Common stablecoins we can hardcode (Ethereum mainnet contracts)
+STABLECOINS = {
+    '0xdac17f958d2ee523a2206206994597c13d831ec7': 1.00,  # USDT
+    '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48': 1.00,  # USDC
+    '0x6b175474e89094c44da98b954eedeac495271d0f': 1.00,  # DAI
+    '0x4fabb145d64652a948d72533023f6e7a623c7c53': 1.00,  # BUSD
+    '0x0000000000085d4780b73119b644ae5ecd22b376': 1.00,  # TUSD
+}
+
+# Well-known Ethereum tokens we can price by CoinGecko id when the contract lookup misses
+MAJOR_TOKENS = {
+    '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599': 'wrapped-bitcoin',  # WBTC
+    '0x514910771af9ca656af840dff83e8264ecf986ca': 'chainlink',  # LINK
+    '0x7d1afa7b718fb893db30a3abc0cfc608aacfebb0': 'matic-network',  # MATIC
+    '0x1f9840a85d5af5bf1d1762f925bdaddc4201f984': 'uniswap',  # UNI
+    '0x7fc66500c84a76ad7e9c93437bfc5ac33e2ddae9': 'aave',  # AAVE
+    '0xc00e94cb662c3520282e6f5717214004a7f26888': 'compound-governance-token',  # COMP
+    '0x0d8775f648430679a709e98d2b0cb6250d2887ef': 'basic-attention-token',  # BAT
+    '0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2': 'maker',  # MKR
+}
+
+# CoinGecko accepts comma-separated contract_addresses; keep each call under both limits
+COINGECKO_BATCH_SIZE = int(os.environ.get('COINGECKO_BATCH_SIZE', 100))
+COINGECKO_MAX_QUERY_LENGTH = 4500  # Characters of contract list per URL (well under 8 KB)
+# CoinGecko's error for more contract addresses in one call than the plan allows
+# (Demo/Public keys take only one); recognised by code, or by message as a fallback
+COINGECKO_BATCH_LIMIT_ERROR_CODES = {10012}
+
+# Contracts per call; lowered for good once the plan rejects a batch, so each request
+# after the first pays nothing to rediscover the limit
+coingecko_batch_size = COINGECKO_BATCH_SIZE
+
+class CoinGeckoBatchLimitError(UpstreamError):
+    """CoinGecko refused a call for carrying more contracts than the plan allows"""
+
+def shrink_coingecko_batch_size(rejected):
+    """A batch of `rejected` contracts was refused: batch at most half that from now on"""
+    global coingecko_batch_size
+    size = max(1, rejected // 2)
+    if size < coingecko_batch_size:
+        coingecko_batch_size = size
+        log.info("CoinGecko refused %d contracts per call; batching %d from now on", rejected, size)
+
+def chunk_contracts(contracts):
+    """Split contract addresses into batches bounded by count and URL length"""
+    batches = []
+    batch = []
+    batch_length = 0
+    for contract in contracts:
+        # Each address costs its length plus an encoded comma (%2C)
+        if batch and (len(batch) >= coingecko_batch_size or batch_length + len(contract) + 3 > COINGECKO_MAX_QUERY_LENGTH):
+            batches.append(batch)
+            batch = []
+            batch_length = 0
+        batch.append(contract)
+        batch_length += len(contract) + 3
+    if batch:
+        batches.append(batch)
+    return batches
+
+def coingecko_token_price_params(contracts):
+    return {
+        'contract_addresses': ','.join(contracts),
+        'vs_currencies': 'usd'
+    }
+
+def parse_coingecko_token_prices(response):
+    """Prices from a /simple/token_price response. Raises UpstreamError for anything but a
+    price map (429s, 5xx, error payloads), so its contracts are never cached as unpriced,
+    and CoinGeckoBatchLimitError when the plan refused the number of contracts"""
+    try:
+        data = response.json()
+    except ValueError:
+        data = None
+    error = data.get('status') if isinstance(data, dict) else None
+    if isinstance(error, dict):
+        if error.get('error_code') in COINGECKO_BATCH_LIMIT_ERROR_CODES or \
+                'contract address' in str(error.get('error_message', '')).lower():
+            raise CoinGeckoBatchLimitError(f"CoinGecko batch limit: {error}")
+        raise UpstreamError(f"CoinGecko token_price error: {error}")
+    if response.status_code != 200 or not isinstance(data, dict):
+        raise UpstreamError(f"CoinGecko token_price answered {response.status_code}")
+    
+    prices = {}
+    for contract, price_data in data.items():
+        if isinstance(price_data, dict) and 'usd' in price_data:
+            prices[contract.lower()] = price_data['usd']
+    return prices
+
+def coingecko_token_price_url(chain):
+    return f"{COINGECKO_API}/simple/token_price/{CHAINS[chain]['platform']}"
+
+def fetch_coingecko_token_prices(contracts, chain=DEFAULT_CHAIN):
+    """Price one batch of lowercase contracts with a single CoinGecko call"""
+    url = coingecko_token_price_url(chain)
+    return parse_coingecko_token_prices(upstream_get(url, params=coingecko_token_price_params(contracts)))
+
+def parse_coingecko_prices_by_id(data, coin_ids):
+    if not isinstance(data, dict):
+        return {}
+    return {coin_id: data[coin_id]['usd'] for coin_id in coin_ids if isinstance(data.get(coin_id), dict) and 'usd' in data[coin_id]}
+
+def fetch_coingecko_prices_by_id(coin_ids):
+    """Price CoinGecko coin ids with a single /simple/price call"""
+    response = upstream_get(f"{COINGECKO_API}/simple/price", params={
+        'ids': ','.join(coin_ids),
+        'vs_currencies': 'usd'
+    })
+    return parse_coingecko_prices_by_id(response.json(), coin_ids)
+
+def split_cached_prices(contract_addresses, chain=DEFAULT_CHAIN):
+    """Dedupe (order preserved), price stablecoins and cached tokens; returns (prices, pending)"""
+    all_prices = {}
+    pending = []
+    contracts = list(dict.fromkeys(c.lower() for c in contract_addresses))
+    stablecoins = STABLECOINS if chain == DEFAULT_CHAIN else {}
+    record_hot_tokens((c for c in contracts if c not in stablecoins), chain)
+    for contract in contracts:
+        if contract in stablecoins:
+            all_prices[contract] = stablecoins[contract]
+            continue
+        cached = price_cache_get(contract, chain)
+        if cached is None:
+            cached = stale_price(contract, chain)
+        if cached is not None:
+            all_prices[contract] = cached
+        else:
+            pending.append(contract)
+    return all_prices, pending
+
+def missing_major_tokens(all_prices, pending, chain=DEFAULT_CHAIN):
+    """Majors CoinGecko couldn't price by contract -> their coin ids"""
+    if chain != DEFAULT_CHAIN:
+        return {}
+    return {contract: MAJOR_TOKENS[contract] for contract in pending if contract not in all_prices and contract in MAJOR_TOKENS}
+
+def store_token_prices(all_prices, pending, answered, chain=DEFAULT_CHAIN):
+    """Cache freshly fetched prices; misses only when CoinGecko actually answered for them"""
+    for contract in pending:
+        if all_prices[contract] or contract in answered:
+            price_cache_set(contract, all_prices[contract], chain)
+
+def get_all_token_prices(contract_addresses, chain=DEFAULT_CHAIN):
     """Get USD prices for tokens with multiple fallback sources"""
     if not contract_addresses:
         return {}
     
-    all_prices = {}
+    # Dedupe (order preserved), take stablecoins off the list and serve cached prices
+    all_prices, pending = split_cached_prices(contract_addresses, chain)
+    if pending:
+        all_prices.update(fetch_token_prices(pending, chain))
+    return all_prices
+
+TOKEN_PRICE_SOURCES = ('coingecko', '1inch')  # Preferred order while both are healthy
+
+def fetch_coingecko_prices(contracts, chain=DEFAULT_CHAIN):
+    """CoinGecko batches, then majors by coin id; returns (prices, contracts CoinGecko answered for)"""
+    prices = {}
+    batches = chunk_contracts(contracts)
+    log.debug("token_prices source=coingecko pending=%d batches=%d", len(contracts), len(batches))
     
-    # Common stablecoins we can hardcode
-    STABLECOINS = {
-        '0xdac17f958d2ee523a2206206994597c13d831ec7': 1.00,  # USDT
-        '0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48': 1.00,  # USDC
-        '0x6b175474e89094c44da98b954eedeac495271d0f': 1.00,  # DAI
-        '0x4fabb145d64652a948d72533023f6e7a623c7c53': 1.00,  # BUSD
-        '0x0000000000085d4780b73119b644ae5ecd22b376': 1.00,  # TUSD
-    }
+    # One call per batch; the rate limiter paces the calls.
+    # Only contracts from batches CoinGecko answered with a price map may be negatively
+    # cached; fetch_coingecko_token_prices raises for anything else.
+    answered = set()
+    while batches:
+        batch = batches.pop(0)
+        try:
+            prices.update(fetch_coingecko_token_prices(batch, chain))
+            answered.update(batch)
+        except CoinGeckoBatchLimitError as e:
+            if len(batch) == 1:
+                log.warning("CoinGecko refused a single contract: %s", e)
+                continue
+            # Too many contracts for the plan: re-batch everything left at the smaller size
+            shrink_coingecko_batch_size(len(batch))
+            batches = chunk_contracts(batch + [contract for rest in batches for contract in rest])
+        except CircuitOpenError:
+            return prices, answered
+        except Exception as e:
+            log.warning("CoinGecko batch of %s failed: %s", len(batch), e)
     
-    # Well-known tokens we can try with CoinGecko
-    MAJOR_TOKENS = {
-        '0x2260fac5e5542a773aa44fbcfedf7c193bc2c599': 'wrapped-bitcoin',  # WBTC
-        '0x514910771af9ca656af840dff83e8264ecf986ca': 'chainlink',  # LINK
-        '0x7d1afa7b718fb893db30a3abc0cfc608aacfebb0': 'matic-network',  # MATIC
-        '0x1f9840a85d5af5bf1d1762f925bdaddc4201f984': 'uniswap',  # UNI
-        '0x7fc66500c84a76ad7e9c93437bfc5ac33e2ddae9': 'aave',  # AAVE
-        '0xc00e94cb662c3520282e6f5717214004a7f26888': 'compound-governance-token',  # COMP
-        '0x0d8775f648430679a709e98d2b0cb6250d2887ef': 'basic-attention-token',  # BAT
-        '0x9f8f72aa9304c8b593d555f12ef6589cc3a579a2': 'maker',  # MKR
-    }
+    # Majors CoinGecko couldn't price by contract, by coin id in one call
+    missing_majors = missing_major_tokens(prices, contracts, chain)
+    if missing_majors:
+        try:
+            prices_by_id = fetch_coingecko_prices_by_id(list(missing_majors.values()))
+            for contract, coin_id in missing_majors.items():
+                if coin_id in prices_by_id:
+                    prices[contract] = prices_by_id[coin_id]
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            log.warning("CoinGecko id lookup failed: %s", e)
+    return prices, answered
+
+def fetch_1inch_prices(contracts, chain=DEFAULT_CHAIN):
+    """1inch, one call per contract; stops as soon as its circuit opens"""
+    prices = {}
+    for contract in contracts:
+        try:
+            price = get_price_from_1inch(contract, chain)
+        except CircuitOpenError:
+            break
+        if price > 0:
+            prices[contract] = price
+            log.debug("token_price contract=%s source=1inch price=%s", contract, price)
+    return prices, set()
+
+TOKEN_PRICE_FETCHERS = {
+    'coingecko': fetch_coingecko_prices,
+    '1inch': fetch_1inch_prices,
+}
+
+def fetch_token_prices(pending, chain=DEFAULT_CHAIN):
+    """Price lowercase contracts upstream and cache them. Sources are tried healthiest first,
+    each pricing what the previous ones couldn't; an open circuit is skipped at no cost"""
+    all_prices = {}
+    answered = set()
+    for source in price_source_order(TOKEN_PRICE_SOURCES):
+        remaining = [contract for contract in pending if contract not in all_prices]
+        if not remaining:
+            break
+        prices, source_answered = TOKEN_PRICE_FETCHERS[source](remaining, chain)
+        all_prices.update(prices)
+        answered.update(source_answered)
     
-    # Limit to first 15 tokens to stay within rate limits
-    limited_addresses = contract_addresses[:15]
+    for contract in pending:
+        if contract not in all_prices:
+            all_prices[contract] = 0
+            log.debug("token_price contract=%s source=none", contract)
     
-    print(f"Fetching prices for {len(limited_addresses)} tokens...")
+    store_token_prices(all_prices, pending, answered, chain)
+    return all_prices
+
+# Background price refresh: price lookups record a working set of hot contracts, and a worker
+# re-prices the ones close to expiry in batches so requests are answered from the cache.
+# A price that expired less than PRICE_STALE_GRACE ago is served while it is revalidated.
+PRICE_REFRESH_INTERVAL = float(os.environ.get('PRICE_REFRESH_INTERVAL', 15))
+PRICE_REFRESH_AHEAD = 60  # Seconds before expiry a hot price gets refreshed
+PRICE_STALE_GRACE = float(os.environ.get('PRICE_STALE_GRACE', 600))
+HOT_TOKEN_MAX = int(os.environ.get('HOT_TOKEN_MAX', 500))
+HOT_TOKEN_IDLE_SECONDS = 3600  # Contracts nobody asked about for this long leave the working set
+
+hot_tokens_lock = threading.Lock()
+hot_tokens = {}  # (chain, contract) -> {'requests', 'last_requested'}
+price_revalidate = set()  # (chain, contract) pairs served stale, refreshed on the worker's next pass
+price_refresh_wakeup = threading.Event()
+price_refresh_thread = None
+price_refresh_stats = {'passes': 0, 'tokens_refreshed': 0, 'stale_served': 0, 'hot_evictions': 0}
+
+def record_hot_tokens(contracts, chain=DEFAULT_CHAIN):
+    """Count a lookup for each contract, evicting the least-requested one when full"""
+    start_price_refresher()
+    now = time.time()
+    with hot_tokens_lock:
+        for contract in contracts:
+            key = (chain, contract)
+            entry = hot_tokens.get(key)
+            if entry is None:
+                if len(hot_tokens) >= HOT_TOKEN_MAX:
+                    coldest = min(hot_tokens, key=lambda k: hot_tokens[k]['requests'])
+                    del hot_tokens[coldest]
+                    price_refresh_stats['hot_evictions'] += 1
+                entry = hot_tokens[key] = {'requests': 0, 'last_requested': now}
+            entry['requests'] += 1
+            entry['last_requested'] = now
+
+def stale_price(contract, chain=DEFAULT_CHAIN):
+    """A recently expired cached price, queued for background refresh; None if too old"""
+    entry = price_cache_peek(contract, chain)
+    if entry is None or time.time() - entry['expires'] > PRICE_STALE_GRACE:
+        return None
+    with hot_tokens_lock:
+        price_revalidate.add((chain, contract.lower()))
+        price_refresh_stats['stale_served'] += 1
+    price_refresh_wakeup.set()
+    return entry['price']
+
+def refresh_hot_prices():
+    """One worker pass: re-price revalidation requests and hot contracts about to expire"""
+    now = time.time()
+    with hot_tokens_lock:
+        for key in [k for k, entry in hot_tokens.items() if now - entry['last_requested'] > HOT_TOKEN_IDLE_SECONDS]:
+            del hot_tokens[key]
+        due = set(price_revalidate)
+        price_revalidate.clear()
+        hot = list(hot_tokens)
     
-    for contract in limited_addresses:
-        contract_lower = contract.lower()
-        
-        # Check if it's a known stablecoin
-        if contract_lower in STABLECOINS:
-            all_prices[contract_lower] = STABLECOINS[contract_lower]
-            print(f"✓ {contract[:8]}... = $1.00 (stablecoin)")
-            continue
-        
-        # Try CoinGecko
+    # Contracts with no entry yet are being fetched by the request that first asked for them
+    for chain, contract in hot:
+        entry = price_cache_peek(contract, chain)
+        if entry is not None and entry['expires'] - now <= PRICE_REFRESH_AHEAD:
+            due.add((chain, contract))
+    
+    # One batch per chain: each chain is priced against its own CoinGecko platform
+    for chain, keys in groupby(sorted(due), key=itemgetter(0)):
+        contracts = [contract for _, contract in keys]
+        if NATIVE_TOKEN in contracts:
+            contracts.remove(NATIVE_TOKEN)
+            single_flight(('native_price', chain), fetch_native_price, chain)
+            price_refresh_stats['tokens_refreshed'] += 1
+        if contracts:
+            fetch_token_prices(contracts, chain)
+            price_refresh_stats['tokens_refreshed'] += len(contracts)
+    price_refresh_stats['passes'] += 1
+
+def price_refresher():
+    while True:
+        price_refresh_wakeup.wait(PRICE_REFRESH_INTERVAL)
+        price_refresh_wakeup.clear()
         try:
-            url = f"{COINGECKO_API}/simple/token_price/ethereum"
-            params = {
-                'contract_addresses': contract,
-                'vs_currencies': 'usd'
-            }
-            
-            response = requests.get(url, params=params, timeout=5)
-            data = response.json()
+            refresh_hot_prices()
+        except Exception as e:
+            log.warning("Background price refresh failed: %s", e)
+
+def start_price_refresher():
+    global price_refresh_thread
+    if price_refresh_thread is not None:
+        return
+    with hot_tokens_lock:
+        if price_refresh_thread is None:
+            price_refresh_thread = threading.Thread(target=price_refresher, name='price-refresher', daemon=True)
+            price_refresh_thread.start()
+
+def get_price_refresh_stats():
+    with hot_tokens_lock:
+        stats = dict(price_refresh_stats)
+        stats['hot_tokens'] = len(hot_tokens)
+        stats['pending_revalidation'] = len(price_revalidate)
+    stats['max_hot_tokens'] = HOT_TOKEN_MAX
+    return stats
+
+# Response cache for polled GET endpoints: the serialized JSON is kept per path + query for a
+# short TTL and validated with ETag / Last-Modified, so a repeat poll costs no upstream calls
+# and, when nothing changed, only a 304. Expired entries are kept (LRU-bounded) so an
+# unchanged body keeps its original Last-Modified.
+WALLET_RESPONSE_TTL = int(os.environ.get('WALLET_RESPONSE_TTL', 15))
+TRANSACTIONS_RESPONSE_TTL = int(os.environ.get('TRANSACTIONS_RESPONSE_TTL', 30))
+TOKEN_PRICE_RESPONSE_TTL = NATIVE_PRICE_CACHE_DURATION
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 2000))
+
+response_cache_lock = threading.Lock()
+response_cache = OrderedDict()  # (path, query) -> {'body', 'mimetype', 'etag', 'last_modified', 'expires'}
+response_cache_stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'uncacheable': 0}
+
+def response_cache_key():
+    return (request.path, tuple(sorted(request.args.items(multi=True))))
+
+def build_cached_entry(key, view, args, kwargs, ttl):
+    """Run the view and store its body; errors and partial results are not cached"""
+    response = app.make_response(view(*args, **kwargs))
+    body = response.get_data()
+    data = response.get_json(silent=True)
+    if response.status_code != 200 or (isinstance(data, dict) and data.get('partial')):
+        with response_cache_lock:
+            response_cache_stats['uncacheable'] += 1
+        return {'body': body, 'mimetype': response.mimetype, 'status': response.status_code, 'cacheable': False}
+    
+    etag = hashlib.sha1(body).hexdigest()
+    now = time.time()
+    with response_cache_lock:
+        previous = response_cache.get(key)
+        last_modified = previous['last_modified'] if previous and previous['etag'] == etag else now
+        entry = {'body': body, 'mimetype': response.mimetype, 'etag': etag,
+                 'last_modified': last_modified, 'expires': now + ttl, 'cacheable': True}
+        response_cache[key] = entry
+        response_cache.move_to_end(key)
+        while len(response_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+            response_cache.popitem(last=False)
+    return entry
+
+def cached_response(ttl):
+    """Serve a GET view from the response cache with ETag/Last-Modified and 304s.
+    ttl is seconds, or a function returning seconds for the current request"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = response_cache_key()
+            seconds = ttl() if callable(ttl) else ttl
+            with response_cache_lock:
+                entry = response_cache.get(key)
+                if entry is not None and entry['expires'] <= time.time():
+                    entry = None
+                response_cache_stats['misses' if entry is None else 'hits'] += 1
             
-            # DEBUG: Print full response
-            print(f"DEBUG - CoinGecko response for {contract[:8]}...: {data}")
+            if entry is None:
+                # Concurrent polls of the same URL share one recomputation
+                entry, _ = single_flight(('response', key), build_cached_entry, key, view, args, kwargs, seconds)
+                if not entry['cacheable']:
+                    return Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'],
+                                    headers={'Cache-Control': 'no-store'})
             
-            if isinstance(data, dict) and contract_lower in data:
-                price_data = data[contract_lower]
-                if isinstance(price_data, dict) and 'usd' in price_data:
-                    price = price_data['usd']
-                    all_prices[contract_lower] = price
-                    print(f"✓ {contract[:8]}... = ${price} (CoinGecko)")
-                    time.sleep(0.5)
-                    continue
-            else:
-                print(f"DEBUG - Keys in response: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+            response = Response(entry['body'], mimetype=entry['mimetype'])
+            response.set_etag(entry['etag'])
+            response.last_modified = entry['last_modified']
+            max_age = max(0, int(entry['expires'] - time.time()))
+            response.headers['Cache-Control'] = f'public, max-age={max_age}, stale-while-revalidate={seconds}'
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                with response_cache_lock:
+                    response_cache_stats['not_modified'] += 1
+            return response
+        return wrapper
+    return decorator
+
+def get_response_cache_stats():
+    with response_cache_lock:
+        stats = dict(response_cache_stats)
+        stats['entries'] = len(response_cache)
+    stats['max_entries'] = RESPONSE_CACHE_MAX_ENTRIES
+    return stats
+
+# Precomputed snapshots for hot wallets: the landing page's demo wallets plus the most watched
+# and viewed addresses have their /api/wallet and /risk-analysis responses stored in SQLite
+# (shared by every worker) and served as-is with a version and age. A worker revalidates a
+# wallet snapshot once the chain is SNAPSHOT_REFRESH_BLOCKS past the block it was computed
+# at, a risk snapshot once the wallet's held tokens change, and either one past its max age;
+# until then (and for SNAPSHOT_STALE_GRACE after) requests never wait on an upstream.
+DEMO_WALLETS = [
+    '0x742d35cc6634c0532925a3b844bc454e4438f44e',
+    '0x8bA1f109551bD432803012645Ac136ddd64DBA72',
+    '0x49e833337ecefa0cab47fa4160bed2b8092b5d10',
+    '0x8576acc5c05d6ce88f4e49bf65bdf0c62f91353c',
+    '0x21a31ee1afc51d94c2efccaa2092ad1028285549',
+]
+SNAPSHOT_HOT_WALLETS = int(os.environ.get('SNAPSHOT_HOT_WALLETS', 20))  # Watched/viewed wallets precomputed besides the demo ones
+SNAPSHOT_MIN_VIEWS = 3  # Views before a wallet can be picked as hot
+SNAPSHOT_VIEW_IDLE_SECONDS = 3600  # Wallets nobody viewed for this long stop counting
+SNAPSHOT_TRACKED_MAX = 1000  # View counters kept; the least-viewed wallet is dropped when full
+SNAPSHOT_REFRESH_INTERVAL = float(os.environ.get('SNAPSHOT_REFRESH_INTERVAL', 30))
+SNAPSHOT_MIN_PASS_SECONDS = 5  # Wake-ups closer together than this are merged into one pass
+SNAPSHOT_REFRESH_BLOCKS = int(os.environ.get('SNAPSHOT_REFRESH_BLOCKS', 5))  # ~1 minute of Ethereum blocks
+SNAPSHOT_MAX_AGE = {'wallet': 300, 'risk': 3600}  # Seconds before a snapshot is recomputed whatever the chain did
+SNAPSHOT_STALE_GRACE = 3600  # Seconds past its max age a snapshot is still served while it refreshes
+SNAPSHOT_POOL_SIZE = 8  # Threads for the worker's upstream calls, apart from the request pools
+# A process refreshes a wallet only while it holds the wallet's lease in SQLite, so N
+# gunicorn workers don't recompute the same snapshots N times; the holder renews it every
+# pass and another process takes over once it lapses
+SNAPSHOT_LEASE_SECONDS = 2 * SNAPSHOT_REFRESH_INTERVAL + WALLET_MAX_DEADLINE_SECONDS
+
+snapshot_lock = threading.Lock()
+snapshot_wakeup = threading.Event()
+snapshot_thread = None
+wallet_views = {}  # address -> {'views', 'last_viewed'}
+hot_wallets = {address.lower() for address in DEMO_WALLETS}  # Re-selected on every worker pass
+snapshot_stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'passes': 0, 'revalidations': 0,
+                  'unchanged': 0, 'failures': 0, 'leased_elsewhere': 0, 'head_block': None}
+snapshot_executor = TracingExecutor(max_workers=SNAPSHOT_POOL_SIZE, thread_name_prefix='snapshot')
+
+def claim_snapshot_lease(address):
+    """Take or renew this process's lease on refreshing a wallet; False while another
+    process holds it"""
+    conn = get_db()
+    owner = str(os.getpid())  # Read per call: gunicorn forks its workers after import
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('SELECT owner, expires_at FROM snapshot_leases WHERE address = ?', (address,)).fetchone()
+        claimed = row is None or row[0] == owner or row[1] <= now
+        if claimed:
+            conn.execute('INSERT OR REPLACE INTO snapshot_leases (address, owner, expires_at) VALUES (?, ?, ?)',
+                         (address, owner, now + SNAPSHOT_LEASE_SECONDS))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return claimed
+
+def head_block_params(chain=DEFAULT_CHAIN):
+    return {
+        'chainid': CHAINS[chain]['chain_id'],
+        'module': 'proxy',
+        'action': 'eth_blockNumber',
+        'apikey': ETHERSCAN_API_KEY
+    }
+
+def get_head_block(chain=DEFAULT_CHAIN):
+    """Latest block number, or None when Etherscan didn't answer with one"""
+    try:
+        return int(upstream_get(ETHERSCAN_API, params=head_block_params(chain)).json()['result'], 16)
+    except Exception as e:
+        log.warning("Error fetching head block: %s", e)
+        return None
+
+def holdings_fingerprint(token_holdings):
+    """Identity of the set of tokens a wallet holds; a risk report is redone when it changes"""
+    return hashlib.sha1(','.join(sorted(h['contract'].lower() for h in token_holdings)).encode()).hexdigest()
+
+def load_snapshot(address, kind):
+    row = get_db().execute(
+        'SELECT version, block, computed_at, etag, holdings, payload FROM wallet_snapshots WHERE address = ? AND kind = ?',
+        (address, kind)).fetchone()
+    if row is None:
+        return None
+    return dict(zip(('version', 'block', 'computed_at', 'etag', 'holdings', 'payload'), row))
+
+def save_snapshot(address, kind, payload, block, holdings):
+    """Store a freshly computed response; its version only moves on when the content changed.
+    Returns True when it did"""
+    body = json.dumps(payload, sort_keys=True)
+    etag = hashlib.sha1(body.encode()).hexdigest()
+    conn = get_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute('SELECT version, etag FROM wallet_snapshots WHERE address = ? AND kind = ?',
+                           (address, kind)).fetchone()
+        changed = row is None or row[1] != etag
+        version = 1 if row is None else row[0] + changed
+        conn.execute(
+            'INSERT OR REPLACE INTO wallet_snapshots (address, kind, version, block, computed_at, etag, holdings, payload) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (address, kind, version, block, time.time(), etag, holdings, body))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return changed
+
+def snapshot_due(snapshot, kind, head_block, holdings=None):
+    """Whether a snapshot needs recomputing: missing, past its max age, behind the chain
+    (wallet) or computed over a different set of held tokens (risk)"""
+    if snapshot is None or time.time() - snapshot['computed_at'] >= SNAPSHOT_MAX_AGE[kind]:
+        return True
+    if kind == 'wallet':
+        return head_block is not None and (snapshot['block'] is None or head_block - snapshot['block'] >= SNAPSHOT_REFRESH_BLOCKS)
+    return holdings is not None and snapshot['holdings'] != holdings
+
+def record_wallet_view(address):
+    """Count a view of a lowercase address; True when the wallet is hot"""
+    start_snapshot_refresher()
+    now = time.time()
+    with snapshot_lock:
+        entry = wallet_views.get(address)
+        if entry is None:
+            if len(wallet_views) >= SNAPSHOT_TRACKED_MAX:
+                coldest = min(wallet_views, key=lambda a: wallet_views[a]['views'])
+                del wallet_views[coldest]
+            entry = wallet_views[address] = {'views': 0, 'last_viewed': now}
+        entry['views'] += 1
+        entry['last_viewed'] = now
+        hot = address in hot_wallets
+    if not hot and entry['views'] == SNAPSHOT_MIN_VIEWS:
+        # A candidate for the hot set - let the worker reconsider it now
+        snapshot_wakeup.set()
+    return hot
+
+def select_hot_wallets():
+    """Demo wallets, then watched wallets, then the most viewed ones, up to SNAPSHOT_HOT_WALLETS
+    beyond the demo set"""
+    global hot_wallets
+    watched, _ = watched_keys()
+    now = time.time()
+    with snapshot_lock:
+        for address in [a for a, entry in wallet_views.items() if now - entry['last_viewed'] > SNAPSHOT_VIEW_IDLE_SECONDS]:
+            del wallet_views[address]
+        viewed = sorted((a for a, entry in wallet_views.items() if entry['views'] >= SNAPSHOT_MIN_VIEWS),
+                        key=lambda a: wallet_views[a]['views'], reverse=True)
+    selected = {address.lower() for address in DEMO_WALLETS}
+    candidates = [a for a in dict.fromkeys(sorted(a.lower() for a in watched) + viewed) if a not in selected]
+    selected.update(candidates[:SNAPSHOT_HOT_WALLETS])
+    with snapshot_lock:
+        hot_wallets = selected
+    return sorted(selected)
+
+def refresh_snapshots():
+    """One worker pass: re-select the hot wallets and recompute their snapshots that are due.
+    Only wallets whose lease this process holds are touched"""
+    wallets = select_hot_wallets()
+    owned = [address for address in wallets if claim_snapshot_lease(address)]
+    snapshot_stats['leased_elsewhere'] = len(wallets) - len(owned)
+    if not owned:
+        snapshot_stats['passes'] += 1
+        return
+    head_block = get_head_block()
+    if head_block is not None:
+        snapshot_stats['head_block'] = head_block
+    
+    # Wallet snapshots first, all due wallets in flight at once like a portfolio request,
+    # on the worker's own pool (and at background priority, see snapshot_refresher)
+    deadline = time.monotonic() + WALLET_MAX_DEADLINE_SECONDS
+    fetches = [begin_wallet_fetch(address, executor=snapshot_executor) for address in owned
+               if snapshot_due(load_snapshot(address, 'wallet'), 'wallet', head_block)]
+    for fetch in fetches:
+        price_wallet_holdings(fetch, deadline)
+    for fetch in fetches:
+        response = finish_wallet_fetch(fetch, deadline)
+        store_snapshot(fetch['address'], 'wallet', response, head_block, holdings_fingerprint(response['token_holdings']))
+    
+    # Risk reports follow the holdings the wallet snapshots just saw
+    for address in owned:
+        wallet = load_snapshot(address, 'wallet')
+        if not snapshot_due(load_snapshot(address, 'risk'), 'risk', head_block, wallet and wallet['holdings']):
+            continue
+        try:
+            # Renewed per report: a pass of slow reports can outlast the lease
+            if not claim_snapshot_lease(address):
+                continue
+            token_holdings = get_token_balances(address)
+            report = compute_risk_report(address, token_holdings, time.monotonic() + RISK_DEADLINE_SECONDS,
+                                         snapshot_executor)
         except Exception as e:
-            print(f"CoinGecko failed for {contract[:8]}...: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # If CoinGecko fails, try 1inch
-        price_1inch = get_price_from_1inch(contract)
-        if price_1inch > 0:
-            all_prices[contract_lower] = price_1inch
-            print(f"✓ {contract[:8]}... = ${price_1inch} (1inch)")
-        else:
-            all_prices[contract_lower] = 0
-            print(f"✗ {contract[:8]}... - No price found")
-        
-        time.sleep(0.5)
+            log.warning("Error computing risk snapshot for %s: %s", address, e)
+            snapshot_stats['failures'] += 1
+            continue
+        store_snapshot(address, 'risk', report, head_block, holdings_fingerprint(token_holdings))
+    snapshot_stats['passes'] += 1
+
+def store_snapshot(address, kind, payload, block, holdings):
+    # A partial result keeps the previous snapshot; the wallet is retried on the next pass
+    if payload.get('partial'):
+        snapshot_stats['failures'] += 1
+        return
+    try:
+        changed = save_snapshot(address, kind, payload, block, holdings)
+    except Exception as e:
+        log.warning("Error saving %s snapshot for %s: %s", kind, address, e)
+        snapshot_stats['failures'] += 1
+        return
+    snapshot_stats['revalidations' if changed else 'unchanged'] += 1
+    log.debug("snapshot kind=%s address=%s block=%s changed=%s", kind, address, block, changed)
+
+def snapshot_refresher():
+    # Everything the worker sends upstream yields the rate budget to live requests
+    upstream_priority.set('background')
+    last_pass = 0
+    while True:
+        # Passes run back to back at most every SNAPSHOT_MIN_PASS_SECONDS, however often woken
+        time.sleep(max(0, last_pass + SNAPSHOT_MIN_PASS_SECONDS - time.monotonic()))
+        last_pass = time.monotonic()
+        try:
+            refresh_snapshots()
+        except Exception as e:
+            log.warning("Snapshot refresh failed: %s", e)
+        snapshot_wakeup.wait(SNAPSHOT_REFRESH_INTERVAL)
+        snapshot_wakeup.clear()
+
+def start_snapshot_refresher():
+    global snapshot_thread
+    if snapshot_thread is not None:
+        return
+    with snapshot_lock:
+        if snapshot_thread is None:
+            snapshot_thread = threading.Thread(target=snapshot_refresher, name='snapshot-refresher', daemon=True)
+            snapshot_thread.start()
+
+def snapshot_for_request(address, kind):
+    """The stored response for a hot wallet, with its snapshot version and age, as
+    (payload, etag); None when it has to be computed live"""
+    if not record_wallet_view(address.lower()):
+        return None
+    try:
+        snapshot = load_snapshot(address.lower(), kind)
+    except Exception as e:
+        log.warning("Error loading snapshot: %s", e)
+        snapshot = None
+    age = time.time() - snapshot['computed_at'] if snapshot else None
+    if snapshot is None or age > SNAPSHOT_MAX_AGE[kind] + SNAPSHOT_STALE_GRACE:
+        snapshot_stats['misses'] += 1
+        snapshot_wakeup.set()
+        return None
     
-    # Remaining tokens get 0
-    if len(contract_addresses) > 15:
-        print(f"⚠️  Only fetched prices for first 15 tokens (rate limit)")
-        for contract in contract_addresses[15:]:
-            all_prices[contract.lower()] = 0
+    stale = age > SNAPSHOT_MAX_AGE[kind]
+    snapshot_stats['hits'] += 1
+    if stale:
+        snapshot_stats['stale_hits'] += 1
+    payload = json.loads(snapshot['payload'])
+    payload['address'] = address
+    payload['snapshot'] = {
+        'version': snapshot['version'],
+        'block': snapshot['block'],
+        'computed_at': int(snapshot['computed_at']),
+        'age_seconds': int(age),
+        'stale': stale
+    }
+    return payload, snapshot['etag']
+
+def snapshot_response(kind):
+    """Answer hot wallets on Ethereum from their snapshot, everything else from the wrapped view.
+    The weak ETag follows the snapshot's content, so an unchanged one revalidates with a 304"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            address = kwargs.get('address', '')
+            if kwargs.get('chain', DEFAULT_CHAIN) == DEFAULT_CHAIN and address.startswith('0x') and len(address) == 42:
+                found = snapshot_for_request(address, kind)
+                if found is not None:
+                    payload, etag = found
+                    response = jsonify(payload)
+                    response.set_etag(etag, weak=True)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response.make_conditional(request)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_snapshot_stats():
+    """Snapshot hits (stale_hits: served past their max age), misses and worker progress"""
+    stats = dict(snapshot_stats)
+    with snapshot_lock:
+        stats['hot_wallets'] = len(hot_wallets)
+        stats['tracked_wallets'] = len(wallet_views)
+    try:
+        stats['entries'] = get_db().execute('SELECT COUNT(*) FROM wallet_snapshots').fetchone()[0]
+    except Exception as e:
+        log.warning("Error counting snapshots: %s", e)
+    return stats
+
+def begin_wallet_fetch(address, chain=DEFAULT_CHAIN, executor=upstream_executor):
+    """Start a wallet's independent fetches on one chain: native balance, native price and
+    token holdings. The returned state goes through price_wallet_holdings() and then
+    finish_wallet_fetch(), so several wallets or chains can be in flight at once."""
+    return {
+        'address': address,
+        'chain': chain,
+        'executor': executor,
+        'data_status': {},
+        'eth_balance': executor.submit(get_eth_balance, address, chain),
+        'eth_price': executor.submit(get_native_price, chain),
+        'holdings': executor.submit(get_token_balances, address, chain),
+        'prices': None
+    }
+
+def price_wallet_holdings(fetch, deadline):
+    """Wait for the holdings and start pricing them - prices depend on the holdings"""
+    token_holdings, fetch['data_status']['token_holdings'] = result_by_deadline(fetch['holdings'], deadline, [])
+    fetch['token_holdings'] = token_holdings
+    if token_holdings:
+        contract_addresses = [holding['contract'] for holding in token_holdings]
+        fetch['prices'] = fetch['executor'].submit(get_all_token_prices, contract_addresses, fetch['chain'])
+
+def finish_wallet_fetch(fetch, deadline):
+    """Collect the remaining results by the deadline and build the wallet response"""
+    data_status = fetch['data_status']
+    eth_balance, data_status['eth_balance'] = result_by_deadline(fetch['eth_balance'], deadline, 0)
+    eth_price, data_status['eth_price'] = result_by_deadline(fetch['eth_price'], deadline, None)
     
-    return all_prices
+    token_prices = {}
+    if fetch['prices'] is not None:
+        token_prices, data_status['token_prices'] = result_by_deadline(fetch['prices'], deadline, {})
+    else:
+        data_status['token_prices'] = data_status['token_holdings']
+    
+    return build_wallet_response(fetch['address'], eth_balance, eth_price, fetch['token_holdings'],
+                                 token_prices, data_status, fetch['chain'])
+
+def wallet_deadline():
+    """Per-request deadline (?deadline= seconds); upstreams that miss it are reported instead of waited on"""
+    deadline_seconds = request.args.get('deadline', WALLET_DEADLINE_SECONDS, type=float)
+    deadline_seconds = min(max(deadline_seconds, 1), WALLET_MAX_DEADLINE_SECONDS)
+    return time.monotonic() + deadline_seconds
 
 @app.route('/api/wallet/<address>', methods=['GET'])
-def get_wallet_info(address):
+@app.route(f'/api/<{CHAIN_CONVERTER}:chain>/wallet/<address>', methods=['GET'])
+@snapshot_response('wallet')
+@cached_response(WALLET_RESPONSE_TTL)
+def get_wallet_info(address, chain=DEFAULT_CHAIN):
     """Main endpoint to get wallet balance and holdings with USD values"""
     
     if not address.startswith('0x') or len(address) != 42:
         return jsonify({'error': 'Invalid Ethereum address'}), 400
     
-    # Get ETH balance
-    eth_balance = get_eth_balance(address)
+    deadline = wallet_deadline()
+    fetch = begin_wallet_fetch(address, chain)
+    price_wallet_holdings(fetch, deadline)
+    return jsonify(finish_wallet_fetch(fetch, deadline))
+
+def parse_chains(value):
+    """?chains=base,arbitrum -> chain names in request order (all chains when empty);
+    raises ValueError naming an unknown chain"""
+    if not value:
+        return list(CHAINS)
+    chains = list(dict.fromkeys(name.strip().lower() for name in value.split(',') if name.strip()))
+    for chain in chains:
+        if chain not in CHAINS:
+            raise ValueError(f"Unknown chain {chain!r}; expected one of {', '.join(CHAINS)}")
+    return chains
+
+@app.route('/api/portfolio/<address>', methods=['GET'])
+@cached_response(WALLET_RESPONSE_TTL)
+def get_portfolio(address):
+    """One wallet across several chains (?chains=, default all) in a single request.
     
-    # Get ETH price
-    eth_price = get_eth_price()
-    eth_value_usd = eth_balance * eth_price
+    Every chain's balance, native price and holdings are fetched at once, then each chain's
+    holdings are priced as they arrive, so the request takes about as long as the slowest
+    chain rather than the sum of them.
+    """
+    if not address.startswith('0x') or len(address) != 42:
+        return jsonify({'error': 'Invalid Ethereum address'}), 400
+    try:
+        chains = parse_chains(request.args.get('chains'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    deadline = wallet_deadline()
+    fetches = [begin_wallet_fetch(address, chain) for chain in chains]
+    for fetch in fetches:
+        price_wallet_holdings(fetch, deadline)
+    return jsonify(build_portfolio_response(address, [finish_wallet_fetch(fetch, deadline) for fetch in fetches]))
+
+def build_portfolio_response(address, wallets):
+    """Per-chain wallet responses plus cross-chain totals (shared by the ASGI server)"""
+    return {
+        'address': address,
+        'chains': wallets,
+        'value_by_chain': {wallet['chain']: wallet['total_portfolio_value_usd'] for wallet in wallets},
+        'total_token_value_usd': round(sum(wallet['total_token_value_usd'] for wallet in wallets), 2),
+        'total_portfolio_value_usd': round(sum(wallet['total_portfolio_value_usd'] for wallet in wallets), 2),
+        'holdings_count': sum(wallet['holdings_count'] for wallet in wallets),
+        'partial': any(wallet['partial'] for wallet in wallets)
+    }
+
+def build_chains_response():
+    """Chains the wallet, token-price and portfolio endpoints accept (shared by the ASGI server)"""
+    return {
+        'default': DEFAULT_CHAIN,
+        'chains': [{'id': chain, 'chain_id': info['chain_id'], 'name': info['name'], 'native_symbol': info['native_symbol']}
+                   for chain, info in CHAINS.items()]
+    }
+
+@app.route('/api/chains', methods=['GET'])
+def get_chains():
+    return jsonify(build_chains_response())
+
+def value_holding(holding, price):
+    holding['price_usd'] = round(price, 2) if price else 0
+    holding['value_usd'] = round(holding['balance'] * price, 2) if price else 0
+    return holding
+
+def value_holdings(token_holdings, token_prices):
+    """Columnar valuation: join holdings against the price table, value, total and sort.
+    Returns (holdings sorted by USD value, total token value)"""
+    if not token_holdings:
+        return token_holdings, 0
     
-    # Get token holdings
-    token_holdings = get_token_balances(address)
+    contracts = map(str.lower, map(itemgetter('contract'), token_holdings))
+    prices = list(map(token_prices.get, contracts, repeat(0)))
+    values = list(map(round, map(mul, map(itemgetter('balance'), token_holdings), prices), repeat(2)))
+    rounded_prices = list(map(round, prices, repeat(2)))
     
-    # Get prices for all tokens at once
-    if token_holdings:
-        contract_addresses = [holding['contract'] for holding in token_holdings]
-        token_prices = get_all_token_prices(contract_addresses)
-        
-        # Add USD values to each holding
-        for holding in token_holdings:
-            price = token_prices.get(holding['contract'].lower(), 0)
-            holding['price_usd'] = round(price, 2) if price else 0
-            holding['value_usd'] = round(holding['balance'] * price, 2) if price else 0
+    for holding, price, value in zip(token_holdings, rounded_prices, values):
+        holding['price_usd'] = price
+        holding['value_usd'] = value
     
-    # Calculate total portfolio value
-    total_token_value = sum(h['value_usd'] for h in token_holdings)
-    total_value_usd = eth_value_usd + total_token_value
+    order = sorted(range(len(values)), key=values.__getitem__, reverse=True)
+    return list(map(token_holdings.__getitem__, order)), math.fsum(values)
+
+def build_wallet_response(address, eth_balance, eth_price, token_holdings, token_prices, data_status, chain=DEFAULT_CHAIN):
+    """Value the holdings and assemble the /api/wallet JSON (shared by the ASGI server).
+    On other chains the eth_* fields hold the chain's native coin (see native_symbol)"""
+    if eth_price is None:
+        # Fall back to the last cached price, however old, rather than reporting nothing
+        cached = price_cache_peek(NATIVE_TOKEN, chain)
+        eth_price = cached['price'] if cached else 0
+        data_status['eth_price'] = 'stale' if eth_price > 0 else 'missing'
+    # A last-known-good price re-served while every provider is down
+    eth_price_entry = price_cache_peek(NATIVE_TOKEN, chain)
+    eth_price_stale = bool(eth_price_entry and eth_price_entry['stale'] and eth_price_entry['price'] == eth_price)
+    if eth_price_stale:
+        data_status['eth_price'] = 'stale'
+    eth_value_usd = eth_balance * eth_price
     
-    # Sort holdings by USD value (highest first)
-    token_holdings.sort(key=lambda x: x['value_usd'], reverse=True)
+    # Value, total and sort all holdings column-wise (highest value first)
+    token_holdings, total_token_value = value_holdings(token_holdings, token_prices)
+    total_value_usd = eth_value_usd + total_token_value
     
     response = {
         'address': address,
+        'chain': chain,
+        'native_symbol': CHAINS[chain]['native_symbol'],
         'eth_balance': round(eth_balance, 6),
         'eth_price_usd': round(eth_price, 2),
         'eth_value_usd': round(eth_value_usd, 2),
         'token_holdings': token_holdings,
         'total_token_value_usd': round(total_token_value, 2),
         'total_portfolio_value_usd': round(total_value_usd, 2),
-        'holdings_count': len(token_holdings)
+        'holdings_count': len(token_holdings),
+        'data_status': data_status,
+        'partial': any(status != 'ok' for status in data_status.values())
     }
+    if eth_price_stale:
+        response['eth_price_updated_at'] = int(eth_price_entry['updated'])
     
-    return jsonify(response)
+    return response
+
+BULK_MAX_WALLETS = int(os.environ.get('BULK_MAX_WALLETS', 100))
+BULK_HOLDINGS_PER_REQUEST = 8  # Ledger walks one bulk request runs at once on the shared pool
+
+def iter_bulk_holdings(addresses, deadline):
+    """get_token_balances for each address, BULK_HOLDINGS_PER_REQUEST at a time; yields
+    (address, holdings, 'ok' | 'missing') as each finishes. At the deadline the rest are
+    yielded as missing: running walks are cancelled and queued ones are never submitted"""
+    queued = deque(addresses)
+    running = {}
+    try:
+        while queued or running:
+            while queued and len(running) < BULK_HOLDINGS_PER_REQUEST:
+                address = queued.popleft()
+                running[upstream_executor.submit(get_token_balances, address)] = address
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield (running.pop(future),) + result_by_deadline(future, deadline, [])
+        for address in [*running.values(), *queued]:
+            yield address, [], 'missing'
+    finally:
+        for future in running:
+            future.cancel()
+
+def price_contracts_by_deadline(contracts, known_prices, deadline, chain=DEFAULT_CHAIN):
+    """Add the contracts' prices to known_prices: cached ones at once, the rest fetched until
+    the deadline. Returns the contracts left unpriced because a fetch failed or ran late"""
+    prices, pending = split_cached_prices(contracts, chain)
+    known_prices.update(prices)
+    if not pending:
+        return set()
+    fetched, _ = result_by_deadline(upstream_executor.submit(fetch_token_prices, pending, chain), deadline, {})
+    known_prices.update(fetched)
+    # A fetch zero-fills what no source priced but caches only what a source answered for
+    now = time.time()
+    unpriced = set()
+    for contract in pending:
+        entry = price_cache_peek(contract, chain)
+        if contract not in fetched or (not fetched[contract] and not (entry and entry['expires'] > now)):
+            unpriced.add(contract)
+    return unpriced
+
+@app.route('/api/wallets', methods=['POST'])
+def get_wallets_bulk():
+    """Wallet info for many addresses at once: {"addresses": [...], "stream": false}.
+    
+    ETH balances come from batched balancemulti calls and token prices are looked up once
+    across all wallets. With stream=true (or ?stream=1) each wallet is sent as an NDJSON
+    line as soon as it is ready.
+    """
+    body = request.get_json(silent=True) or {}
+    addresses = body.get('addresses')
+    if not isinstance(addresses, list) or not addresses:
+        return jsonify({'error': 'Expected a JSON body with a non-empty "addresses" list'}), 400
+    
+    addresses = list(dict.fromkeys(a for a in addresses if isinstance(a, str)))
+    invalid = [a for a in addresses if not a.startswith('0x') or len(a) != 42]
+    if invalid:
+        return jsonify({'error': 'Invalid Ethereum address', 'invalid': invalid}), 400
+    if len(addresses) > BULK_MAX_WALLETS:
+        return jsonify({'error': f'At most {BULK_MAX_WALLETS} addresses per request'}), 400
+    
+    stream = bool(body.get('stream')) or request.args.get('stream') == '1'
+    deadline = time.monotonic() + WALLET_MAX_DEADLINE_SECONDS
+    
+    eth_price_future = upstream_executor.submit(get_native_price)
+    eth_balances_future = upstream_executor.submit(get_eth_balances, [a.lower() for a in addresses])
+    
+    def wallet_results():
+        eth_price, eth_price_status = result_by_deadline(eth_price_future, deadline, None)
+        eth_balances, _ = result_by_deadline(eth_balances_future, deadline, {})
+        known_prices = {}
+        unpriced = set()
+        
+        def prices_status(token_holdings, holdings_status):
+            if holdings_status != 'ok':
+                return holdings_status
+            held = {h['contract'].lower() for h in token_holdings}
+            missing = held & unpriced
+            return 'ok' if not missing else 'missing' if missing == held else 'partial'
+        
+        def build(address, token_holdings, holdings_status):
+            data_status = {
+                'eth_balance': 'ok' if address.lower() in eth_balances else 'missing',
+                'eth_price': eth_price_status,
+                'token_holdings': holdings_status,
+                'token_prices': prices_status(token_holdings, holdings_status)
+            }
+            return build_wallet_response(address, eth_balances.get(address.lower(), 0), eth_price,
+                                         token_holdings, known_prices, data_status)
+        
+        if not stream:
+            # Price every contract held by any wallet in one pass
+            holdings = {address: (token_holdings, status)
+                        for address, token_holdings, status in iter_bulk_holdings(addresses, deadline)}
+            contracts = [h['contract'] for token_holdings, _ in holdings.values() for h in token_holdings]
+            unpriced.update(price_contracts_by_deadline(contracts, known_prices, deadline))
+            for address in addresses:
+                yield build(address, *holdings[address])
+            return
+        
+        # Streaming: price each wallet as its holdings arrive, fetching only contracts not seen yet
+        for address, token_holdings, holdings_status in iter_bulk_holdings(addresses, deadline):
+            new_contracts = [h['contract'].lower() for h in token_holdings if h['contract'].lower() not in known_prices]
+            # Contracts a late fetch left unpriced are tried again with the next wallet
+            unpriced.difference_update(new_contracts)
+            unpriced.update(price_contracts_by_deadline(new_contracts, known_prices, deadline))
+            yield build(address, token_holdings, holdings_status)
+    
+    if stream:
+        return Response((json.dumps(wallet) + '\n' for wallet in wallet_results()), mimetype='application/x-ndjson')
+    
+    wallets = list(wallet_results())
+    return jsonify({
+        'wallets': wallets,
+        'count': len(wallets),
+        'total_portfolio_value_usd': round(sum(w['total_portfolio_value_usd'] for w in wallets), 2)
+    })
 
 @app.route('/api/token-price/<contract>', methods=['GET'])
-def get_token_price_endpoint(contract):
+@app.route(f'/api/<{CHAIN_CONVERTER}:chain>/token-price/<contract>', methods=['GET'])
+@cached_response(TOKEN_PRICE_RESPONSE_TTL)
+def get_token_price_endpoint(contract, chain=DEFAULT_CHAIN):
     """Endpoint to get price for a specific token contract"""
-    price = get_token_price_by_contract(contract)
+    price = get_token_price_by_contract(contract, chain)
     return jsonify({
         'contract': contract,
+        'chain': chain,
         'price_usd': price
     })
 
-def get_normal_transactions(address, limit=50):
-    """Get normal ETH transactions"""
+def recent_tx_params(action, address, limit):
+    return {
+        'chainid': '1',
+        'module': 'account',
+        'action': action,
+        'address': address,
+        'startblock': 0,
+        'endblock': 99999999,
+        'page': 1,
+        'offset': limit,
+        'sort': 'desc',
+        'apikey': ETHERSCAN_API_KEY
+    }
+
+def parse_normal_transaction(address, tx):
+    tx_type = 'receive' if tx['to'].lower() == address.lower() else 'send'
+    value_eth = int(tx['value']) / 10**18
+    
+    # Convert timestamp properly - Etherscan returns Unix timestamp
+    timestamp = int(tx['timeStamp'])
+    
+    return {
+        'hash': tx['hash'],
+        'type': tx_type,
+        'from': tx['from'],
+        'to': tx['to'],
+        'value_eth': round(value_eth, 6),
+        'value_raw': tx['value'],
+        'timestamp': timestamp,
+        'block_number': int(tx['blockNumber']),
+        'gas_used': int(tx['gasUsed']),
+        'gas_price': int(tx['gasPrice']) / 10**9,  # Convert to Gwei
+        'is_error': tx['isError'] == '1',
+        'asset': 'ETH',
+        'token_symbol': 'ETH'
+    }
+
+def parse_internal_transaction(address, tx):
+    """ETH moved by a contract call (txlistinternal); gas is paid by the outer transaction"""
+    return {
+        'hash': tx['hash'],
+        'type': 'receive' if tx['to'].lower() == address.lower() else 'send',
+        'from': tx['from'],
+        'to': tx['to'],
+        'value_eth': round(int(tx['value']) / 10**18, 6),
+        'value_raw': tx['value'],
+        'timestamp': int(tx['timeStamp']),
+        'block_number': int(tx['blockNumber']),
+        'gas_used': int(tx.get('gasUsed') or 0),
+        'gas_price': 0,
+        'is_error': tx.get('isError') == '1',
+        'asset': 'ETH',
+        'token_symbol': 'ETH',
+        'internal': True
+    }
+
+def parse_erc20_transaction(address, tx):
+    tx_type = 'receive' if tx['to'].lower() == address.lower() else 'send'
+    decimals = int(tx.get('tokenDecimal', 18) or 18)
+    value = int(tx['value']) / (10 ** decimals)
+    
+    return {
+        'hash': tx['hash'],
+        'type': tx_type,
+        'from': tx['from'],
+        'to': tx['to'],
+        'value': round(value, 6),
+        'value_raw': tx['value'],
+        'decimals': decimals,
+        'timestamp': int(tx['timeStamp']),
+        'block_number': int(tx['blockNumber']),
+        'token_name': tx.get('tokenName', 'Unknown'),
+        'token_symbol': tx.get('tokenSymbol', '???'),
+        'contract_address': tx['contractAddress'],
+        'asset': tx.get('tokenSymbol', 'TOKEN')
+    }
+
+# Transaction history is paged with opaque cursors over a newest-first merge of the
+# txlist, tokentx and txlistinternal streams. Each stream is read page by page only as far
+# as the merge needs; pages below a cursor's block are history and are cached for long.
+TX_STREAMS = {
+    'all': ['txlist', 'tokentx', 'txlistinternal'],
+    'eth': ['txlist', 'txlistinternal'],
+    'tokens': ['tokentx']
+}
+TX_PAGE_CACHE_TTL = 3600
+TX_LIVE_SCAN_ROWS = 1000  # Rows a filtered page reads from the live streams before answering with what it found
+TX_LIVE_SCAN_PAGE_SIZE = 500
+TX_PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('TX_PAGE_CACHE_MAX_ENTRIES', 1000))
+LATEST_BLOCK = 99999999
+
+tx_page_cache_lock = threading.Lock()
+tx_page_cache = OrderedDict()  # sorted params -> (expires, Etherscan JSON)
+
+TX_PARSERS = {
+    'txlist': parse_normal_transaction,
+    'tokentx': parse_erc20_transaction,
+    'txlistinternal': parse_internal_transaction
+}
+
+def tx_position(action, record):
+    """Sort key giving one newest-first order across streams:
+    (block, transaction index, log index, stream, short id of the row)"""
+    identity = record_identity(record)
+    return (
+        int(record['blockNumber']),
+        int(record.get('transactionIndex') or -1),
+        int(record.get('logIndex') or -1),
+        TX_STREAMS['all'].index(action),
+        hashlib.sha1(identity.encode()).hexdigest()[:16]
+    )
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Position a cursor points at; ValueError when it isn't one of ours"""
     try:
-        params = {
-            'chainid': '1',
-            'module': 'account',
-            'action': 'txlist',
-            'address': address,
-            'startblock': 0,
-            'endblock': 99999999,
-            'page': 1,
-            'offset': limit,
-            'sort': 'desc',
-            'apikey': ETHERSCAN_API_KEY
-        }
-        response = requests.get(ETHERSCAN_API, params=params)
-        data = response.json()
+        block, tx_index, log_index, stream, identity = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return (int(block), int(tx_index), int(log_index), int(stream), str(identity))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def tx_page_params(action, address, endblock, page, page_size):
+    return dict(recent_tx_params(action, address, page_size), endblock=endblock, page=page)
+
+def get_tx_page(params):
+    """One newest-first Etherscan page; answers (not errors) are cached"""
+    key = tuple(sorted(params.items()))
+    with tx_page_cache_lock:
+        cached = tx_page_cache.get(key)
+        if cached is not None and cached[0] > time.time():
+            tx_page_cache.move_to_end(key)
+            return cached[1]
+    
+    data = upstream_get(ETHERSCAN_API, params=params).json()
+    if data.get('status') == '1' or data.get('message') == 'No transactions found':
+        ttl = TRANSACTIONS_RESPONSE_TTL if params['endblock'] == LATEST_BLOCK else TX_PAGE_CACHE_TTL
+        with tx_page_cache_lock:
+            tx_page_cache[key] = (time.time() + ttl, data)
+            tx_page_cache.move_to_end(key)
+            while len(tx_page_cache) > TX_PAGE_CACHE_MAX_ENTRIES:
+                tx_page_cache.popitem(last=False)
+    return data
+
+def iter_transactions_desc(action, address, before, page_size):
+    """Yield (position, transaction) newest first and strictly older than `before`.
+    
+    Rows of a block are collected before they are yielded in position order, so a page or
+    result-window boundary inside a block doesn't reorder or duplicate them.
+    """
+    parse = TX_PARSERS[action]
+    
+    def flush(rows):
+        for position in sorted(rows, reverse=True):
+            if before is None or position < before:
+                yield position, parse(address, rows[position])
+    
+    endblock = before[0] if before else LATEST_BLOCK
+    page = 1
+    block, rows = None, {}
+    while True:
+        data = get_tx_page(tx_page_params(action, address, endblock, page, page_size))
+        if data.get('status') == '1' and isinstance(data.get('result'), list):
+            records = data['result']
+        elif data.get('message') == 'No transactions found':
+            records = []
+        else:
+            raise UpstreamError(f"Etherscan {action} error: {data.get('message')} {data.get('result')}")
         
-        if data['status'] == '1' and isinstance(data.get('result'), list):
-            transactions = []
-            for tx in data['result']:
-                tx_type = 'receive' if tx['to'].lower() == address.lower() else 'send'
-                value_eth = int(tx['value']) / 10**18
-                
-                # Convert timestamp properly - Etherscan returns Unix timestamp
-                timestamp = int(tx['timeStamp'])
-                
-                transactions.append({
-                    'hash': tx['hash'],
-                    'type': tx_type,
-                    'from': tx['from'],
-                    'to': tx['to'],
-                    'value_eth': round(value_eth, 6),
-                    'timestamp': timestamp,
-                    'block_number': int(tx['blockNumber']),
-                    'gas_used': int(tx['gasUsed']),
-                    'gas_price': int(tx['gasPrice']) / 10**9,  # Convert to Gwei
-                    'is_error': tx['isError'] == '1',
-                    'asset': 'ETH',
-                    'token_symbol': 'ETH'
-                })
-            return transactions
-        return []
-    except Exception as e:
-        print(f"Error fetching normal transactions: {e}")
-        return []
+        for record in records:
+            position = tx_position(action, record)
+            if position[0] != block:
+                yield from flush(rows)
+                block, rows = position[0], {}
+            rows[position] = record
+        
+        if len(records) < page_size:
+            break
+        if page * page_size < ETHERSCAN_RESULT_WINDOW:
+            page += 1
+        else:
+            # Window saturated - restart it at the block being collected (rows dedupe by position)
+            if endblock == block:
+                raise UpstreamError(f"More than {ETHERSCAN_RESULT_WINDOW} records in block {block}")
+            endblock, page = block, 1
+    yield from flush(rows)
 
-def get_erc20_transactions(address, limit=50):
-    """Get ERC-20 token transactions"""
-    try:
-        params = {
-            'chainid': '1',
-            'module': 'account',
-            'action': 'tokentx',
-            'address': address,
-            'startblock': 0,
-            'endblock': 99999999,
-            'page': 1,
-            'offset': limit,
-            'sort': 'desc',
-            'apikey': ETHERSCAN_API_KEY
-        }
-        response = requests.get(ETHERSCAN_API, params=params)
-        data = response.json()
+def merge_transactions(address, actions, before, limit, filters=None):
+    """Lazily k-way merge the streams; returns (up to limit transactions, next cursor, partial).
+    
+    With filters only matching rows are kept and at most TX_LIVE_SCAN_ROWS are read: when
+    those run out first the page is partial and its cursor points at the last row read, so
+    the next page carries on scanning from there.
+    """
+    page_size = TX_LIVE_SCAN_PAGE_SIZE if filters else limit + 1
+    # The first page of every stream is requested at once; the streams pick them up from
+    # the in-flight call (or the page cache) when the merge first pulls
+    for action in actions:
+        upstream_executor.submit(get_tx_page, tx_page_params(action, address, before[0] if before else LATEST_BLOCK, 1, page_size))
+    
+    failed = []
+    def guarded(action):
+        try:
+            yield from iter_transactions_desc(action, address, before, page_size)
+        except Exception as e:
+            log.warning("Error fetching %s transactions: %s", action, e)
+            failed.append(action)
+    
+    merged = heapq.merge(*(guarded(action) for action in actions), key=itemgetter(0), reverse=True)
+    if not filters:
+        page = list(islice(merged, limit + 1))
+        next_cursor = encode_cursor(page[limit - 1][0]) if len(page) > limit else None
+        return [tx for _, tx in page[:limit]], next_cursor, bool(failed)
+    
+    page, scanned, position = [], 0, None
+    for position, tx in merged:
+        # Newest first: nothing older than `since` can match
+        if tx['timestamp'] < filters.get('since', tx['timestamp']):
+            return [tx for _, tx in page[:limit]], None, bool(failed)
+        scanned += 1
+        if tx_matches(tx, filters):
+            page.append((position, tx))
+            if len(page) > limit:
+                return [tx for _, tx in page[:limit]], encode_cursor(page[limit - 1][0]), bool(failed)
+        if scanned >= TX_LIVE_SCAN_ROWS:
+            return [tx for _, tx in page], encode_cursor(position), True
+    return [tx for _, tx in page], None, bool(failed)
+
+# Local transaction index: every wallet's history in SQLite, filled incrementally per stream
+# (only blocks after the last indexed one are fetched) and queried with keyset pagination
+# on the same positions the cursors use. The unsettled tail (LEDGER_CONFIRMATIONS blocks) is
+# re-fetched on the next sync so reorged rows get replaced. Progress is saved with every
+# chunk, so a sync that fails partway resumes where it stopped; a stream's updated_at stays
+# 0 until its first sync has reached the chain head.
+TX_INDEX_SYNC_INTERVAL = float(os.environ.get('TX_INDEX_SYNC_INTERVAL', 60))
+TX_INDEX_SYNC_WAIT_SECONDS = 3  # How long a request waits for an indexed wallet to catch up
+TX_INDEX_ON_VIEW = os.environ.get('TX_INDEX_ON_VIEW', '0') == '1'  # Index wallets in the background on first view
+TX_INDEX_POOL_SIZE = int(os.environ.get('TX_INDEX_POOL_SIZE', 2))  # Syncs running at once; the rest queue
+# A first sync walks a wallet's whole history, so syncs get their own threads and yield the
+# rate budget to live requests instead of holding the request pool for minutes
+tx_index_executor = TracingExecutor(max_workers=TX_INDEX_POOL_SIZE, thread_name_prefix='tx-index')
+
+def tx_filter_fields(tx):
+    """(direction, counterparty, contract, value) of a parsed transaction, as filters see them"""
+    counterparty = tx['from'] if tx['type'] == 'receive' else tx['to']
+    return tx['type'], (counterparty or '').lower(), (tx.get('contract_address') or '').lower(), tx.get('value', tx.get('value_eth', 0))
+
+def tx_index_row(address, action, record):
+    tx = TX_PARSERS[action](address, record)
+    return (address, *tx_position(action, record), tx['timestamp'], *tx_filter_fields(tx), json.dumps(tx))
+
+def is_tx_indexed(address):
+    """True once every stream of the wallet has been synced up to the chain head"""
+    synced = get_db().execute('SELECT COUNT(*) FROM tx_index_state WHERE address = ? AND updated_at > 0',
+                              (address,)).fetchone()[0]
+    return synced == len(TX_STREAMS['all'])
+
+def sync_tx_index(address):
+    """Fetch what is new for each stream into the index; one sync per wallet at a time"""
+    result, _ = single_flight(('tx_index', address), _sync_tx_index, address)
+    return result
+
+def background_sync_tx_index(address):
+    """sync_tx_index at background rate priority (tasks run in a copy of the context)"""
+    upstream_priority.set('background')
+    return sync_tx_index(address)
+
+def _sync_tx_index(address):
+    conn = get_db()
+    for action in TX_STREAMS['all']:
+        row = conn.execute('SELECT last_block, updated_at FROM tx_index_state WHERE address = ? AND action = ?',
+                           (address, action)).fetchone()
+        last_block, synced_at = row if row else (-1, 0)
+        if synced_at and time.time() - synced_at < TX_INDEX_SYNC_INTERVAL:
+            continue
         
-        if data['status'] == '1' and isinstance(data.get('result'), list):
-            transactions = []
-            for tx in data['result']:
-                tx_type = 'receive' if tx['to'].lower() == address.lower() else 'send'
-                decimals = int(tx.get('tokenDecimal', 18))
-                value = int(tx['value']) / (10 ** decimals)
-                
-                transactions.append({
-                    'hash': tx['hash'],
-                    'type': tx_type,
-                    'from': tx['from'],
-                    'to': tx['to'],
-                    'value': round(value, 6),
-                    'timestamp': int(tx['timeStamp']),
-                    'block_number': int(tx['blockNumber']),
-                    'token_name': tx.get('tokenName', 'Unknown'),
-                    'token_symbol': tx.get('tokenSymbol', '???'),
-                    'contract_address': tx['contractAddress'],
-                    'asset': tx.get('tokenSymbol', 'TOKEN')
-                })
-            return transactions
-        return []
-    except Exception as e:
-        print(f"Error fetching ERC-20 transactions: {e}")
-        return []
+        # Rows past the saved progress are the unsettled tail or a partly stored block; both get re-fetched
+        stream = TX_STREAMS['all'].index(action)
+        conn.execute('DELETE FROM tx_index WHERE address = ? AND stream = ? AND block_number > ?', (address, stream, last_block))
+        newest_block = last_block
+        for chunk in iter_etherscan_records(recent_tx_params(action, address, ETHERSCAN_PAGE_SIZE), startblock=last_block + 1):
+            newest_block = max(newest_block, int(chunk[-1]['blockNumber']))
+            # The chunk's last block may continue in the next one, and blocks near the head may
+            # still reorg: progress stops short of both
+            last_block = max(last_block, newest_block - 1 - LEDGER_CONFIRMATIONS)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('INSERT OR REPLACE INTO tx_index VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 [tx_index_row(address, action, record) for record in chunk])
+                conn.execute('INSERT OR REPLACE INTO tx_index_state (address, action, last_block, updated_at) VALUES (?, ?, ?, ?)',
+                             (address, action, last_block, synced_at))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        
+        settled_block = max(last_block, newest_block - LEDGER_CONFIRMATIONS)
+        conn.execute('INSERT OR REPLACE INTO tx_index_state (address, action, last_block, updated_at) VALUES (?, ?, ?, ?)',
+                     (address, action, settled_block, time.time()))
+
+def tx_matches(tx, filters):
+    """Whether a parsed transaction passes the index filters (the live merge's WHERE clause)"""
+    direction, counterparty, contract, value = tx_filter_fields(tx)
+    return (tx['timestamp'] >= filters.get('since', tx['timestamp'])
+            and tx['timestamp'] <= filters.get('until', tx['timestamp'])
+            and filters.get('token', contract) == contract
+            and filters.get('counterparty', counterparty) == counterparty
+            and value >= filters.get('min_value', value)
+            and filters.get('direction', direction) == direction)
+
+def parse_time_param(value):
+    """Unix seconds or an ISO date/datetime (UTC unless it says otherwise)"""
+    try:
+        return int(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp())
+
+def parse_tx_filters(args):
+    """Index filters from the query string; ValueError on a malformed one"""
+    filters = {}
+    for name in ('since', 'until'):
+        if args.get(name):
+            filters[name] = parse_time_param(args[name])
+    for name in ('token', 'counterparty'):
+        if args.get(name):
+            value = args[name].lower()
+            if not value.startswith('0x') or len(value) != 42:
+                raise ValueError(f'{name} must be an address')
+            filters[name] = value
+    if args.get('min_value'):
+        filters['min_value'] = float(args['min_value'])
+    if args.get('direction'):
+        if args['direction'] not in ('send', 'receive'):
+            raise ValueError('direction must be send or receive')
+        filters['direction'] = args['direction']
+    return filters
+
+def query_tx_index(address, actions, before, limit, filters):
+    """One page from the index, newest first; returns (transactions, next cursor)"""
+    clauses = ['address = ?', f"stream IN ({', '.join('?' * len(actions))})"]
+    params = [address] + [TX_STREAMS['all'].index(action) for action in actions]
+    for clause, name in (('timestamp >= ?', 'since'), ('timestamp <= ?', 'until'), ('contract = ?', 'token'),
+                         ('counterparty = ?', 'counterparty'), ('value >= ?', 'min_value'), ('direction = ?', 'direction')):
+        if name in filters:
+            clauses.append(clause)
+            params.append(filters[name])
+    if before is not None:
+        clauses.append('(block_number, tx_index, log_index, stream, row_id) < (?, ?, ?, ?, ?)')
+        params.extend(before)
+    
+    rows = get_db().execute(
+        f"SELECT block_number, tx_index, log_index, stream, row_id, payload FROM tx_index WHERE {' AND '.join(clauses)} "
+        'ORDER BY block_number DESC, tx_index DESC, log_index DESC, stream DESC, row_id DESC LIMIT ?',
+        params + [limit + 1]
+    ).fetchall()
+    next_cursor = encode_cursor(list(rows[limit - 1][:5])) if len(rows) > limit else None
+    return [json.loads(row[5]) for row in rows[:limit]], next_cursor
+
+def transactions_ttl():
+    # A cursor page only holds settled history; the head page changes with every block
+    return TX_PAGE_CACHE_TTL if request.args.get('cursor') else TRANSACTIONS_RESPONSE_TTL
 
 @app.route('/api/wallet/<address>/transactions', methods=['GET'])
+@cached_response(transactions_ttl)
 def get_transactions(address):
-    """Get recent transactions (both ETH and ERC-20)"""
+    """Get transactions (ETH, internal and ERC-20), newest first, one cursor page at a time.
     
+    Filters (since/until as unix seconds or ISO dates, token, counterparty, direction and
+    min_value in the asset's own units) are answered from the local transaction index once
+    a wallet has been indexed, and by scanning the live streams until then.
+    """
+    response, status = transactions_page(address, request.args)
+    return jsonify(response), status
+
+def transactions_page(address, args):
+    """One /transactions page for query args (first value of each parameter); returns
+    (JSON, status). Blocking - asgi.py runs it on a worker thread"""
     if not address.startswith('0x') or len(address) != 42:
-        return jsonify({'error': 'Invalid Ethereum address'}), 400
+        return {'error': 'Invalid Ethereum address'}, 400
     
     # Get limit from query params (default 50)
-    limit = request.args.get('limit', 50, type=int)
-    limit = min(limit, 100)  # Cap at 100
+    try:
+        limit = int(args.get('limit', 50))
+    except ValueError:
+        limit = 50
+    limit = min(max(limit, 1), 100)  # Cap at 100
     
     # Get transaction type filter
-    tx_filter = request.args.get('type', 'all')  # 'all', 'eth', 'tokens'
+    tx_filter = args.get('type', 'all')  # 'all', 'eth', 'tokens'
+    if tx_filter not in TX_STREAMS:
+        return {'error': 'type must be one of all, eth, tokens'}, 400
     
-    print(f"Fetching transactions for {address[:8]}... (limit: {limit})")
+    before = None
+    if args.get('cursor'):
+        try:
+            before = decode_cursor(args['cursor'])
+        except ValueError as e:
+            return {'error': str(e)}, 400
     
-    transactions = []
+    try:
+        filters = parse_tx_filters(args)
+    except ValueError as e:
+        return {'error': str(e)}, 400
     
-    # Get ETH transactions
-    if tx_filter in ['all', 'eth']:
-        eth_txs = get_normal_transactions(address, limit)
-        transactions.extend(eth_txs)
+    log.debug("transactions address=%s limit=%d", address, limit)
     
-    # Get ERC-20 transactions
-    if tx_filter in ['all', 'tokens']:
-        token_txs = get_erc20_transactions(address, limit)
-        transactions.extend(token_txs)
+    index_key = address.lower()
+    if is_tx_indexed(index_key):
+        # Catch the index up first, but only wait so long: a longer sync carries on in the
+        # background and this page is answered from what is indexed so far
+        sync = tx_index_executor.submit(background_sync_tx_index, index_key)
+        _, sync_status = result_by_deadline(sync, time.monotonic() + TX_INDEX_SYNC_WAIT_SECONDS, None)
+        transactions, next_cursor = query_tx_index(index_key, TX_STREAMS[tx_filter], before, limit, filters)
+        partial = sync_status != 'ok'
+        source = 'index'
+    else:
+        # Not indexed yet: the live streams answer (filters applied as rows stream past).
+        # Filtered queries (or every view, with TX_INDEX_ON_VIEW) queue the wallet's
+        # history for indexing in the background
+        transactions, next_cursor, partial = merge_transactions(address, TX_STREAMS[tx_filter], before, limit, filters)
+        source = 'live'
+        if TX_INDEX_ON_VIEW or filters:
+            tx_index_executor.submit(background_sync_tx_index, index_key)
     
+    response = build_transactions_response(address, transactions, limit)
+    response['next_cursor'] = next_cursor
+    response['partial'] = partial
+    response['source'] = source
+    return response, 200
+
+def build_transactions_response(address, transactions, limit):
+    """Merge, trim and summarize transactions into the /transactions JSON"""
     # Sort by timestamp (most recent first)
     transactions.sort(key=lambda x: x['timestamp'], reverse=True)
     
@@ -437,7 +2780,7 @@ def get_transactions(address):
     total_sent = sum(1 for tx in transactions if tx['type'] == 'send')
     total_received = sum(1 for tx in transactions if tx['type'] == 'receive')
     
-    response = {
+    return {
         'address': address,
         'transactions': transactions,
         'total_count': len(transactions),
@@ -445,106 +2788,293 @@ def get_transactions(address):
         'received_count': total_received,
         'limit': limit
     }
+
+# Facts about a token contract are the same for every wallet holding it, so they are
+# persisted with a freshness window per fact (None = never expires)
+TOKEN_FACT_TTLS = {
+    'creation_timestamp': None,
+    'honeypot': int(os.environ.get('HONEYPOT_FACT_TTL', 6 * 3600)),
+    'holder_count': int(os.environ.get('HOLDER_COUNT_FACT_TTL', 10 * 60)),
+    'last_price': None,  # Last known good price of the native coin, {'price', 'updated_at'}
+}
+
+token_fact_stats_lock = threading.Lock()
+token_fact_stats = {'hits': 0, 'misses': 0}
+
+def get_token_fact(contract_address, fact):
+    """Stored value of a token fact while it is fresh, otherwise None"""
+    try:
+        row = get_db().execute('SELECT value, updated_at FROM token_facts WHERE contract = ? AND fact = ?',
+                               (contract_address.lower(), fact)).fetchone()
+    except Exception as e:
+        log.warning("Error reading token fact %s for %s: %s", fact, contract_address, e)
+        row = None
     
-    return jsonify(response)
+    ttl = TOKEN_FACT_TTLS[fact]
+    fresh = row is not None and (ttl is None or time.time() - row[1] < ttl)
+    with token_fact_stats_lock:
+        token_fact_stats['hits' if fresh else 'misses'] += 1
+    return json.loads(row[0]) if fresh else None
+
+def set_token_fact(contract_address, fact, value):
+    """Persist a token fact; failed lookups should not be stored"""
+    try:
+        get_db().execute('INSERT OR REPLACE INTO token_facts (contract, fact, value, updated_at) VALUES (?, ?, ?, ?)',
+                         (contract_address.lower(), fact, json.dumps(value), time.time()))
+    except Exception as e:
+        log.warning("Error storing token fact %s for %s: %s", fact, contract_address, e)
+
+def get_token_fact_stats():
+    """Hit/miss counters and size of the persistent token fact store"""
+    with token_fact_stats_lock:
+        stats = dict(token_fact_stats)
+    try:
+        stats['entries'] = get_db().execute('SELECT COUNT(*) FROM token_facts').fetchone()[0]
+    except Exception:
+        stats['entries'] = None
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0
+    return stats
 
 def get_token_info(contract_address):
     """Get detailed token information including age and holder count"""
     try:
-        # Get token creation info
-        params = {
-            'chainid': '1',
-            'module': 'account',
-            'action': 'txlist',
-            'address': contract_address,
-            'startblock': 0,
-            'endblock': 99999999,
-            'page': 1,
-            'offset': 1,
-            'sort': 'asc',
-            'apikey': ETHERSCAN_API_KEY
-        }
-        response = requests.get(ETHERSCAN_API, params=params)
-        data = response.json()
-        
-        token_age_days = None
-        creation_timestamp = None
+        # A token's creation time never changes - it is stored forever once known
+        creation_timestamp = get_token_fact(contract_address, 'creation_timestamp')
         
-        if data['status'] == '1' and isinstance(data.get('result'), list) and len(data['result']) > 0:
-            first_tx = data['result'][0]
-            creation_timestamp = int(first_tx['timeStamp'])
-            import time as time_module
-            current_time = int(time_module.time())
-            token_age_days = (current_time - creation_timestamp) / 86400
+        if creation_timestamp is None:
+            # Get token creation info
+            response = upstream_get(ETHERSCAN_API, params=token_creation_params(contract_address))
+            creation_timestamp = parse_token_creation(contract_address, response.json())
         
-        return {
-            'contract_address': contract_address,
-            'token_age_days': round(token_age_days, 1) if token_age_days else None,
-            'creation_timestamp': creation_timestamp
-        }
+        return token_info_result(contract_address, creation_timestamp)
     except Exception as e:
-        print(f"Error fetching token info for {contract_address}: {e}")
-        return {
-            'contract_address': contract_address,
-            'token_age_days': None,
-            'creation_timestamp': None
-        }
+        log.warning("Error fetching token info for %s: %s", contract_address, e)
+        return token_info_result(contract_address, None)
+
+def token_creation_params(contract_address):
+    return {
+        'chainid': '1',
+        'module': 'account',
+        'action': 'txlist',
+        'address': contract_address,
+        'startblock': 0,
+        'endblock': 99999999,
+        'page': 1,
+        'offset': 1,
+        'sort': 'asc',
+        'apikey': ETHERSCAN_API_KEY
+    }
+
+def parse_token_creation(contract_address, data):
+    """Creation timestamp from the contract's first transaction (stored once found), or None"""
+    if data['status'] == '1' and isinstance(data.get('result'), list) and len(data['result']) > 0:
+        first_tx = data['result'][0]
+        creation_timestamp = int(first_tx['timeStamp'])
+        set_token_fact(contract_address, 'creation_timestamp', creation_timestamp)
+        return creation_timestamp
+    return None
+
+def token_info_result(contract_address, creation_timestamp):
+    token_age_days = None
+    if creation_timestamp is not None:
+        current_time = int(time.time())
+        token_age_days = (current_time - creation_timestamp) / 86400
+    
+    return {
+        'contract_address': contract_address,
+        'token_age_days': round(token_age_days, 1) if token_age_days else None,
+        'creation_timestamp': creation_timestamp
+    }
 
 def check_honeypot(contract_address):
     """Check if token is a honeypot using Honeypot.is API"""
+    cached = get_token_fact(contract_address, 'honeypot')
+    if cached is not None:
+        return cached
+    
     try:
-        url = f"https://api.honeypot.is/v2/IsHoneypot"
-        params = {
-            'address': contract_address,
-            'chainID': '1'
-        }
-        response = requests.get(url, params=params, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Honeypot.is returns detailed info
-            return {
-                'is_honeypot': data.get('honeypotResult', {}).get('isHoneypot', False),
-                'buy_tax': data.get('simulationResult', {}).get('buyTax', 0),
-                'sell_tax': data.get('simulationResult', {}).get('sellTax', 0),
-                'has_trading_enabled': not data.get('honeypotResult', {}).get('honeypotReason', '') == 'No liquidity',
-            }
-        return None
+        response = upstream_get(HONEYPOT_API, params=honeypot_params(contract_address))
+        return parse_honeypot(contract_address, response)
     except Exception as e:
-        print(f"Error checking honeypot for {contract_address}: {e}")
+        log.warning("Error checking honeypot for %s: %s", contract_address, e)
         return None
 
+def honeypot_params(contract_address):
+    return {
+        'address': contract_address,
+        'chainID': '1'
+    }
+
+def parse_honeypot(contract_address, response):
+    """Honeypot/tax verdict from an IsHoneypot response (stored on success), or None"""
+    if response.status_code == 200:
+        data = response.json()
+        
+        # Honeypot.is returns detailed info
+        result = {
+            'is_honeypot': data.get('honeypotResult', {}).get('isHoneypot', False),
+            'buy_tax': data.get('simulationResult', {}).get('buyTax', 0),
+            'sell_tax': data.get('simulationResult', {}).get('sellTax', 0),
+            'has_trading_enabled': not data.get('honeypotResult', {}).get('honeypotReason', '') == 'No liquidity',
+        }
+        set_token_fact(contract_address, 'honeypot', result)
+        return result
+    return None
+
 def get_token_holders_count(contract_address):
     """Get number of token holders (approximate from recent transactions)"""
+    cached = get_token_fact(contract_address, 'holder_count')
+    if cached is not None:
+        return cached
+    
     try:
-        params = {
-            'chainid': '1',
-            'module': 'account',
-            'action': 'tokentx',
-            'contractaddress': contract_address,
-            'page': 1,
-            'offset': 100,
-            'sort': 'desc',
-            'apikey': ETHERSCAN_API_KEY
-        }
-        response = requests.get(ETHERSCAN_API, params=params)
-        data = response.json()
-        
-        if data['status'] == '1' and isinstance(data.get('result'), list):
-            # Count unique addresses in recent transactions
-            unique_addresses = set()
-            for tx in data['result']:
-                unique_addresses.add(tx['from'])
-                unique_addresses.add(tx['to'])
-            
-            return len(unique_addresses)
-        return 0
+        response = upstream_get(ETHERSCAN_API, params=holder_activity_params(contract_address))
+        return parse_holder_count(contract_address, response.json())
     except Exception as e:
-        print(f"Error fetching holder count for {contract_address}: {e}")
+        log.warning("Error fetching holder count for %s: %s", contract_address, e)
         return 0
 
+def holder_activity_params(contract_address):
+    return {
+        'chainid': '1',
+        'module': 'account',
+        'action': 'tokentx',
+        'contractaddress': contract_address,
+        'page': 1,
+        'offset': 100,
+        'sort': 'desc',
+        'apikey': ETHERSCAN_API_KEY
+    }
+
+def parse_holder_count(contract_address, data):
+    """Unique addresses in the token's recent transfers (stored when Etherscan answered)"""
+    if data['status'] == '1' and isinstance(data.get('result'), list):
+        # Count unique addresses in recent transactions
+        unique_addresses = set()
+        for tx in data['result']:
+            unique_addresses.add(tx['from'])
+            unique_addresses.add(tx['to'])
+        
+        set_token_fact(contract_address, 'holder_count', len(unique_addresses))
+        return len(unique_addresses)
+    if data.get('message') == 'No transactions found':
+        set_token_fact(contract_address, 'holder_count', 0)
+    return 0
+
+RISK_DEADLINE_SECONDS = float(os.environ.get('RISK_DEADLINE_SECONDS', 25))
+RISK_POOL_SIZE = int(os.environ.get('RISK_POOL_SIZE', 16))
+RISK_CHECKS_PER_REQUEST = 8  # Checks one analysis keeps in flight, so a wallet with hundreds of tokens can't hog the pool
+RISK_CHECKS = (('token_info', get_token_info), ('honeypot_data', check_honeypot), ('holder_count', get_token_holders_count))
+
+# Risk checks get their own pool: a wallet with hundreds of tokens queues its checks here
+# instead of ahead of every request's wallet fan-out on upstream_executor
+risk_executor = TracingExecutor(max_workers=RISK_POOL_SIZE, thread_name_prefix='risk')
+
+def iter_risk_checks(token_holdings, deadline, executor=risk_executor):
+    """Run every holding's checks on the executor, RISK_CHECKS_PER_REQUEST at a time. Yields
+    (index, check, result, 'ok' | 'missing') as each finishes and None once per heartbeat while
+    waiting. At the deadline, or when the caller stops early, checks not yet started are
+    cancelled and the rest are never submitted"""
+    queued = deque((index, name, check, holding['contract'])
+                   for index, holding in enumerate(token_holdings) for name, check in RISK_CHECKS)
+    running = {}
+    try:
+        while queued or running:
+            while queued and len(running) < RISK_CHECKS_PER_REQUEST:
+                index, name, check, contract = queued.popleft()
+                running[executor.submit(check, contract)] = (index, name)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            done, _ = wait(running, timeout=min(SSE_HEARTBEAT_SECONDS, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                yield None
+            for future in done:
+                index, name = running.pop(future)
+                yield (index, name) + result_by_deadline(future, deadline, None)
+    finally:
+        for future in running:
+            future.cancel()
+
+def score_token_risk(holding, token_info, honeypot_data, holder_count):
+    """Turn the per-token checks into risk flags and a 0-100ish score"""
+    token_risk = {
+        'name': holding['name'],
+        'symbol': holding['symbol'],
+        'contract': holding['contract'],
+        'balance': holding['balance'],
+        'risk_flags': [],
+        'risk_score': 0
+    }
+    
+    # Check 1: Token age (newer = riskier)
+    if token_info and token_info['token_age_days'] is not None:
+        age_days = token_info['token_age_days']
+        if age_days < 7:
+            token_risk['risk_flags'].append(f'Very new token (only {int(age_days)} days old)')
+            token_risk['risk_score'] += 30
+        elif age_days < 30:
+            token_risk['risk_flags'].append(f'New token ({int(age_days)} days old)')
+            token_risk['risk_score'] += 15
+    
+    # Check 2: Honeypot detection
+    if honeypot_data:
+        if honeypot_data['is_honeypot']:
+            token_risk['risk_flags'].append('HONEYPOT DETECTED - Cannot sell!')
+            token_risk['risk_score'] += 50
+        
+        if honeypot_data['sell_tax'] > 10:
+            token_risk['risk_flags'].append(f'High sell tax: {honeypot_data["sell_tax"]}%')
+            token_risk['risk_score'] += 20
+        
+        if not honeypot_data['has_trading_enabled']:
+            token_risk['risk_flags'].append('No liquidity available')
+            token_risk['risk_score'] += 25
+    
+    # Check 3: Number of holders (fewer = riskier); None means the check didn't finish
+    if holder_count is not None:
+        if holder_count < 10:
+            token_risk['risk_flags'].append(f'Very few holders (only {holder_count} in recent activity)')
+            token_risk['risk_score'] += 25
+        elif holder_count < 50:
+            token_risk['risk_flags'].append(f'Low holder count ({holder_count} in recent activity)')
+            token_risk['risk_score'] += 10
+    
+    # Check 4: Unknown/no price = potentially worthless
+    if holding.get('price_usd', 0) == 0 and holding['symbol'] not in ['USDT', 'USDC', 'DAI']:
+        token_risk['risk_flags'].append('No market price data available')
+        token_risk['risk_score'] += 15
+    
+    return token_risk
+
+def compute_risk_report(address, token_holdings, deadline, executor=risk_executor):
+    """Score every holding of a wallet and aggregate the /risk-analysis JSON"""
+    if not token_holdings:
+        return {
+            'address': address,
+            'risk_score': 0,
+            'risk_level': 'SAFE',
+            'message': 'No token holdings found',
+            'risky_tokens': []
+        }
+    
+    # Checks for different tokens run concurrently; the per-host rate limiters in
+    # upstream_get keep the combined traffic within each API's budget
+    results = [{} for _ in token_holdings]
+    missing_checks = len(token_holdings) * len(RISK_CHECKS)
+    for finished in iter_risk_checks(token_holdings, deadline, executor):
+        if finished is not None:
+            index, name, result, status = finished
+            results[index][name] = result
+            missing_checks -= status == 'ok'
+    
+    token_risks = [score_token_risk(holding, **{name: checks.get(name) for name, _ in RISK_CHECKS})
+                   for holding, checks in zip(token_holdings, results)]
+    return build_risk_response(address, token_risks, missing_checks)
+
 @app.route('/api/wallet/<address>/risk-analysis', methods=['GET'])
+@snapshot_response('risk')
 def analyze_risk(address):
     """Comprehensive risk analysis for a wallet"""
     
@@ -552,141 +3082,372 @@ def analyze_risk(address):
         if not address.startswith('0x') or len(address) != 42:
             return jsonify({'error': 'Invalid Ethereum address'}), 400
         
-        print(f"\n🔍 Starting risk analysis for {address[:8]}...")
+        log.debug("risk_analysis address=%s started", address)
+        deadline = time.monotonic() + RISK_DEADLINE_SECONDS
         
         # Get wallet holdings
         token_holdings = get_token_balances(address)
+        response = compute_risk_report(address, token_holdings, deadline)
         
-        if not token_holdings:
-            return jsonify({
-                'address': address,
-                'risk_score': 0,
-                'risk_level': 'SAFE',
-                'message': 'No token holdings found',
-                'risky_tokens': []
-            })
-        
-        risky_tokens = []
-        total_risk_points = 0
-        max_possible_points = 0
-        
-        # Analyze each token (limit to first 10 to avoid rate limits)
-        tokens_to_analyze = token_holdings[:10]
-        
-        for holding in tokens_to_analyze:
-            contract = holding['contract']
-            print(f"\n📊 Analyzing {holding['symbol']} ({contract[:8]}...)")
-            
-            token_risk = {
-                'name': holding['name'],
-                'symbol': holding['symbol'],
-                'contract': contract,
-                'balance': holding['balance'],
-                'risk_flags': [],
-                'risk_score': 0
-            }
-            
-            # Check 1: Token age (newer = riskier)
-            token_info = get_token_info(contract)
-            if token_info['token_age_days'] is not None:
-                age_days = token_info['token_age_days']
-                if age_days < 7:
-                    token_risk['risk_flags'].append(f'Very new token (only {int(age_days)} days old)')
-                    token_risk['risk_score'] += 30
-                elif age_days < 30:
-                    token_risk['risk_flags'].append(f'New token ({int(age_days)} days old)')
-                    token_risk['risk_score'] += 15
-                print(f"  Age: {int(age_days)} days")
-            
-            time.sleep(0.3)
-            
-            # Check 2: Honeypot detection
-            honeypot_data = check_honeypot(contract)
-            if honeypot_data:
-                if honeypot_data['is_honeypot']:
-                    token_risk['risk_flags'].append('HONEYPOT DETECTED - Cannot sell!')
-                    token_risk['risk_score'] += 50
-                
-                if honeypot_data['sell_tax'] > 10:
-                    token_risk['risk_flags'].append(f'High sell tax: {honeypot_data["sell_tax"]}%')
-                    token_risk['risk_score'] += 20
-                
-                if not honeypot_data['has_trading_enabled']:
-                    token_risk['risk_flags'].append('No liquidity available')
-                    token_risk['risk_score'] += 25
-                
-                print(f"  Honeypot: {honeypot_data['is_honeypot']}, Sell tax: {honeypot_data['sell_tax']}%")
-            
-            time.sleep(0.3)
-            
-            # Check 3: Number of holders (fewer = riskier)
-            holder_count = get_token_holders_count(contract)
-            if holder_count < 10:
-                token_risk['risk_flags'].append(f'Very few holders (only {holder_count} in recent activity)')
-                token_risk['risk_score'] += 25
-            elif holder_count < 50:
-                token_risk['risk_flags'].append(f'Low holder count ({holder_count} in recent activity)')
-                token_risk['risk_score'] += 10
-            
-            print(f"  Active holders: {holder_count}")
-            
-            time.sleep(0.3)
-            
-            # Check 4: Unknown/no price = potentially worthless
-            if holding.get('price_usd', 0) == 0 and holding['symbol'] not in ['USDT', 'USDC', 'DAI']:
-                token_risk['risk_flags'].append('No market price data available')
-                token_risk['risk_score'] += 15
-            
-            # Add to risky tokens if any flags
-            if token_risk['risk_flags']:
-                risky_tokens.append(token_risk)
-                total_risk_points += token_risk['risk_score']
-            
-            max_possible_points += 100
-        
-        # Calculate overall wallet risk score (0-100)
-        if max_possible_points > 0:
-            risk_score = min(100, int((total_risk_points / max_possible_points) * 100))
-        else:
-            risk_score = 0
-        
-        # Determine risk level
-        if risk_score >= 70:
-            risk_level = 'CRITICAL'
-        elif risk_score >= 50:
-            risk_level = 'HIGH'
-        elif risk_score >= 30:
-            risk_level = 'MEDIUM'
-        elif risk_score >= 10:
-            risk_level = 'LOW'
-        else:
-            risk_level = 'SAFE'
-        
-        # Sort risky tokens by risk score
-        risky_tokens.sort(key=lambda x: x['risk_score'], reverse=True)
-        
-        response = {
-            'address': address,
-            'risk_score': risk_score,
-            'risk_level': risk_level,
-            'tokens_analyzed': len(tokens_to_analyze),
-            'risky_tokens_count': len(risky_tokens),
-            'risky_tokens': risky_tokens,
-            'recommendations': generate_recommendations(risk_level, risky_tokens)
-        }
-        
-        print(f"\n✅ Analysis complete. Risk score: {risk_score} ({risk_level})")
+        log.debug("risk_analysis address=%s score=%s level=%s", address, response['risk_score'], response['risk_level'])
         
         return jsonify(response)
     
     except Exception as e:
-        print(f"Error in risk analysis: {e}")
+        log.exception("Error in risk analysis for %s", address)
         return jsonify({
             'address': address,
             'error': 'Risk analysis failed',
             'message': str(e)
         }), 500
 
+def build_risk_response(address, token_risks, missing_checks):
+    """Aggregate per-token verdicts into the /risk-analysis JSON"""
+    risky_tokens = []
+    total_risk_points = 0
+    max_possible_points = 0
+    
+    for token_risk in token_risks:
+        # Add to risky tokens if any flags
+        if token_risk['risk_flags']:
+            risky_tokens.append(token_risk)
+            total_risk_points += token_risk['risk_score']
+        
+        max_possible_points += 100
+    
+    # Calculate overall wallet risk score (0-100)
+    if max_possible_points > 0:
+        risk_score = min(100, int((total_risk_points / max_possible_points) * 100))
+    else:
+        risk_score = 0
+    
+    # Determine risk level
+    if risk_score >= 70:
+        risk_level = 'CRITICAL'
+    elif risk_score >= 50:
+        risk_level = 'HIGH'
+    elif risk_score >= 30:
+        risk_level = 'MEDIUM'
+    elif risk_score >= 10:
+        risk_level = 'LOW'
+    else:
+        risk_level = 'SAFE'
+    
+    # Sort risky tokens by risk score
+    risky_tokens.sort(key=lambda x: x['risk_score'], reverse=True)
+    
+    return {
+        'address': address,
+        'risk_score': risk_score,
+        'risk_level': risk_level,
+        'tokens_analyzed': len(token_risks),
+        'risky_tokens_count': len(risky_tokens),
+        'risky_tokens': risky_tokens,
+        'recommendations': generate_recommendations(risk_level, risky_tokens),
+        'missing_checks': missing_checks,
+        'partial': missing_checks > 0
+    }
+
+# Server-Sent Events variants: partial results go out as soon as they exist, and a
+# comment line every SSE_HEARTBEAT_SECONDS keeps proxies and clients from timing out
+SSE_HEARTBEAT_SECONDS = 10
+SSE_DEADLINE_SECONDS = float(os.environ.get('SSE_DEADLINE_SECONDS', 120))
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def iter_completed(futures, deadline):
+    """Yield futures as they finish, and None once per heartbeat interval while waiting.
+    Stops at the deadline; futures still running are left to the caller"""
+    pending = set(futures)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        done, pending = wait(pending, timeout=min(SSE_HEARTBEAT_SECONDS, remaining), return_when=FIRST_COMPLETED)
+        if not done:
+            yield None
+        for future in done:
+            yield future
+
+@app.route('/api/wallet/<address>/stream', methods=['GET'])
+def stream_wallet_info(address):
+    """/api/wallet as SSE: an 'eth' event, 'holding' events as tokens get priced, then 'summary'"""
+    if not address.startswith('0x') or len(address) != 42:
+        return jsonify({'error': 'Invalid Ethereum address'}), 400
+    
+    deadline = time.monotonic() + SSE_DEADLINE_SECONDS
+    eth_balance_future = upstream_executor.submit(get_eth_balance, address)
+    eth_price_future = upstream_executor.submit(get_native_price)
+    holdings_future = upstream_executor.submit(get_token_balances, address)
+    
+    def events():
+        for future in iter_completed([eth_balance_future, eth_price_future], deadline):
+            if future is None:
+                yield ': keep-alive\n\n'
+        
+        data_status = {}
+        eth_balance, data_status['eth_balance'] = result_by_deadline(eth_balance_future, deadline, 0)
+        eth_price, data_status['eth_price'] = result_by_deadline(eth_price_future, deadline, None)
+        yield sse_event('eth', {
+            'address': address,
+            'eth_balance': round(eth_balance, 6),
+            'eth_price_usd': round(eth_price or 0, 2),
+            'eth_value_usd': round(eth_balance * (eth_price or 0), 2)
+        })
+        
+        for future in iter_completed([holdings_future], deadline):
+            if future is None:
+                yield ': keep-alive\n\n'
+        token_holdings, data_status['token_holdings'] = result_by_deadline(holdings_future, deadline, [])
+        yield sse_event('holdings', {'holdings_count': len(token_holdings)})
+        
+        # Cached prices first, then one CoinGecko batch at a time
+        by_contract = {}
+        for holding in token_holdings:
+            by_contract.setdefault(holding['contract'].lower(), []).append(holding)
+        token_prices, pending = split_cached_prices(list(by_contract))
+        groups = [list(token_prices)] + chunk_contracts(pending)
+        
+        data_status['token_prices'] = 'ok'
+        for contracts in groups:
+            if time.monotonic() >= deadline:
+                data_status['token_prices'] = 'missing'
+                break
+            missing = [contract for contract in contracts if contract not in token_prices]
+            if missing:
+                token_prices.update(get_all_token_prices(missing))
+            for contract in contracts:
+                for holding in by_contract[contract]:
+                    yield sse_event('holding', value_holding(holding, token_prices.get(contract, 0)))
+        
+        yield sse_event('summary', build_wallet_response(address, eth_balance, eth_price, token_holdings, token_prices, data_status))
+    
+    return sse_response(events())
+
+@app.route('/api/wallet/<address>/risk-analysis/stream', methods=['GET'])
+def stream_risk_analysis(address):
+    """/risk-analysis as SSE: a 'token' event per verdict as its checks finish, then 'summary'"""
+    if not address.startswith('0x') or len(address) != 42:
+        return jsonify({'error': 'Invalid Ethereum address'}), 400
+    
+    deadline = time.monotonic() + SSE_DEADLINE_SECONDS
+    holdings_future = upstream_executor.submit(get_token_balances, address)
+    
+    def events():
+        for future in iter_completed([holdings_future], deadline):
+            if future is None:
+                yield ': keep-alive\n\n'
+        token_holdings, _ = result_by_deadline(holdings_future, deadline, [])
+        yield sse_event('holdings', {'address': address, 'holdings_count': len(token_holdings)})
+        
+        # Three checks per token; a verdict goes out when its token's last check lands
+        results = [{} for _ in token_holdings]
+        token_risks = [None] * len(token_holdings)
+        for finished in iter_risk_checks(token_holdings, deadline):
+            if finished is None:
+                yield ': keep-alive\n\n'
+                continue
+            index, check, result, _ = finished
+            results[index][check] = result
+            if len(results[index]) == len(RISK_CHECKS):
+                token_risks[index] = score_token_risk(token_holdings[index], **results[index])
+                yield sse_event('token', token_risks[index])
+        
+        # Tokens whose checks missed the deadline are scored on what did arrive
+        missing_checks = 0
+        for index, holding in enumerate(token_holdings):
+            if token_risks[index] is None:
+                missing_checks += 3 - len(results[index])
+                checks = {'token_info': None, 'honeypot_data': None, 'holder_count': None}
+                checks.update(results[index])
+                token_risks[index] = score_token_risk(holding, **checks)
+                yield sse_event('token', token_risks[index])
+        
+        yield sse_event('summary', build_risk_response(address, token_risks, missing_checks))
+    
+    return sse_response(events())
+
+# Watch subscriptions replace client polling: the server refreshes each watched wallet and
+# token once per WATCH_REFRESH_SECONDS, however many tabs watch it, and pushes only what changed
+WATCH_REFRESH_SECONDS = float(os.environ.get('WATCH_REFRESH_SECONDS', 30))
+WATCH_MAX_KEYS = 50  # Wallets + tokens per subscription
+WATCH_QUEUE_SIZE = 100  # Events buffered per subscriber before it is dropped as too slow
+
+watch_lock = threading.Lock()
+watch_wakeup = threading.Event()
+watch_subscribers = {}  # id -> {'wallet': set, 'token': set, 'queue': Queue, 'closed': bool}
+watch_snapshots = {}  # ('wallet' | 'token', key) -> last published snapshot
+watch_ids = itertools.count(1)
+watch_thread = None
+watch_stats = {'refreshes': 0, 'events_published': 0, 'subscribers_dropped': 0}
+
+def watched_keys():
+    with watch_lock:
+        subscribers = list(watch_subscribers.values())
+    wallets = set().union(*(s['wallet'] for s in subscribers))
+    tokens = set().union(*(s['token'] for s in subscribers))
+    return wallets, tokens
+
+def diff_wallet(old, new):
+    """Top-level fields that changed, plus holdings changed/removed by contract"""
+    changes = {k: v for k, v in new.items() if k != 'token_holdings' and old.get(k) != v}
+    old_holdings = {h['contract']: h for h in old.get('token_holdings', [])}
+    new_holdings = {h['contract']: h for h in new['token_holdings']}
+    changed = [h for contract, h in new_holdings.items() if old_holdings.get(contract) != h]
+    removed = [contract for contract in old_holdings if contract not in new_holdings]
+    if changed:
+        changes['token_holdings_changed'] = changed
+    if removed:
+        changes['token_holdings_removed'] = removed
+    return changes
+
+def diff_token(old, new):
+    return {k: v for k, v in new.items() if old.get(k) != v}
+
+def publish_watch(kind, key, snapshot):
+    old = watch_snapshots.get((kind, key), {})
+    changes = (diff_wallet if kind == 'wallet' else diff_token)(old, snapshot)
+    watch_snapshots[(kind, key)] = snapshot
+    if not changes:
+        return
+    
+    event = sse_event(kind, {'key': key, 'full': not old, 'changes': changes})
+    with watch_lock:
+        subscribers = [s for s in watch_subscribers.values() if key in s[kind]]
+    for subscriber in subscribers:
+        try:
+            subscriber['queue'].put_nowait(event)
+            watch_stats['events_published'] += 1
+        except queue.Full:
+            # The client reconnects and gets a fresh snapshot instead of a backlog
+            subscriber['closed'] = True
+            watch_stats['subscribers_dropped'] += 1
+
+def refresh_watched(wallets, tokens):
+    """One upstream pass for every watched key: batched ETH balances, one pricing pass"""
+    deadline = time.monotonic() + WALLET_MAX_DEADLINE_SECONDS
+    eth_price_future = upstream_executor.submit(get_native_price)
+    eth_balances_future = upstream_executor.submit(get_eth_balances, list(wallets)) if wallets else None
+    holdings_futures = {address: upstream_executor.submit(get_token_balances, address) for address in wallets}
+    
+    holdings = {address: result_by_deadline(future, deadline, []) for address, future in holdings_futures.items()}
+    contracts = list(tokens) + [h['contract'].lower() for token_holdings, _ in holdings.values() for h in token_holdings]
+    token_prices = get_all_token_prices(list(dict.fromkeys(contracts))) if contracts else {}
+    
+    for contract in tokens:
+        publish_watch('token', contract, {'contract': contract, 'price_usd': token_prices.get(contract, 0)})
+    
+    if not wallets:
+        return
+    eth_price, eth_price_status = result_by_deadline(eth_price_future, deadline, None)
+    eth_balances, _ = result_by_deadline(eth_balances_future, deadline, {})
+    for address in wallets:
+        token_holdings, holdings_status = holdings[address]
+        data_status = {
+            'eth_balance': 'ok' if address in eth_balances else 'missing',
+            'eth_price': eth_price_status,
+            'token_holdings': holdings_status,
+            'token_prices': holdings_status
+        }
+        snapshot = build_wallet_response(address, eth_balances.get(address, 0), eth_price,
+                                         token_holdings, token_prices, data_status)
+        # Keep the last good snapshot rather than pushing an upstream hiccup as a change
+        if snapshot['partial'] and ('wallet', address) in watch_snapshots:
+            continue
+        publish_watch('wallet', address, snapshot)
+
+def watch_refresher():
+    next_refresh = time.monotonic()
+    while True:
+        watch_wakeup.wait(max(0, next_refresh - time.monotonic()))
+        watch_wakeup.clear()
+        wallets, tokens = watched_keys()
+        
+        if time.monotonic() >= next_refresh:
+            next_refresh = time.monotonic() + WATCH_REFRESH_SECONDS
+            # Forget keys nobody watches any more
+            for kind, key in list(watch_snapshots):
+                if key not in (wallets if kind == 'wallet' else tokens):
+                    watch_snapshots.pop((kind, key), None)
+        else:
+            # Woken by a new subscription: only fetch keys with no snapshot yet
+            wallets = {w for w in wallets if ('wallet', w) not in watch_snapshots}
+            tokens = {t for t in tokens if ('token', t) not in watch_snapshots}
+        
+        if not wallets and not tokens:
+            continue
+        try:
+            refresh_watched(wallets, tokens)
+            watch_stats['refreshes'] += 1
+        except Exception as e:
+            log.warning("Watch refresh failed: %s", e)
+
+def start_watch_refresher():
+    global watch_thread
+    with watch_lock:
+        if watch_thread is None:
+            watch_thread = threading.Thread(target=watch_refresher, name='watch-refresher', daemon=True)
+            watch_thread.start()
+
+def get_watch_stats():
+    wallets, tokens = watched_keys()
+    return {
+        'subscribers': len(watch_subscribers),
+        'watched_wallets': len(wallets),
+        'watched_tokens': len(tokens),
+        'refresh_seconds': WATCH_REFRESH_SECONDS,
+        **watch_stats
+    }
+
+@app.route('/api/watch', methods=['GET'])
+def watch():
+    """SSE subscription: ?wallets=0x..,0x..&tokens=0x..
+    
+    Sends the current snapshot of each key, then 'wallet' / 'token' events carrying only the
+    fields that changed on each server-side refresh ('full': true marks a first snapshot).
+    """
+    wallets = {a.strip().lower() for a in request.args.get('wallets', '').split(',') if a.strip()}
+    tokens = {a.strip().lower() for a in request.args.get('tokens', '').split(',') if a.strip()}
+    invalid = [a for a in wallets | tokens if not a.startswith('0x') or len(a) != 42]
+    if invalid:
+        return jsonify({'error': 'Invalid Ethereum address', 'invalid': invalid}), 400
+    if not wallets and not tokens:
+        return jsonify({'error': 'Pass wallets and/or tokens to watch'}), 400
+    if len(wallets) + len(tokens) > WATCH_MAX_KEYS:
+        return jsonify({'error': f'At most {WATCH_MAX_KEYS} wallets and tokens per subscription'}), 400
+    
+    start_watch_refresher()
+    subscriber_id = next(watch_ids)
+    subscriber = {'wallet': wallets, 'token': tokens, 'queue': queue.Queue(WATCH_QUEUE_SIZE), 'closed': False}
+    with watch_lock:
+        watch_subscribers[subscriber_id] = subscriber
+    watch_wakeup.set()
+    
+    def events():
+        try:
+            for kind, keys in (('wallet', wallets), ('token', tokens)):
+                for key in keys:
+                    snapshot = watch_snapshots.get((kind, key))
+                    if snapshot is not None:
+                        yield sse_event(kind, {'key': key, 'full': True, 'changes': snapshot})
+            while not subscriber['closed']:
+                try:
+                    yield subscriber['queue'].get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            with watch_lock:
+                watch_subscribers.pop(subscriber_id, None)
+    
+    return sse_response(events())
+
 def generate_recommendations(risk_level, risky_tokens):
     """Generate actionable recommendations based on risk analysis"""
     recommendations = []
@@ -714,15 +3475,10 @@ def generate_recommendations(risk_level, risky_tokens):
 @app.route('/api/stats', methods=['GET'])
 def stats():
     # Dummy for now, real logic should read/write from persistent store when ready
-    demo_wallets = [
-        '0x742d35cc6634c0532925a3b844bc454e4438f44e',
-        '0x8bA1f109551bD432803012645Ac136ddd64DBA72',
-        '0x49e833337ecefa0cab47fa4160bed2b8092b5d10',
-        '0x8576acc5c05d6ce88f4e49bf65bdf0c62f91353c',
-        '0x21a31ee1afc51d94c2efccaa2092ad1028285549',
-    ]
-    wallets_analyzed = len(demo_wallets)
-    users_protected = len(set(w.lower() for w in demo_wallets))
+    # The landing page calls this first: get the demo wallets' snapshots warming
+    start_snapshot_refresher()
+    wallets_analyzed = len(DEMO_WALLETS)
+    users_protected = len(set(w.lower() for w in DEMO_WALLETS))
     scams_detected = 0  # For now, unless tracked persistently
 
     return jsonify({
@@ -736,6 +3492,34 @@ def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'message': 'Crypto wallet API is running (V2 + USD prices)'})
 
+@app.route('/api/upstream-stats', methods=['GET'])
+def upstream_stats_endpoint():
+    """Connection pool reuse, handshake and retry counts per upstream host, price provider circuits"""
+    return jsonify({
+        'pool_size': UPSTREAM_POOL_SIZE,
+        'max_retries': UPSTREAM_MAX_RETRIES,
+        'rate_limit_shared': RATE_LIMIT_SHARED,
+        'hosts': get_upstream_stats(),
+        'circuits': get_circuit_stats()
+    })
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats_endpoint():
+    """Hit/miss counters for the price, token fact, response and snapshot caches, background refresh and watch stats"""
+    return jsonify({
+        'price_cache': get_price_cache_stats(),
+        'token_facts': get_token_fact_stats(),
+        'price_refresh': get_price_refresh_stats(),
+        'responses': get_response_cache_stats(),
+        'snapshots': get_snapshot_stats(),
+        'watch': get_watch_stats()
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus-format latency histograms, upstream counters and cache hit ratios (per process)"""
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/api/test-etherscan', methods=['GET'])
 def test_etherscan():
     """Test if Etherscan V2 API is working"""
@@ -749,7 +3533,7 @@ def test_etherscan():
         'tag': 'latest',
         'apikey': ETHERSCAN_API_KEY
     }
-    response = requests.get(ETHERSCAN_API, params=params)
+    response = upstream_get(ETHERSCAN_API, params=params)
     
     return jsonify({
         'api_version': 'V2',
@@ -759,5 +3543,5 @@ def test_etherscan():
     })
 
 if __name__ == '__main__':
-    print("running")
+    log.info("Starting development server on port 5000")
     app.run(debug=True, port=5000)
\ No newline at end of file
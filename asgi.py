@@ -0,0 +1,583 @@
+"""Asyncio (ASGI) serving mode for the wallet API.
+
+Serves the same routes and JSON as app.py, but every upstream call is non-blocking,
+so a single process can hold thousands of slow wallet lookups instead of one per
+worker thread. Parsing, caches, the SQLite store and the rate-limit governor are
+shared with app.py; only the I/O and the fan-out are async here. Calls into the SQLite
+store (ledgers, token facts, snapshots, shared rate-limit buckets) run on worker threads
+so a busy write lock never stalls the loop. Transaction history runs app.py's cursor
+merge and index on a worker thread as a whole.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import re
+import time
+from urllib.parse import parse_qs
+
+import httpx
+
+import app as core
+
+# Async counterpart of core.upstream_session: keep-alive pools per host
+UPSTREAM_MAX_CONNECTIONS = core.UPSTREAM_POOL_SIZE * 8
+
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS
+        ))
+    return _client
+
+# Tasks that missed a request deadline keep running so their results still reach the caches
+background_tasks = set()
+
+def spawn(coro):
+    task = asyncio.ensure_future(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+inflight_calls = {}  # key -> asyncio.Future
+
+async def single_flight(key, fn, *args):
+    """Await fn once per key at a time; concurrent callers share the result.
+    Returns (result, shared) like core.single_flight"""
+    future = inflight_calls.get(key)
+    if future is not None:
+        return await asyncio.shield(future), True
+
+    future = asyncio.get_running_loop().create_future()
+    inflight_calls[key] = future
+    try:
+        result = await fn(*args)
+        future.set_result(result)
+        return result, False
+    except BaseException as e:
+        if isinstance(e, Exception):
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+        else:
+            future.cancel()
+        raise
+    finally:
+        inflight_calls.pop(key, None)
+
+async def governor(fn, *args):
+    """Call into the rate-limit governor; with RATE_LIMIT_SHARED its buckets are SQLite rows
+    (BEGIN IMMEDIATE, busy timeout and all), so the call goes to a worker thread"""
+    if core.RATE_LIMIT_SHARED:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+async def wait_for_rate_limit(host, api_key=''):
+    """Non-blocking wait on the shared host/key token bucket"""
+    waited = 0
+    while True:
+        delay = await governor(core.take_rate_limit_token, host, api_key)
+        if not delay:
+            break
+        await asyncio.sleep(delay)
+        waited += delay
+
+    core.record_rate_limit_wait(host, waited)
+    return waited
+
+async def upstream_get(url, params=None, retries=core.UPSTREAM_MAX_RETRIES):
+    """GET an upstream URL without blocking the loop, coalescing identical in-flight calls"""
+    key = ('GET', url, tuple(sorted((params or {}).items())))
+    started = time.perf_counter()
+    response, shared = await single_flight(key, _upstream_get_uncoalesced, url, params, retries)
+    if shared:
+        host = core.upstream_host(url)
+        core._record_upstream(host, 'coalesced')
+        core.record_span(host, core.upstream_action(url, params), str(response.status_code), started,
+                         time.perf_counter() - started, coalesced=True)
+    return response
+
+async def _upstream_get_uncoalesced(url, params, retries):
+    host = core.upstream_host(url)
+    connect_timeout, read_timeout = core.UPSTREAM_TIMEOUTS.get(host, core.DEFAULT_UPSTREAM_TIMEOUT)
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    api_key = (params or {}).get('apikey', '')
+    action = core.upstream_action(url, params)
+    breaker = core.circuit_breakers.get(host)
+
+    # The breaker sees one outcome per logical call, not one per retry attempt
+    if breaker is not None and not breaker.allow():
+        raise core.CircuitOpenError(f"{breaker.name} circuit is open")
+    attempt = 0
+    while True:
+        waited = await wait_for_rate_limit(host, api_key)
+        core._record_upstream(host, 'requests')
+        started = time.perf_counter()
+        try:
+            response = await get_client().get(url, params=params, timeout=timeout)
+        except httpx.TransportError as e:
+            core.record_span(host, action, type(e).__name__, started, time.perf_counter() - started, rate_limit_wait=waited)
+            core._record_upstream(host, 'errors')
+            if attempt >= retries:
+                if breaker is not None:
+                    breaker.record(False, time.perf_counter() - started)
+                raise
+            response = None
+        else:
+            status = '429' if core.is_rate_limited_response(host, response) else str(response.status_code)
+            core.record_span(host, action, status, started, time.perf_counter() - started, len(response.content), waited)
+            if not await governor(core.should_retry_response, host, api_key, response) or attempt >= retries:
+                if breaker is not None:
+                    breaker.record(response.status_code not in core.RETRY_STATUS_CODES, time.perf_counter() - started,
+                                   rate_limited=status == '429')
+                return response
+            core._record_upstream(host, 'errors')
+
+        core._record_upstream(host, 'retries')
+        await asyncio.sleep(core._backoff_delay(attempt, response))
+        attempt += 1
+
+async def result_by_deadline(task, deadline, default):
+    """Await a task until the monotonic deadline; returns (value, 'ok' | 'missing')"""
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), max(0, deadline - time.monotonic())), 'ok'
+    except asyncio.TimeoutError:
+        return default, 'missing'
+    except Exception as e:
+        core.log.warning("Upstream task failed: %s", e)
+        return default, 'missing'
+
+# Upstream fetches - async twins of the app.py functions with the same names
+
+async def get_eth_balance(address, chain=core.DEFAULT_CHAIN):
+    try:
+        response = await upstream_get(core.ETHERSCAN_API, core.eth_balance_params(address, chain))
+        return core.parse_eth_balance(response.json())
+    except Exception as e:
+        core.log.warning("Error fetching ETH balance: %s", e)
+        return 0
+
+async def get_native_price(chain=core.DEFAULT_CHAIN):
+    core.record_hot_tokens([core.NATIVE_TOKEN], chain)
+    cached = core.price_cache_get(core.NATIVE_TOKEN, chain) or core.stale_price(core.NATIVE_TOKEN, chain)
+    if cached:
+        return cached
+    price, _ = await single_flight(('native_price', chain), _refresh_native_price, chain)
+    return price
+
+async def fetch_native_price_coingecko(chain):
+    response = await upstream_get(f"{core.COINGECKO_API}/simple/price", core.native_price_params(chain))
+    return core.parse_native_price(response.json(), core.CHAINS[chain]['native_coin'])
+
+async def fetch_native_price_1inch(chain):
+    return await get_price_from_1inch(core.CHAINS[chain]['wrapped_native'], chain) or None
+
+NATIVE_PRICE_FETCHERS = {
+    'coingecko': fetch_native_price_coingecko,
+    '1inch': fetch_native_price_1inch,
+}
+
+async def _refresh_native_price(chain):
+    for source in core.price_source_order(core.NATIVE_PRICE_SOURCES):
+        try:
+            price = await NATIVE_PRICE_FETCHERS[source](chain)
+        except core.CircuitOpenError:
+            continue
+        except Exception as e:
+            core.log.warning("%s native price from %s failed: %s", chain, source, e)
+            continue
+        if price:
+            return await asyncio.to_thread(core.store_native_price, chain, price, source)
+    return await asyncio.to_thread(core.last_known_native_price, chain)
+
+async def get_token_balances(address, chain=core.DEFAULT_CHAIN):
+    address = address.lower()
+    try:
+        state = await asyncio.to_thread(core.begin_token_ingest, address, chain)
+    except Exception as e:
+        core.log.warning("Error loading token ledger: %s", e)
+        return []
+
+    pager = core.EtherscanPager(core.token_transfer_params(address, chain), startblock=state['last_block'] + 1)
+    try:
+        while not pager.done:
+            response = await upstream_get(core.ETHERSCAN_API, pager.next_params())
+            fresh = pager.feed(response.json())
+            if fresh:
+                core.ingest_token_chunk(state, fresh)
+    except Exception as e:
+        core.log.warning("Error fetching token balances: %s", e)
+        state['tail'].clear()
+
+    return await asyncio.to_thread(core.finish_token_ingest, state)
+
+async def fetch_coingecko_token_prices(contracts, chain=core.DEFAULT_CHAIN):
+    url = core.coingecko_token_price_url(chain)
+    return core.parse_coingecko_token_prices(await upstream_get(url, core.coingecko_token_price_params(contracts)))
+
+async def get_price_from_1inch(contract_address, chain=core.DEFAULT_CHAIN):
+    try:
+        response = await upstream_get(f"{core.ONEINCH_API}/{core.CHAINS[chain]['chain_id']}/{contract_address}")
+        return core.parse_1inch_price(response, contract_address)
+    except core.CircuitOpenError:
+        raise
+    except Exception:
+        return 0
+
+async def fetch_coingecko_prices(contracts, chain=core.DEFAULT_CHAIN):
+    prices = {}
+    batches = core.chunk_contracts(contracts)
+    answered = set()
+    while batches:
+        results = await asyncio.gather(*(fetch_coingecko_token_prices(batch, chain) for batch in batches), return_exceptions=True)
+        refused = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, core.CoinGeckoBatchLimitError) and len(batch) > 1:
+                core.shrink_coingecko_batch_size(len(batch))
+                refused.extend(batch)
+            elif isinstance(result, Exception):
+                if not isinstance(result, core.CircuitOpenError):
+                    core.log.warning("CoinGecko batch of %s failed: %s", len(batch), result)
+            else:
+                prices.update(result)
+                answered.update(batch)
+        # Batches the plan refused go again at the smaller size
+        batches = core.chunk_contracts(refused)
+
+    missing_majors = core.missing_major_tokens(prices, contracts, chain)
+    if missing_majors:
+        try:
+            coin_ids = list(missing_majors.values())
+            response = await upstream_get(f"{core.COINGECKO_API}/simple/price", {
+                'ids': ','.join(coin_ids),
+                'vs_currencies': 'usd'
+            })
+            prices_by_id = core.parse_coingecko_prices_by_id(response.json(), coin_ids)
+            for contract, coin_id in missing_majors.items():
+                if coin_id in prices_by_id:
+                    prices[contract] = prices_by_id[coin_id]
+        except core.CircuitOpenError:
+            pass
+        except Exception as e:
+            core.log.warning("CoinGecko id lookup failed: %s", e)
+    return prices, answered
+
+async def fetch_1inch_prices(contracts, chain=core.DEFAULT_CHAIN):
+    results = await asyncio.gather(*(get_price_from_1inch(c, chain) for c in contracts), return_exceptions=True)
+    prices = {contract: price for contract, price in zip(contracts, results)
+              if not isinstance(price, Exception) and price > 0}
+    return prices, set()
+
+TOKEN_PRICE_FETCHERS = {
+    'coingecko': fetch_coingecko_prices,
+    '1inch': fetch_1inch_prices,
+}
+
+async def fetch_token_prices(pending, chain=core.DEFAULT_CHAIN):
+    all_prices = {}
+    answered = set()
+    for source in core.price_source_order(core.TOKEN_PRICE_SOURCES):
+        remaining = [contract for contract in pending if contract not in all_prices]
+        if not remaining:
+            break
+        prices, source_answered = await TOKEN_PRICE_FETCHERS[source](remaining, chain)
+        all_prices.update(prices)
+        answered.update(source_answered)
+
+    for contract in pending:
+        all_prices.setdefault(contract, 0)
+    core.store_token_prices(all_prices, pending, answered, chain)
+    return all_prices
+
+async def get_all_token_prices(contract_addresses, chain=core.DEFAULT_CHAIN):
+    if not contract_addresses:
+        return {}
+
+    all_prices, pending = core.split_cached_prices(contract_addresses, chain)
+    if pending:
+        all_prices.update(await fetch_token_prices(pending, chain))
+    return all_prices
+
+async def get_token_price_by_contract(contract_address, chain=core.DEFAULT_CHAIN):
+    contract = contract_address.lower()
+    core.record_hot_tokens([contract], chain)
+    cached = core.price_cache_get(contract, chain)
+    if cached is None:
+        cached = core.stale_price(contract, chain)
+    if cached is not None:
+        return cached
+    try:
+        return (await fetch_token_prices([contract], chain))[contract]
+    except Exception as e:
+        core.log.warning("Error fetching price for %s: %s", contract_address, e)
+        return 0
+
+async def get_token_info(contract_address):
+    try:
+        creation_timestamp = await asyncio.to_thread(core.get_token_fact, contract_address, 'creation_timestamp')
+        if creation_timestamp is None:
+            response = await upstream_get(core.ETHERSCAN_API, core.token_creation_params(contract_address))
+            creation_timestamp = await asyncio.to_thread(core.parse_token_creation, contract_address, response.json())
+        return core.token_info_result(contract_address, creation_timestamp)
+    except Exception as e:
+        core.log.warning("Error fetching token info for %s: %s", contract_address, e)
+        return core.token_info_result(contract_address, None)
+
+async def check_honeypot(contract_address):
+    cached = await asyncio.to_thread(core.get_token_fact, contract_address, 'honeypot')
+    if cached is not None:
+        return cached
+    try:
+        response = await upstream_get(core.HONEYPOT_API, core.honeypot_params(contract_address))
+        return await asyncio.to_thread(core.parse_honeypot, contract_address, response)
+    except Exception as e:
+        core.log.warning("Error checking honeypot for %s: %s", contract_address, e)
+        return None
+
+async def get_token_holders_count(contract_address):
+    cached = await asyncio.to_thread(core.get_token_fact, contract_address, 'holder_count')
+    if cached is not None:
+        return cached
+    try:
+        response = await upstream_get(core.ETHERSCAN_API, core.holder_activity_params(contract_address))
+        return await asyncio.to_thread(core.parse_holder_count, contract_address, response.json())
+    except Exception as e:
+        core.log.warning("Error fetching holder count for %s: %s", contract_address, e)
+        return 0
+
+# Routes
+
+def query_arg(query, name, default, type=str):
+    """First value of a query parameter, converted like Flask's request.args.get"""
+    try:
+        return type(query[name][0])
+    except (KeyError, IndexError, ValueError):
+        return default
+
+def is_valid_address(address):
+    return address.startswith('0x') and len(address) == 42
+
+def wallet_deadline(query):
+    deadline_seconds = query_arg(query, 'deadline', core.WALLET_DEADLINE_SECONDS, float)
+    deadline_seconds = min(max(deadline_seconds, 1), core.WALLET_MAX_DEADLINE_SECONDS)
+    return time.monotonic() + deadline_seconds
+
+async def fetch_wallet(address, chain, deadline):
+    """One wallet on one chain, like core.begin_wallet_fetch .. finish_wallet_fetch"""
+    eth_balance_task = spawn(get_eth_balance(address, chain))
+    eth_price_task = spawn(get_native_price(chain))
+    holdings_task = spawn(get_token_balances(address, chain))
+
+    data_status = {}
+    token_holdings, data_status['token_holdings'] = await result_by_deadline(holdings_task, deadline, [])
+    prices_task = None
+    if token_holdings:
+        prices_task = spawn(get_all_token_prices([holding['contract'] for holding in token_holdings], chain))
+
+    eth_balance, data_status['eth_balance'] = await result_by_deadline(eth_balance_task, deadline, 0)
+    eth_price, data_status['eth_price'] = await result_by_deadline(eth_price_task, deadline, None)
+
+    token_prices = {}
+    if prices_task is not None:
+        token_prices, data_status['token_prices'] = await result_by_deadline(prices_task, deadline, {})
+    else:
+        data_status['token_prices'] = data_status['token_holdings']
+
+    return core.build_wallet_response(address, eth_balance, eth_price, token_holdings, token_prices, data_status, chain)
+
+async def wallet_view(query, address, chain=core.DEFAULT_CHAIN):
+    if not is_valid_address(address):
+        return 400, {'error': 'Invalid Ethereum address'}
+    # Hot wallets come from the snapshots app.py's worker thread keeps current
+    snapshot = await asyncio.to_thread(core.snapshot_for_request, address, 'wallet') if chain == core.DEFAULT_CHAIN else None
+    if snapshot is not None:
+        return 200, snapshot[0]
+    return 200, await fetch_wallet(address, chain, wallet_deadline(query))
+
+async def portfolio_view(query, address):
+    if not is_valid_address(address):
+        return 400, {'error': 'Invalid Ethereum address'}
+    try:
+        chains = core.parse_chains(query_arg(query, 'chains', ''))
+    except ValueError as e:
+        return 400, {'error': str(e)}
+
+    deadline = wallet_deadline(query)
+    wallets = await asyncio.gather(*(fetch_wallet(address, chain, deadline) for chain in chains))
+    return 200, core.build_portfolio_response(address, list(wallets))
+
+async def chains_view(query):
+    return 200, core.build_chains_response()
+
+async def token_price_view(query, contract, chain=core.DEFAULT_CHAIN):
+    price = await get_token_price_by_contract(contract, chain)
+    return 200, {
+        'contract': contract,
+        'chain': chain,
+        'price_usd': price
+    }
+
+async def transactions_view(query, address):
+    # Cursor paging, filters and the transaction index are app.py's (a lazy merge of three
+    # paged streams plus SQLite), run on a worker thread so the loop isn't blocked
+    args = {name: values[0] for name, values in query.items() if values}
+    body, status = await asyncio.to_thread(core.transactions_page, address, args)
+    return status, body
+
+async def risk_view(query, address):
+    if not is_valid_address(address):
+        return 400, {'error': 'Invalid Ethereum address'}
+    snapshot = await asyncio.to_thread(core.snapshot_for_request, address, 'risk')
+    if snapshot is not None:
+        return 200, snapshot[0]
+
+    try:
+        deadline = time.monotonic() + core.RISK_DEADLINE_SECONDS
+        token_holdings = await get_token_balances(address)
+
+        if not token_holdings:
+            return 200, {
+                'address': address,
+                'risk_score': 0,
+                'risk_level': 'SAFE',
+                'message': 'No token holdings found',
+                'risky_tokens': []
+            }
+
+        # As core.iter_risk_checks: RISK_CHECKS_PER_REQUEST checks in flight, and checks still
+        # waiting for a slot at the deadline are dropped instead of spending upstream budget
+        slots = asyncio.Semaphore(core.RISK_CHECKS_PER_REQUEST)
+
+        async def bounded(check, contract):
+            async with slots:
+                if time.monotonic() >= deadline:
+                    raise asyncio.TimeoutError(f"{check.__name__} dropped at the deadline")
+                return await check(contract)
+
+        checks = [(
+            holding,
+            spawn(bounded(get_token_info, holding['contract'])),
+            spawn(bounded(check_honeypot, holding['contract'])),
+            spawn(bounded(get_token_holders_count, holding['contract']))
+        ) for holding in token_holdings]
+
+        token_risks = []
+        missing_checks = 0
+        for holding, info_task, honeypot_task, holders_task in checks:
+            token_info, info_status = await result_by_deadline(info_task, deadline, None)
+            honeypot_data, honeypot_status = await result_by_deadline(honeypot_task, deadline, None)
+            holder_count, holders_status = await result_by_deadline(holders_task, deadline, None)
+            missing_checks += [info_status, honeypot_status, holders_status].count('missing')
+            token_risks.append(core.score_token_risk(holding, token_info, honeypot_data, holder_count))
+
+        return 200, core.build_risk_response(address, token_risks, missing_checks)
+    except Exception as e:
+        core.log.exception("Error in risk analysis for %s", address)
+        return 500, {
+            'address': address,
+            'error': 'Risk analysis failed',
+            'message': str(e)
+        }
+
+async def health_view(query):
+    return 200, {'status': 'healthy', 'message': 'Crypto wallet API is running (V2 + USD prices, asyncio)'}
+
+async def metrics_view(query):
+    # Shares app.py's registry, so both serving modes report the same metric names
+    return 200, await asyncio.to_thread(core.render_metrics)
+
+CHAIN_PATTERN = '(?P<chain>' + '|'.join(map(re.escape, core.CHAINS)) + ')'
+
+# (pattern, endpoint label for metrics - the Flask rule of the same route, view);
+# named groups are passed to the view as keyword arguments
+ROUTES = [
+    (re.compile(r'^/api/wallet/(?P<address>[^/]+)$'), '/api/wallet/<address>', wallet_view),
+    (re.compile(rf'^/api/{CHAIN_PATTERN}/wallet/(?P<address>[^/]+)$'),
+     f'/api/<{core.CHAIN_CONVERTER}:chain>/wallet/<address>', wallet_view),
+    (re.compile(r'^/api/portfolio/(?P<address>[^/]+)$'), '/api/portfolio/<address>', portfolio_view),
+    (re.compile(r'^/api/chains$'), '/api/chains', chains_view),
+    (re.compile(r'^/api/wallet/(?P<address>[^/]+)/transactions$'), '/api/wallet/<address>/transactions', transactions_view),
+    (re.compile(r'^/api/wallet/(?P<address>[^/]+)/risk-analysis$'), '/api/wallet/<address>/risk-analysis', risk_view),
+    (re.compile(r'^/api/token-price/(?P<contract>[^/]+)$'), '/api/token-price/<contract>', token_price_view),
+    (re.compile(rf'^/api/{CHAIN_PATTERN}/token-price/(?P<contract>[^/]+)$'),
+     f'/api/<{core.CHAIN_CONVERTER}:chain>/token-price/<contract>', token_price_view),
+    (re.compile(r'^/api/health$'), '/api/health', health_view),
+    (re.compile(r'^/api/metrics$'), '/api/metrics', metrics_view),
+]
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+]
+
+async def send_json(send, status, payload, extra_headers=()):
+    """Send a JSON payload, or a str as Prometheus text (the metrics view)"""
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), b'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body, content_type = json.dumps(payload, sort_keys=True).encode(), b'application/json'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'content-length', str(len(body)).encode()),
+            *CORS_HEADERS,
+            *extra_headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _client is not None:
+                await _client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] == 'OPTIONS':
+        # CORS preflight, matching flask-cors' permissive defaults
+        return await send_json(send, 200, {}, [
+            (b'access-control-allow-methods', b'GET, OPTIONS'),
+            (b'access-control-allow-headers', b'*'),
+        ])
+
+    for pattern, endpoint, view in ROUTES:
+        match = pattern.match(scope['path'])
+        if match:
+            break
+    else:
+        return await send_json(send, 404, {'error': 'Not found'})
+
+    if scope['method'] != 'GET':
+        return await send_json(send, 405, {'error': 'Method not allowed'})
+
+    # Tasks spawned by the view copy this context, so their upstream spans join the trace
+    trace = core.Trace()
+    core.current_trace.set(trace)
+    query = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        status, payload = await view(query, **match.groupdict())
+    except Exception:
+        core.log.exception("Unhandled error on %s", scope['path'])
+        status, payload = 500, {'error': 'Internal server error'}
+
+    total = time.perf_counter() - trace.started
+    core.observe(core.request_metrics, (scope['method'], endpoint, str(status)), total)
+    extra_headers = []
+    if core.SERVER_TIMING:
+        # No cpu entry: the event loop thread's CPU time is shared by every request in flight
+        extra_headers.append((b'server-timing', trace.server_timing(total).encode()))
+    await send_json(send, status, payload, extra_headers)
@@ -0,0 +1,145 @@
+"""Generate a deterministic synthetic fixture set for the offline benchmark.
+
+Layout (all JSON), read by mock_upstream.py:
+  wallets.json                          wallet addresses the load driver uses
+  etherscan/balance.json                {address: wei}
+  etherscan/<action>/<address>.json     result rows for txlist / tokentx / txlistinternal,
+                                        keyed by `address` or `contractaddress`
+  coingecko/token_prices.json           {contract: usd}, for every chain's platform
+  coingecko/prices.json                 {coin id: usd} for the chains' native coins
+  honeypot/<contract>.json              IsHoneypot payload (honeypot/default.json otherwise)
+  1inch.json                            {contract: usd} for tokens CoinGecko doesn't price
+
+Real payloads captured with `mock_upstream.py --record` are replayed ahead of these.
+"""
+import argparse
+import json
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+HEAD_BLOCK = 21_000_000
+BLOCK_SECONDS = 12
+HEAD_TIMESTAMP = 1_730_000_000
+# Native coin prices by CoinGecko id, and the wrapped tokens the backend prices them by on 1inch
+NATIVE_PRICES = {'ethereum': 3000.0, 'polygon-ecosystem-token': 0.5, 'binancecoin': 600.0}
+WRAPPED_NATIVES = {
+    '0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2': 'ethereum',  # WETH on Ethereum
+    '0x4200000000000000000000000000000000000006': 'ethereum',  # WETH on Base and OP Mainnet
+    '0x82af49447d8a07e3bd95bd0d56f35241523fbab1': 'ethereum',  # WETH on Arbitrum
+    '0x0d500b1d8e8ef31e21c99d1db9a6444d3adf1270': 'polygon-ecosystem-token',  # WPOL
+    '0xbb4cdb9cbd36b01bd1cbb33eba14c9bac6ddf10f': 'binancecoin',  # WBNB
+}
+
+
+def address(rng):
+    return '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+
+
+def tx_hash(rng):
+    return '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(64))
+
+
+def block_row(block, rng):
+    return {
+        'blockNumber': str(block),
+        'timeStamp': str(HEAD_TIMESTAMP - (HEAD_BLOCK - block) * BLOCK_SECONDS),
+        'hash': tx_hash(rng),
+        'transactionIndex': str(rng.randint(0, 200)),
+        'gas': '21000',
+        'gasPrice': str(rng.randint(5, 80) * 10**9),
+        'gasUsed': str(rng.randint(21000, 250000)),
+        'isError': '0',
+    }
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def generate(out_dir=FIXTURES_DIR, wallets=5, tokens=40, transfers=500, seed=1):
+    rng = random.Random(seed)
+    token_list = [{
+        'contract': address(rng),
+        'name': f'Token {i}',
+        'symbol': f'TK{i}',
+        'decimals': rng.choice([6, 8, 18, 18, 18]),
+    } for i in range(tokens)]
+    wallet_list = [address(rng) for _ in range(wallets)]
+
+    balances = {}
+    per_token_transfers = {token['contract']: [] for token in token_list}
+    for wallet in wallet_list:
+        balances[wallet] = str(rng.randint(0, 50 * 10**18))
+        txlist, tokentx, internal = [], [], []
+        for _ in range(transfers):
+            block = HEAD_BLOCK - rng.randint(0, 2_000_000)
+            counterparty = address(rng)
+            incoming = rng.random() < 0.6
+            sides = {'from': counterparty, 'to': wallet} if incoming else {'from': wallet, 'to': counterparty}
+            kind = rng.random()
+            if kind < 0.6:
+                token = rng.choice(token_list)
+                row = dict(block_row(block, rng), **sides, contractAddress=token['contract'],
+                           value=str(rng.randint(1, 10**6) * 10**token['decimals'] // 100),
+                           tokenName=token['name'], tokenSymbol=token['symbol'],
+                           tokenDecimal=str(token['decimals']))  # Etherscan's tokentx rows carry no logIndex
+                tokentx.append(row)
+                per_token_transfers[token['contract']].append(row)
+            elif kind < 0.9:
+                txlist.append(dict(block_row(block, rng), **sides, value=str(rng.randint(0, 5 * 10**18)),
+                                   contractAddress='', input='0x'))
+            else:
+                row = dict(block_row(block, rng), **sides, value=str(rng.randint(0, 10**18)),
+                           contractAddress='', type='call', traceId='0', errCode='')
+                del row['transactionIndex']
+                internal.append(row)
+        for action, rows in (('txlist', txlist), ('tokentx', tokentx), ('txlistinternal', internal)):
+            rows.sort(key=lambda row: int(row['blockNumber']))
+            write(os.path.join(out_dir, 'etherscan', action, f'{wallet}.json'), rows)
+
+    token_prices, oneinch = {}, {}
+    for token in token_list:
+        contract = token['contract']
+        rows = sorted(per_token_transfers[contract], key=lambda row: int(row['blockNumber']))
+        write(os.path.join(out_dir, 'etherscan', 'tokentx', f'{contract}.json'), rows)
+        # Contract creation: the token's first txlist row
+        created = HEAD_BLOCK - rng.randint(1000, 3_000_000)
+        write(os.path.join(out_dir, 'etherscan', 'txlist', f'{contract}.json'),
+              [dict(block_row(created, rng), **{'from': address(rng), 'to': '', 'value': '0', 'contractAddress': contract})])
+        roll = rng.random()
+        if roll < 0.75:
+            token_prices[contract] = round(rng.uniform(0.001, 500), 6)
+        elif roll < 0.85:
+            oneinch[contract] = round(rng.uniform(0.001, 5), 6)
+        if rng.random() < 0.1:
+            write(os.path.join(out_dir, 'honeypot', f'{contract}.json'), {
+                'honeypotResult': {'isHoneypot': True, 'honeypotReason': 'Sell fails'},
+                'simulationResult': {'buyTax': 0, 'sellTax': 100}
+            })
+
+    write(os.path.join(out_dir, 'wallets.json'), wallet_list)
+    write(os.path.join(out_dir, 'etherscan', 'balance.json'), balances)
+    write(os.path.join(out_dir, 'coingecko', 'token_prices.json'), token_prices)
+    write(os.path.join(out_dir, 'coingecko', 'prices.json'), NATIVE_PRICES)
+    write(os.path.join(out_dir, 'honeypot', 'default.json'), {
+        'honeypotResult': {'isHoneypot': False},
+        'simulationResult': {'buyTax': 0, 'sellTax': 0}
+    })
+    for contract, coin in WRAPPED_NATIVES.items():
+        oneinch[contract] = NATIVE_PRICES[coin]  # The backend's native price fallback
+    write(os.path.join(out_dir, '1inch.json'), oneinch)
+    return out_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=FIXTURES_DIR)
+    parser.add_argument('--wallets', type=int, default=5)
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--transfers', type=int, default=500, help='transactions per wallet')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(f"Fixtures written to {generate(args.out, args.wallets, args.tokens, args.transfers, args.seed)}")
@@ -0,0 +1,343 @@
+"""Stand-in Etherscan / CoinGecko / Honeypot.is / 1inch servers that replay fixtures.
+
+Each upstream listens on its own port (consecutive from --port) so the backend's
+per-host pools, timeouts and rate-limit buckets behave as they do in production.
+Latency, jitter, error rate and a per-upstream token-bucket rate limit are
+configurable; a rate-limited Etherscan call gets the 200 "Max rate limit reached"
+payload the real API sends, the others a 429 with Retry-After.
+
+    python bench/mock_upstream.py --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+
+prints the environment to point app.py / asgi.py at it. Every chain is answered from the
+same fixtures (the chainid / platform in a request is ignored). With --record, requests
+that no fixture answers are proxied to the real upstream and the response saved
+under fixtures/recorded/ for replay.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+
+from make_fixtures import BLOCK_SECONDS, FIXTURES_DIR, HEAD_BLOCK, HEAD_TIMESTAMP
+
+UPSTREAMS = ['etherscan', 'coingecko', 'honeypot', '1inch']
+REAL_URLS = {
+    'etherscan': "https://api.etherscan.io/v2/api",
+    'coingecko': "https://api.coingecko.com/api/v3",
+    'honeypot': "https://api.honeypot.is/v2/IsHoneypot",
+    '1inch': "https://api.1inch.dev/price/v1.1",
+}
+ENV_VARS = {
+    'etherscan': ('ETHERSCAN_API_URL', '/v2/api'),
+    'coingecko': ('COINGECKO_API_URL', '/api/v3'),
+    'honeypot': ('HONEYPOT_API_URL', '/v2/IsHoneypot'),
+    '1inch': ('ONEINCH_API_URL', '/price/v1.1'),
+}
+# Extra counter labels for injected faults; the call itself is also counted under its action
+FAULT_LABELS = ('outage', 'rate_limited', 'error')
+# Params that don't change the answer and are left out of recorded-response keys
+VOLATILE_PARAMS = {'apikey', 'x_cg_demo_api_key'}
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class Fixtures:
+    """Fixture files loaded lazily and kept in memory"""
+
+    def __init__(self, root):
+        self.root = root
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def load(self, *parts, default=None):
+        path = os.path.join(self.root, *parts)
+        with self.lock:
+            if path not in self.cache:
+                try:
+                    with open(path) as f:
+                        self.cache[path] = json.load(f)
+                except FileNotFoundError:
+                    self.cache[path] = None
+            value = self.cache[path]
+        return default if value is None else value
+
+    def save(self, value, *parts):
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(value, f)
+        with self.lock:
+            self.cache[path] = value
+
+
+def etherscan_ok(result):
+    return {'status': '1', 'message': 'OK', 'result': result}
+
+
+def etherscan_answer(fixtures, params):
+    action = params.get('action')
+    if action == 'balance':
+        balances = fixtures.load('etherscan', 'balance.json', default={})
+        return 200, etherscan_ok(balances.get(params.get('address', '').lower(), '0'))
+    if action == 'balancemulti':
+        balances = fixtures.load('etherscan', 'balance.json', default={})
+        return 200, etherscan_ok([{'account': a, 'balance': balances.get(a.lower(), '0')}
+                                  for a in params.get('address', '').split(',') if a])
+    if action == 'eth_blockNumber':
+        # The chain keeps growing from the fixtures' head block at mainnet block time
+        block = HEAD_BLOCK + max(0, int(time.time()) - HEAD_TIMESTAMP) // BLOCK_SECONDS
+        return 200, {'jsonrpc': '2.0', 'id': 83, 'result': hex(block)}
+    if action not in ('txlist', 'tokentx', 'txlistinternal'):
+        return 200, {'status': '0', 'message': 'NOTOK', 'result': f'Error! Invalid action {action}'}
+
+    key = (params.get('address') or params.get('contractaddress') or '').lower()
+    rows = fixtures.load('etherscan', action, f'{key}.json', default=[])
+    start = int(params.get('startblock', 0))
+    end = int(params.get('endblock', 99999999))
+    rows = [row for row in rows if start <= int(row['blockNumber']) <= end]
+    if params.get('sort') == 'desc':
+        rows = rows[::-1]
+    page = max(int(params.get('page', 1)), 1)
+    offset = int(params.get('offset', 10000))
+    if page * offset > 10000:
+        return 200, {'status': '0', 'message': 'NOTOK', 'result': 'Result window is too large, PageNo x Offset size must be less than or equal to 10000'}
+    rows = rows[(page - 1) * offset:page * offset]
+    if not rows:
+        return 200, {'status': '0', 'message': 'No transactions found', 'result': []}
+    return 200, etherscan_ok(rows)
+
+
+def coingecko_answer(fixtures, path, params):
+    if '/simple/token_price/' in path:
+        prices = fixtures.load('coingecko', 'token_prices.json', default={})
+        contracts = [c.lower() for c in params.get('contract_addresses', '').split(',') if c]
+        return 200, {c: {'usd': prices[c]} for c in contracts if c in prices}
+    if path.endswith('/simple/price'):
+        prices = fixtures.load('coingecko', 'prices.json', default={})
+        ids = [i for i in params.get('ids', '').split(',') if i]
+        return 200, {i: {'usd': prices[i]} for i in ids if i in prices}
+    return 404, {'error': 'Not found'}
+
+
+def honeypot_answer(fixtures, params):
+    contract = params.get('address', '').lower()
+    return 200, fixtures.load('honeypot', f'{contract}.json', default=None) or fixtures.load('honeypot', 'default.json', default={})
+
+
+def oneinch_answer(fixtures, path):
+    contract = path.rstrip('/').rsplit('/', 1)[-1].lower()
+    prices = fixtures.load('1inch.json', default={})
+    if contract not in prices:
+        return 404, {'error': 'Token not found'}
+    return 200, {contract: prices[contract]}
+
+
+def call_label(name, path, params):
+    """Counter key for a call: the Etherscan action or the endpoint path"""
+    if name == 'etherscan':
+        return params.get('action', '?')
+    if name == '1inch':
+        return 'price'
+    return path[len(ENV_VARS[name][1]):].strip('/') or name
+
+
+class MockUpstream:
+    """One HTTP server per upstream sharing fixtures, fault settings and call counters"""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, host='127.0.0.1', port=9100, latency_ms=0,
+                 jitter_ms=0, error_rate=0.0, rate_limits=None, record=False, seed=None, outages=()):
+        self.fixtures = Fixtures(fixtures_dir)
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.buckets = {name: TokenBucket(rate) for name, rate in (rate_limits or {}).items() if rate}
+        self.record = record
+        self.outages = set(outages)  # Upstreams answering every call with a 503 (mutable at runtime)
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.servers = []
+
+    def base_url(self, name):
+        return f"http://{self.host}:{self.port + UPSTREAMS.index(name)}{ENV_VARS[name][1]}"
+
+    def env(self):
+        return {ENV_VARS[name][0]: self.base_url(name) for name in UPSTREAMS}
+
+    def snapshot(self):
+        with self.lock:
+            return Counter(self.calls)
+
+    def count(self, name, action):
+        with self.lock:
+            self.calls[(name, action)] += 1
+
+    def delay(self):
+        with self.lock:
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            fail = self.random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def answer(self, name, path, params):
+        """(status, json body, extra headers) for one request"""
+        if name in self.outages:
+            self.count(name, 'outage')
+            return 503, {'error': 'Service unavailable'}, {}
+        bucket = self.buckets.get(name)
+        if bucket and not bucket.take():
+            self.count(name, 'rate_limited')
+            if name == 'etherscan':
+                return 200, {'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'}, {}
+            return 429, {'error': 'Too Many Requests'}, {'Retry-After': '1'}
+        if self.delay():
+            self.count(name, 'error')
+            return 500, {'error': 'Injected failure'}, {}
+
+        if self.record:
+            recorded = self.fixtures.load('recorded', name, f'{self.record_key(path, params)}.json')
+            if recorded is not None:
+                return recorded['status'], recorded['body'], {}
+
+        if name == 'etherscan':
+            status, body = etherscan_answer(self.fixtures, params)
+        elif name == 'coingecko':
+            status, body = coingecko_answer(self.fixtures, path, params)
+        elif name == 'honeypot':
+            status, body = honeypot_answer(self.fixtures, params)
+        else:
+            status, body = oneinch_answer(self.fixtures, path)
+
+        if self.record and (status != 200 or body.get('message') == 'No transactions found' or not body):
+            status, body = self.proxy(name, path, params)
+        return status, body, {}
+
+    def record_key(self, path, params):
+        stable = sorted((k, v) for k, v in params.items() if k not in VOLATILE_PARAMS)
+        return hashlib.sha1(f"{path}?{urlencode(stable)}".encode()).hexdigest()
+
+    def proxy(self, name, path, params):
+        suffix = path[len(ENV_VARS[name][1]):]
+        response = requests.get(REAL_URLS[name] + suffix, params=params, timeout=30)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {'error': response.text[:200]}
+        if response.status_code != 429:
+            self.fixtures.save({'status': response.status_code, 'body': body},
+                               'recorded', name, f'{self.record_key(path, params)}.json')
+        return response.status_code, body
+
+    def handler(self, name):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = dict(parse_qsl(url.query))
+                mock.count(name, call_label(name, url.path, params))
+                status, body, headers = mock.answer(name, url.path, params)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        for offset, name in enumerate(UPSTREAMS):
+            server = ThreadingHTTPServer((self.host, self.port + offset), self.handler(name))
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+        return self
+
+    def stop(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+def parse_rate_limits(values):
+    """['etherscan=5', 'coingecko=0.5'] -> {'etherscan': 5.0, 'coingecko': 0.5}"""
+    limits = {}
+    for value in values or []:
+        name, _, rate = value.partition('=')
+        if name not in UPSTREAMS:
+            raise argparse.ArgumentTypeError(f"Unknown upstream {name!r}; expected one of {', '.join(UPSTREAMS)}")
+        limits[name] = float(rate)
+    return limits
+
+
+def add_mock_arguments(parser):
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--port', type=int, default=9100, help='first of four consecutive ports')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with a 500')
+    parser.add_argument('--rate-limit', action='append', metavar='UPSTREAM=PER_SECOND',
+                        help='token-bucket limit, e.g. etherscan=5 (repeatable)')
+    parser.add_argument('--outage', action='append', choices=UPSTREAMS, default=[],
+                        help='answer every call to this upstream with a 503 (repeatable)')
+    parser.add_argument('--record', action='store_true', help='proxy fixture misses to the real upstream and save them')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def mock_from_args(args):
+    return MockUpstream(args.fixtures, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, rate_limits=parse_rate_limits(args.rate_limit),
+                        record=args.record, seed=args.seed, outages=args.outage)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    if not os.path.exists(os.path.join(args.fixtures, 'wallets.json')):
+        from make_fixtures import generate
+        generate(args.fixtures)
+    mock = mock_from_args(args).start()
+    print("Mock upstreams running; start the backend with:")
+    for var, url in mock.env().items():
+        print(f"  export {var}={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
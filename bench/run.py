@@ -0,0 +1,198 @@
+"""Offline load driver: runs the backend against the mock upstreams and reports latency.
+
+    python bench/run.py --concurrency 8 --duration 30 --latency-ms 80 --rate-limit etherscan=5
+
+Starts mock_upstream.py in-process (generating fixtures if needed), serves app.py on a
+local port with a throwaway database, and drives a weighted mix of /api/wallet,
+/transactions and /risk-analysis (and, if asked for, the all-chain /api/portfolio)
+at fixed concurrency. Reports p50/p95/p99 latency,
+throughput and upstream calls per request for each endpoint. Pass --target to measure
+an already-running backend (e.g. asgi.py under uvicorn) started with the mock's env.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from make_fixtures import generate
+from mock_upstream import FAULT_LABELS, add_mock_arguments, mock_from_args
+
+ENDPOINTS = {
+    'wallet': '/api/wallet/{address}',
+    'transactions': '/api/wallet/{address}/transactions',
+    'risk-analysis': '/api/wallet/{address}/risk-analysis',
+    'portfolio': '/api/portfolio/{address}',
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def start_local_backend(mock, port, cold):
+    """Import app.py with upstream URLs pointed at the mock and serve it threaded"""
+    os.environ.update(mock.env())
+    os.environ.setdefault('VERIFIL_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='verifil-bench-'), 'bench.db'))
+    if cold:
+        # Every request recomputes instead of being served from the response cache
+        os.environ.setdefault('WALLET_RESPONSE_TTL', '0')
+        os.environ.setdefault('TRANSACTIONS_RESPONSE_TTL', '0')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import app as backend
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', port, backend.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def count_calls(counter):
+    return sum(count for (upstream, action), count in counter.items() if action not in FAULT_LABELS)
+
+
+def drive(target, wallets, mix, concurrency, duration, mock):
+    """Issue requests from `concurrency` workers until `duration` elapses"""
+    endpoints = list(mix)
+    weights = [mix[name] for name in endpoints]
+    latencies = defaultdict(list)
+    errors = Counter()
+    upstream_calls = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            name = rng.choices(endpoints, weights)[0]
+            url = target + ENDPOINTS[name].format(address=rng.choice(wallets))
+            before = mock.snapshot() if concurrency == 1 else None
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=120).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[name].append(elapsed)
+                if not ok:
+                    errors[name] += 1
+                if before is not None:
+                    upstream_calls[name] += count_calls(mock.snapshot() - before)
+
+    start_calls = mock.snapshot()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    total_calls = mock.snapshot() - start_calls
+
+    total_requests = sum(len(values) for values in latencies.values())
+    report = {'concurrency': concurrency, 'duration_s': round(wall, 2), 'endpoints': {}}
+    for name in endpoints:
+        values = sorted(latencies[name])
+        if not values:
+            continue
+        entry = {
+            'requests': len(values),
+            'errors': errors[name],
+            'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 1),
+            'throughput_rps': round(len(values) / wall, 2),
+        }
+        # With one worker calls are attributed per request; otherwise they're shared out
+        if concurrency == 1:
+            entry['upstream_calls_per_request'] = round(upstream_calls[name] / len(values), 2)
+        report['endpoints'][name] = entry
+    report['total'] = {
+        'requests': total_requests,
+        'throughput_rps': round(total_requests / wall, 2),
+        'upstream_calls': count_calls(total_calls),
+        'upstream_calls_per_request': round(count_calls(total_calls) / max(total_requests, 1), 2),
+        'upstream_calls_by_action': {f"{upstream}:{action}": count for (upstream, action), count in sorted(total_calls.items())},
+    }
+    return report
+
+
+def print_report(report):
+    print(f"\n{'endpoint':<15}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'calls/req':>11}")
+    for name, entry in report['endpoints'].items():
+        calls = entry.get('upstream_calls_per_request', '-')
+        print(f"{name:<15}{entry['requests']:>7}{entry['errors']:>6}{entry['p50_ms']:>10}{entry['p95_ms']:>10}"
+              f"{entry['p99_ms']:>10}{entry['throughput_rps']:>9}{calls:>11}")
+    total = report['total']
+    print(f"\n{total['requests']} requests in {report['duration_s']}s at concurrency {report['concurrency']}: "
+          f"{total['throughput_rps']} req/s, {total['upstream_calls_per_request']} upstream calls/request")
+    for key, count in total['upstream_calls_by_action'].items():
+        print(f"  {key:<36}{count:>8}")
+
+
+def parse_mix(value):
+    """'wallet=5,transactions=3,risk-analysis=2' -> {'wallet': 5.0, ...}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_mock_arguments(parser)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('wallet=5,transactions=3,risk-analysis=2'))
+    parser.add_argument('--target', help='base URL of a backend already pointed at the mock')
+    parser.add_argument('--backend-port', type=int, default=5050)
+    parser.add_argument('--cold', action='store_true', help='disable the response cache for wallet/transactions')
+    parser.add_argument('--warmup', type=float, default=0, help='seconds of unreported load first')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.fixtures, 'wallets.json')):
+        generate(args.fixtures)
+    with open(os.path.join(args.fixtures, 'wallets.json')) as f:
+        wallets = json.load(f)
+
+    mock = mock_from_args(args).start()
+    server = None
+    if args.target:
+        target = args.target.rstrip('/')
+    else:
+        server, target = start_local_backend(mock, args.backend_port, args.cold)
+
+    try:
+        if args.warmup:
+            drive(target, wallets, args.mix, args.concurrency, args.warmup, mock)
+        report = drive(target, wallets, args.mix, args.concurrency, args.duration, mock)
+        report['mock'] = {'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+                          'error_rate': args.error_rate, 'rate_limits': args.rate_limit or []}
+        print_report(report)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        if server is not None:
+            server.shutdown()
+        mock.stop()
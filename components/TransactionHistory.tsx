@@ -13,6 +13,8 @@ interface TransactionHistoryProps {
 export default function TransactionHistory({ address }: TransactionHistoryProps) {
   const [transactions, setTransactions] = useState<Transaction[]>([])
   const [isLoading, setIsLoading] = useState(false)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [filter, setFilter] = useState<'all' | 'eth' | 'tokens'>('all')
   const [txPage, setTxPage] = useState(1);
   const txPerPage = 10;
@@ -29,6 +31,7 @@ export default function TransactionHistory({ address }: TransactionHistoryProps)
     try {
       const data = await walletApi.getTransactions(address, 50, filter)
       setTransactions(data.transactions)
+      setNextCursor(data.next_cursor)
     } catch (error) {
       console.error('Error fetching transactions:', error)
     } finally {
@@ -36,6 +39,20 @@ export default function TransactionHistory({ address }: TransactionHistoryProps)
     }
   }
 
+  const loadOlderTransactions = async () => {
+    if (!nextCursor) return
+    setIsLoadingMore(true)
+    try {
+      const data = await walletApi.getTransactions(address, 50, filter, nextCursor)
+      setTransactions(prev => [...prev, ...data.transactions])
+      setNextCursor(data.next_cursor)
+    } catch (error) {
+      console.error('Error fetching older transactions:', error)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   const getTransactionIcon = (tx: Transaction) => {
     if (tx.type === 'receive') {
       return <ArrowDown className="w-4 h-4 text-green-400" />
@@ -161,6 +178,17 @@ export default function TransactionHistory({ address }: TransactionHistoryProps)
         setPage={setTxPage}
         itemsPerPage={txPerPage}
       />
+      {nextCursor && txPage >= Math.ceil(transactions.length / txPerPage) && (
+        <div className="flex justify-center -mt-6 mb-10">
+          <button
+            onClick={loadOlderTransactions}
+            disabled={isLoadingMore}
+            className="px-4 py-2 text-sm border border-border rounded-lg hover:bg-muted/50 transition-colors disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load older transactions'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -7,8 +7,13 @@ const api = axios.create({
   timeout: 30000,
 })
 
+export type ChainId = 'ethereum' | 'base' | 'arbitrum' | 'optimism' | 'polygon' | 'bsc'
+
 export interface WalletData {
   address: string
+  chain: ChainId
+  // The eth_* fields hold the chain's native coin (ETH, POL or BNB)
+  native_symbol: string
   eth_balance: number
   eth_price_usd: number
   eth_value_usd: number
@@ -16,12 +21,42 @@ export interface WalletData {
   total_token_value_usd: number
   total_portfolio_value_usd: number
   holdings_count: number
+  // 'stale' or 'missing' when an upstream missed the request deadline
+  data_status?: Record<'eth_balance' | 'eth_price' | 'token_holdings' | 'token_prices', 'ok' | 'stale' | 'missing'>
+  partial?: boolean
+  // Set when eth_price_usd is the last known good price (unix seconds it was fetched)
+  eth_price_updated_at?: number
+  snapshot?: SnapshotInfo
+}
+
+// Present when the response was served from the server's precomputed snapshot
+export interface SnapshotInfo {
+  // Goes up only when the snapshot's content changed
+  version: number
+  block: number | null
+  computed_at: number
+  age_seconds: number
+  // Past its max age and being recomputed in the background
+  stale: boolean
+}
+
+export interface PortfolioData {
+  address: string
+  chains: WalletData[]
+  value_by_chain: Partial<Record<ChainId, number>>
+  total_token_value_usd: number
+  total_portfolio_value_usd: number
+  holdings_count: number
+  partial: boolean
 }
 
 export interface TokenHolding {
   name: string
   symbol: string
   balance: number
+  // Exact integer amount in the token's smallest unit; balance is rounded for display
+  balance_raw?: string
+  decimals?: number
   contract: string
   price_usd: number
   value_usd: number
@@ -34,6 +69,8 @@ export interface Transaction {
   to: string
   value_eth?: number
   value?: number
+  value_raw?: string
+  decimals?: number
   value_usd?: number
   timestamp: number
   block_number: number
@@ -44,6 +81,18 @@ export interface Transaction {
   token_name?: string
   token_symbol?: string
   contract_address?: string
+  // ETH moved by a contract call rather than sent directly
+  internal?: boolean
+}
+
+// Answered from the server's transaction index; since/until take unix seconds or ISO dates
+export interface TransactionFilters {
+  since?: number | string
+  until?: number | string
+  token?: string
+  counterparty?: string
+  direction?: 'send' | 'receive'
+  min_value?: number
 }
 
 export interface RiskAnalysis {
@@ -54,6 +103,10 @@ export interface RiskAnalysis {
   risky_tokens_count: number
   risky_tokens: RiskyToken[]
   recommendations: string[]
+  // Checks that missed the server-side deadline and were skipped
+  missing_checks?: number
+  partial?: boolean
+  snapshot?: SnapshotInfo
 }
 
 export interface RiskyToken {
@@ -71,24 +124,56 @@ export interface StatsData {
   scams_detected: number;
 }
 
+function openEventStream(path: string, handlers: Record<string, (data: any) => void>): () => void {
+  const source = new EventSource(`${API_BASE_URL}${path}`)
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)))
+  })
+  // The server closes the stream after 'summary'; stop EventSource from reconnecting
+  source.addEventListener('summary', () => source.close())
+  source.onerror = () => source.close()
+  return () => source.close()
+}
+
 export const walletApi = {
   // Get wallet information
-  async getWallet(address: string): Promise<WalletData> {
-    const response = await api.get(`/api/wallet/${address}`)
+  async getWallet(address: string, chain: ChainId = 'ethereum'): Promise<WalletData> {
+    const response = await api.get(chain === 'ethereum' ? `/api/wallet/${address}` : `/api/${chain}/wallet/${address}`)
+    return response.data
+  },
+
+  // Get one wallet across chains in a single request (all supported chains by default)
+  async getPortfolio(address: string, chains?: ChainId[]): Promise<PortfolioData> {
+    const response = await api.get(`/api/portfolio/${address}`, {
+      params: chains ? { chains: chains.join(',') } : {}
+    })
+    return response.data
+  },
+
+  // Get many wallets in one request (batched balances, shared token pricing)
+  async getWallets(addresses: string[]): Promise<{
+    wallets: WalletData[]
+    count: number
+    total_portfolio_value_usd: number
+  }> {
+    const response = await api.post('/api/wallets', { addresses })
     return response.data
   },
 
-  // Get wallet transactions
-  async getTransactions(address: string, limit = 50, type = 'all'): Promise<{
+  // Get wallet transactions, newest first; pass next_cursor back to get the next (older) page
+  async getTransactions(address: string, limit = 50, type = 'all', cursor?: string | null, filters: TransactionFilters = {}): Promise<{
     address: string
     transactions: Transaction[]
     total_count: number
     sent_count: number
     received_count: number
     limit: number
+    next_cursor: string | null
+    partial?: boolean
+    source?: 'index' | 'live'
   }> {
     const response = await api.get(`/api/wallet/${address}/transactions`, {
-      params: { limit, type }
+      params: cursor ? { limit, type, cursor, ...filters } : { limit, type, ...filters }
     })
     return response.data
   },
@@ -99,6 +184,27 @@ export const walletApi = {
     return response.data
   },
 
+  // Stream wallet results as they arrive; returns a function that closes the stream
+  streamWallet(address: string, handlers: Record<string, (data: any) => void>): () => void {
+    return openEventStream(`/api/wallet/${address}/stream`, handlers)
+  },
+
+  // Stream per-token risk results as each token's checks finish
+  streamRiskAnalysis(address: string, handlers: Record<string, (data: any) => void>): () => void {
+    return openEventStream(`/api/wallet/${address}/risk-analysis/stream`, handlers)
+  },
+
+  // Watch wallets/tokens for server-pushed changes instead of polling.
+  // 'wallet' and 'token' handlers get { key, full, changes }; EventSource reconnects on its own
+  watch(wallets: string[], tokens: string[], handlers: Record<string, (data: any) => void>): () => void {
+    const params = new URLSearchParams({ wallets: wallets.join(','), tokens: tokens.join(',') })
+    const source = new EventSource(`${API_BASE_URL}/api/watch?${params}`)
+    Object.entries(handlers).forEach(([event, handler]) => {
+      source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)))
+    })
+    return () => source.close()
+  },
+
   // Health check
   async healthCheck(): Promise<{ status: string; message: string }> {
     const response = await api.get('/api/health')
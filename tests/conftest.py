@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+import time
+import types
+
+import pytest
+
+# app opens its SQLite database at import time; keep the tests off the real one
+os.environ.setdefault('VERIFIL_DB_PATH', os.path.join(tempfile.mkdtemp(), 'verifil-test.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Clock for app's `time`: time() and monotonic() both read it, sleep() advances it"""
+    
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    import app
+    clock = FakeClock()
+    fake_time = types.SimpleNamespace(**vars(time))
+    fake_time.time = fake_time.monotonic = clock
+    fake_time.sleep = clock.advance
+    monkeypatch.setattr(app, 'time', fake_time)
+    return clock
@@ -0,0 +1,162 @@
+"""CircuitBreaker state machine, and one breaker outcome per logical upstream call"""
+import pytest
+import requests
+
+import app
+
+
+@pytest.fixture
+def breaker(clock):
+    return app.CircuitBreaker('test')
+
+
+def fail(breaker, times=1, seconds=0.1):
+    for _ in range(times):
+        breaker.record(False, seconds)
+
+
+def open_breaker(breaker):
+    fail(breaker, app.CIRCUIT_CONSECUTIVE_FAILURES)
+    assert breaker.state == 'open'
+
+
+def test_consecutive_failures_open(breaker):
+    fail(breaker, app.CIRCUIT_CONSECUTIVE_FAILURES - 1)
+    assert breaker.state == 'closed' and breaker.allow()
+    fail(breaker)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats['rejected'] == 1
+
+
+def test_failure_ratio_opens(breaker):
+    # Never CIRCUIT_CONSECUTIVE_FAILURES in a row; the ratio counts from CIRCUIT_MIN_CALLS on
+    for ok in [False, True, False, True]:
+        breaker.record(ok, 0.1)
+    assert breaker.state == 'closed'
+    breaker.record(False, 0.1)
+    assert breaker.state == 'open'
+
+
+def test_slow_calls_count_as_failures(breaker):
+    for _ in range(app.CIRCUIT_CONSECUTIVE_FAILURES):
+        breaker.record(True, app.CIRCUIT_SLOW_CALL_SECONDS + 1)
+    assert breaker.state == 'open'
+    assert breaker.stats['slow_calls'] == app.CIRCUIT_CONSECUTIVE_FAILURES
+    assert breaker.stats['failures'] == 0
+
+
+def test_single_probe_after_cooldown(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(app.CIRCUIT_OPEN_SECONDS - 1)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()  # One probe at a time
+
+
+def test_good_probe_closes_and_resets(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(app.CIRCUIT_OPEN_SECONDS)
+    breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == 'closed'
+    assert breaker.open_seconds == app.CIRCUIT_OPEN_SECONDS
+    assert not breaker.outcomes and breaker.consecutive_failures == 0
+    fail(breaker, app.CIRCUIT_CONSECUTIVE_FAILURES - 1)
+    assert breaker.state == 'closed'
+
+
+def test_failed_probes_double_cooldown_up_to_max(breaker, clock):
+    open_breaker(breaker)
+    cooldowns = []
+    for _ in range(8):
+        clock.advance(breaker.open_seconds)
+        assert breaker.allow()
+        fail(breaker)
+        assert breaker.state == 'open'
+        cooldowns.append(breaker.open_seconds)
+    expected = [min(app.CIRCUIT_OPEN_SECONDS * 2 ** n, app.CIRCUIT_MAX_OPEN_SECONDS) for n in range(1, 9)]
+    assert cooldowns == expected
+    assert cooldowns[-1] == app.CIRCUIT_MAX_OPEN_SECONDS
+
+
+def test_stale_probe_is_given_up(breaker, clock):
+    open_breaker(breaker)
+    clock.advance(app.CIRCUIT_OPEN_SECONDS)
+    assert breaker.allow()  # This probe never reports back
+    clock.advance(app.CIRCUIT_OPEN_SECONDS - 1)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+
+
+def test_rate_limited_calls_are_not_failures(breaker, clock):
+    for _ in range(app.CIRCUIT_WINDOW):
+        breaker.record(False, 0.1, rate_limited=True)
+    assert breaker.state == 'closed'
+    assert breaker.stats['rate_limited'] == app.CIRCUIT_WINDOW
+    
+    # A rate-limited probe leaves the next call free to probe
+    open_breaker(breaker)
+    clock.advance(app.CIRCUIT_OPEN_SECONDS)
+    assert breaker.allow()
+    breaker.record(False, 0.1, rate_limited=True)
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = b'{}'
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """A fresh CoinGecko breaker, no rate limiting and no backoff"""
+    breaker = app.CircuitBreaker('coingecko')
+    monkeypatch.setitem(app.circuit_breakers, app.COINGECKO_HOST, breaker)
+    monkeypatch.setattr(app, 'wait_for_rate_limit', lambda host, api_key='': 0)
+    monkeypatch.setattr(app, 'penalize_rate_limit', lambda *args, **kwargs: None)
+    monkeypatch.setattr(app, '_backoff_delay', lambda attempt, response=None: 0)
+    return breaker
+
+
+def call_provider(monkeypatch, answers):
+    """One logical GET whose attempts get `answers` in turn (a status code or an exception)"""
+    answers = iter(answers)
+    def get(url, params=None, timeout=None):
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return FakeResponse(answer)
+    monkeypatch.setattr(app.upstream_session, 'get', get)
+    return app._upstream_get_uncoalesced(f'https://{app.COINGECKO_HOST}/api/v3/ping', {}, None, 2)
+
+
+def test_failed_call_records_one_outcome(provider, monkeypatch):
+    with pytest.raises(requests.ConnectionError):
+        call_provider(monkeypatch, [requests.ConnectionError()] * 3)
+    assert provider.state == 'closed'
+    assert provider.stats['calls'] == 1 and provider.stats['failures'] == 1
+    
+    assert call_provider(monkeypatch, [503, 503, 503]).status_code == 503
+    assert provider.state == 'closed'
+    assert provider.stats['failures'] == 2
+
+
+def test_retried_call_that_succeeds_is_ok(provider, monkeypatch):
+    assert call_provider(monkeypatch, [503, requests.Timeout(), 200]).status_code == 200
+    assert provider.state == 'closed'
+    assert provider.stats['calls'] == 1 and provider.stats['failures'] == 0
+
+
+def test_rate_limited_call_is_not_a_failure(provider, monkeypatch):
+    for _ in range(app.CIRCUIT_CONSECUTIVE_FAILURES):
+        assert call_provider(monkeypatch, [429, 429, 429]).status_code == 429
+    assert provider.state == 'closed'
+    assert provider.stats['rate_limited'] == app.CIRCUIT_CONSECUTIVE_FAILURES
+    assert provider.stats['failures'] == 0
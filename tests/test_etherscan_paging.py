@@ -0,0 +1,201 @@
+"""Result-window splitting, block-boundary dedupe and cursor paging over a fake Etherscan"""
+import pytest
+
+import app
+
+WALLET = '0x' + '1' * 40
+OTHER = '0x' + '2' * 40
+
+
+def make_records(blocks):
+    """Etherscan txlist rows; `blocks` maps block number -> rows in that block"""
+    records = []
+    for block, count in sorted(blocks.items()):
+        for index in range(count):
+            records.append({
+                'blockNumber': str(block),
+                'transactionIndex': str(index),
+                'hash': f'0x{block:08x}{index:04x}',
+                'timeStamp': str(1_600_000_000 + block * 12),
+                'from': OTHER if index % 2 else WALLET,
+                'to': WALLET if index % 2 else OTHER,
+                'value': str(10**18 + index),
+                'gasUsed': '21000',
+                'gasPrice': '1000000000',
+                'isError': '0',
+            })
+    return records
+
+
+def make_token_transfers(blocks):
+    """Etherscan tokentx rows without logIndex; `blocks` maps block number -> transfers made by
+    one transaction in that block (a swap or batch airdrop)"""
+    records = []
+    for block, count in sorted(blocks.items()):
+        for index in range(count):
+            records.append({
+                'blockNumber': str(block),
+                'transactionIndex': '0',
+                'hash': f'0x{block:08x}',
+                'timeStamp': str(1_600_000_000 + block * 12),
+                'from': OTHER,
+                'to': '0x' + f'{index + 3:x}' * 40 if index % 2 else WALLET,
+                'value': str(10**6 * (index + 1)),
+                'contractAddress': '0x' + 'a' * 40,
+                'tokenDecimal': '6',
+            })
+    return records
+
+
+def serve(records, params):
+    """What Etherscan answers for one page/offset request over `records`"""
+    rows = [r for r in records if int(params['startblock']) <= int(r['blockNumber']) <= int(params['endblock'])]
+    if params.get('sort') == 'desc':
+        rows = rows[::-1]
+    page, offset = int(params['page']), int(params['offset'])
+    if page * offset > app.ETHERSCAN_RESULT_WINDOW:
+        return {'status': '0', 'message': 'NOTOK', 'result': 'Result window is too large'}
+    rows = rows[(page - 1) * offset:page * offset]
+    if not rows:
+        return {'status': '0', 'message': 'No transactions found', 'result': []}
+    return {'status': '1', 'message': 'OK', 'result': rows}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+@pytest.fixture(autouse=True)
+def small_window(monkeypatch):
+    """Pages of 3 rows and a 6-row result window, so a few blocks are enough to saturate it"""
+    monkeypatch.setattr(app, 'ETHERSCAN_PAGE_SIZE', 3)
+    monkeypatch.setattr(app, 'ETHERSCAN_RESULT_WINDOW', 6)
+
+
+@pytest.fixture
+def etherscan(monkeypatch):
+    """upstream_get answering from `etherscan.records`"""
+    app.tx_page_cache.clear()
+
+    class Fake:
+        records = []
+        calls = []
+
+    def upstream_get(url, params=None, timeout=None, retries=None):
+        Fake.calls.append(dict(params))
+        return FakeResponse(serve(Fake.records, params))
+
+    monkeypatch.setattr(app, 'upstream_get', upstream_get)
+    yield Fake
+    app.tx_page_cache.clear()
+
+
+def walk(records, startblock=0, endblock=99999999):
+    pager = app.EtherscanPager({'action': 'txlist'}, startblock, endblock)
+    seen = []
+    while not pager.done:
+        seen.extend(pager.feed(serve(records, pager.next_params())))
+    return seen
+
+
+def test_pager_splits_saturated_window():
+    records = make_records({block: 2 for block in range(1, 12)})
+    seen = walk(records)
+    assert [r['hash'] for r in seen] == [r['hash'] for r in records]
+
+
+def test_pager_dedupes_block_on_window_boundary():
+    # Block 3 straddles the first window (rows 1-6) and is re-read by the next one
+    records = make_records({1: 2, 2: 2, 3: 4, 4: 1, 5: 5})
+    seen = walk(records)
+    assert [r['hash'] for r in seen] == [r['hash'] for r in records]
+
+
+def test_pager_keeps_transfers_sharing_hash_on_window_boundary():
+    # Block 2's five transfers are one transaction; the window fills after two of them
+    records = make_token_transfers({1: 4, 2: 5, 3: 2})
+    seen = walk(records)
+    assert [(r['hash'], r['to'], r['value']) for r in seen] == [(r['hash'], r['to'], r['value']) for r in records]
+
+
+def test_pager_window_ends_exactly_on_block():
+    records = make_records({1: 3, 2: 3, 3: 3})
+    assert [r['hash'] for r in walk(records)] == [r['hash'] for r in records]
+
+
+def test_pager_block_over_window_raises():
+    records = make_records({1: 1, 2: 7, 3: 1})
+    with pytest.raises(app.UpstreamError, match='records in block 2'):
+        walk(records)
+
+
+def test_pager_raises_on_etherscan_error():
+    pager = app.EtherscanPager({'action': 'txlist'})
+    with pytest.raises(app.UpstreamError):
+        pager.feed({'status': '0', 'message': 'NOTOK', 'result': 'Max rate limit reached'})
+
+
+def test_iter_etherscan_records_yields_every_row_once(etherscan):
+    etherscan.records = make_records({1: 2, 2: 4, 3: 1, 4: 3, 5: 2, 6: 2})
+    chunks = list(app.iter_etherscan_records({'action': 'txlist'}))
+    assert all(0 < len(chunk) <= 3 for chunk in chunks)
+    assert [r['hash'] for chunk in chunks for r in chunk] == [r['hash'] for r in etherscan.records]
+
+
+def test_cursor_round_trip():
+    position = (19_000_000, 4, -1, 2, 'abcdef0123456789')
+    assert app.decode_cursor(app.encode_cursor(position)) == position
+    with pytest.raises(ValueError):
+        app.decode_cursor('not-a-cursor')
+
+
+def test_transactions_desc_across_window_boundary(etherscan):
+    etherscan.records = make_records({1: 2, 2: 2, 3: 4, 4: 1, 5: 3})
+    txs = [tx for _, tx in app.iter_transactions_desc('txlist', WALLET, None, 3)]
+    assert [tx['hash'] for tx in txs] == [r['hash'] for r in reversed(etherscan.records)]
+
+
+def test_transactions_desc_block_over_window_raises(etherscan):
+    etherscan.records = make_records({1: 1, 2: 7, 3: 1})
+    with pytest.raises(app.UpstreamError, match='records in block 2'):
+        list(app.iter_transactions_desc('txlist', WALLET, None, 3))
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 4])
+def test_merge_cursor_pages_cover_history_once(etherscan, monkeypatch, limit):
+    # limit + 1 rows per upstream page; the window holds the largest block but saturates
+    monkeypatch.setattr(app, 'ETHERSCAN_RESULT_WINDOW', 3 * (limit + 1))
+    etherscan.records = make_records({1: 1, 2: 3, 3: 2, 4: 4, 5: 1, 6: 2, 7: 3})
+    pages, before = [], None
+    while True:
+        txs, cursor, partial = app.merge_transactions(WALLET, ['txlist'], before, limit)
+        assert not partial
+        assert len(txs) <= limit
+        pages.append(txs)
+        if cursor is None:
+            break
+        before = app.decode_cursor(cursor)
+    hashes = [tx['hash'] for txs in pages for tx in txs]
+    assert hashes == [r['hash'] for r in reversed(etherscan.records)]
+    assert all(len(txs) == limit for txs in pages[:-1])
+
+
+def test_merge_filtered_cursor_resumes_scan(etherscan, monkeypatch):
+    monkeypatch.setattr(app, 'TX_LIVE_SCAN_ROWS', 4)
+    monkeypatch.setattr(app, 'TX_LIVE_SCAN_PAGE_SIZE', 3)
+    monkeypatch.setattr(app, 'ETHERSCAN_RESULT_WINDOW', 9)
+    etherscan.records = make_records({1: 3, 2: 3, 3: 3, 4: 3})
+    received, before = [], None
+    while True:
+        txs, cursor, partial = app.merge_transactions(WALLET, ['txlist'], before, 10, {'direction': 'receive'})
+        received.extend(txs)
+        if cursor is None:
+            break
+        assert partial
+        before = app.decode_cursor(cursor)
+    expected = [r['hash'] for r in reversed(etherscan.records) if r['to'] == WALLET]
+    assert [tx['hash'] for tx in received] == expected
@@ -0,0 +1,76 @@
+"""Price cache LRU and TTLs, and negative caching of what CoinGecko answered for only"""
+from collections import OrderedDict
+
+import pytest
+
+import app
+
+A, B, C, D = ('0x' + digit * 40 for digit in '1234')
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(app, 'price_cache', OrderedDict())
+    monkeypatch.setattr(app, 'price_cache_stats', dict.fromkeys(app.price_cache_stats, 0))
+
+
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(app, 'PRICE_CACHE_MAX_ENTRIES', 3)
+    for contract, price in ((A, 1.0), (B, 2.0), (C, 3.0)):
+        app.price_cache_set(contract, price)
+    assert app.price_cache_get(A) == 1.0  # A is now the most recently used
+    app.price_cache_set(D, 4.0)
+    
+    assert app.price_cache_get(B) is None
+    assert [app.price_cache_get(contract) for contract in (A, C, D)] == [1.0, 3.0, 4.0]
+    assert app.get_price_cache_stats()['evictions'] == 1
+
+
+def test_price_and_negative_entry_ttls(clock):
+    app.price_cache_set(A, 1.5)
+    app.price_cache_set(B, 0)
+    clock.advance(app.TOKEN_PRICE_CACHE_DURATION - 1)
+    assert app.price_cache_get(A) == 1.5
+    clock.advance(1)
+    assert app.price_cache_get(A) is None
+    
+    clock.advance(app.NO_PRICE_CACHE_DURATION - app.TOKEN_PRICE_CACHE_DURATION - 1)
+    assert app.price_cache_get(B) == 0
+    clock.advance(1)
+    assert app.price_cache_get(B) is None
+    stats = app.get_price_cache_stats()
+    assert (stats['hits'], stats['negative_hits'], stats['expired']) == (1, 1, 2)
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+    
+    def json(self):
+        return self.data
+
+
+def test_only_answered_batches_are_negatively_cached(monkeypatch):
+    monkeypatch.setattr(app, 'coingecko_batch_size', 2)
+    def fetch_batch(contracts, chain=app.DEFAULT_CHAIN):
+        if contracts == [A, B]:
+            return app.parse_coingecko_token_prices(FakeResponse(200, {A: {'usd': 1.25}}))
+        return app.parse_coingecko_token_prices(FakeResponse(429, {'status': {'error_code': 429}}))
+    monkeypatch.setattr(app, 'fetch_coingecko_token_prices', fetch_batch)
+    monkeypatch.setitem(app.TOKEN_PRICE_FETCHERS, '1inch', lambda contracts, chain=app.DEFAULT_CHAIN: ({}, set()))
+    
+    assert app.fetch_token_prices([A, B, C, D]) == {A: 1.25, B: 0, C: 0, D: 0}
+    assert app.price_cache_get(A) == 1.25
+    assert app.price_cache_get(B) == 0  # CoinGecko answered: no price
+    assert app.price_cache_get(C) is None and app.price_cache_get(D) is None  # The batch failed
+
+
+@pytest.mark.parametrize('status_code, data', [
+    (429, {'status': {'error_code': 429, 'error_message': "You've exceeded the Rate Limit"}}),
+    (500, None),
+    (200, ['not', 'a', 'price', 'map']),
+])
+def test_coingecko_errors_raise(status_code, data):
+    with pytest.raises(app.UpstreamError):
+        app.parse_coingecko_token_prices(FakeResponse(status_code, data))
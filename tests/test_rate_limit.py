@@ -0,0 +1,105 @@
+"""Token-bucket rate limiter: refill and burst, the background reserve and 429 penalties,
+in the local buckets and in the SQLite-shared ones (RATE_LIMIT_SHARED=1)"""
+import itertools
+
+import pytest
+
+import app
+
+HOST = app.ETHERSCAN_HOST
+RATE, BURST = app.UPSTREAM_RATE_LIMITS[HOST]
+api_keys = itertools.count(1)
+
+
+@pytest.fixture(params=['local', 'shared'])
+def api_key(request, clock, monkeypatch):
+    """A bucket no other test has touched, kept locally or in the test database"""
+    monkeypatch.setattr(app, 'RATE_LIMIT_SHARED', request.param == 'shared')
+    return f'key-{next(api_keys)}'
+
+
+def take(api_key):
+    return app.take_rate_limit_token(HOST, api_key)
+
+
+def drain(api_key):
+    while take(api_key) == 0:
+        pass
+
+
+def test_burst_then_wait(api_key):
+    assert [take(api_key) for _ in range(int(BURST))] == [0] * int(BURST)
+    assert take(api_key) == pytest.approx(1 / RATE)
+
+
+def test_refill(api_key, clock):
+    drain(api_key)
+    clock.advance(0.5 / RATE)
+    assert take(api_key) == pytest.approx(0.5 / RATE)
+    clock.advance(0.5 / RATE + 1e-6)  # A hair over: float time at epoch scale
+    assert take(api_key) == 0
+    assert take(api_key) > 0
+
+
+def test_refill_stops_at_burst(api_key, clock):
+    drain(api_key)
+    clock.advance(100 / RATE)
+    assert sum(take(api_key) == 0 for _ in range(int(BURST) + 1)) == BURST
+
+
+def test_background_keeps_reserve_for_live(api_key):
+    reserve = BURST * app.BACKGROUND_RATE_RESERVE
+    token = app.upstream_priority.set('background')
+    try:
+        taken = 0
+        while take(api_key) == 0:
+            taken += 1
+        assert taken == int(BURST - reserve)
+    finally:
+        app.upstream_priority.reset(token)
+    # Live requests still find the reserve
+    assert sum(take(api_key) == 0 for _ in range(int(BURST))) == BURST - taken
+
+
+def test_penalty_blocks_bucket(api_key, clock):
+    app.penalize_rate_limit(HOST, api_key, 7)
+    assert take(api_key) == pytest.approx(7)
+    clock.advance(6)
+    assert take(api_key) == pytest.approx(1)
+    clock.advance(1)
+    assert take(api_key) == 0
+
+
+def test_penalty_drains_bucket(api_key, clock):
+    app.penalize_rate_limit(HOST, api_key, 0)
+    assert take(api_key) == pytest.approx(1 / RATE)
+
+
+def test_wait_for_rate_limit_sleeps_until_token(api_key, clock):
+    drain(api_key)
+    start = clock.now
+    waited = app.wait_for_rate_limit(HOST, api_key)
+    assert waited == pytest.approx(1 / RATE)
+    assert clock.now - start == pytest.approx(1 / RATE)
+
+
+def test_unlimited_host():
+    assert app.take_rate_limit_token('example.com') == 0
+
+
+def test_shared_buckets_span_processes(clock, monkeypatch):
+    monkeypatch.setattr(app, 'RATE_LIMIT_SHARED', True)
+    api_key = f'key-{next(api_keys)}'
+    drain(api_key)
+    # Another worker process: no local buckets, the same database
+    monkeypatch.setattr(app, 'rate_limit_buckets', {})
+    assert take(api_key) == pytest.approx(1 / RATE)
+    name = app.rate_limit_bucket(HOST, api_key)
+    tokens, updated, blocked_until = app.get_db().execute(
+        'SELECT tokens, updated, blocked_until FROM rate_limits WHERE bucket = ?', (name,)).fetchone()
+    assert tokens < 1 and updated == clock.now and blocked_until == 0
+    assert api_key not in name  # The key itself is never stored
+    
+    app.penalize_rate_limit(HOST, api_key, 3)
+    assert app.get_db().execute('SELECT blocked_until FROM rate_limits WHERE bucket = ?', (name,)).fetchone()[0] == clock.now + 3
+    assert app.rate_limit_buckets == {}
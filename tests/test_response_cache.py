@@ -0,0 +1,94 @@
+"""cached_response: ETag / If-None-Match 304s, TTL expiry, and what is never cached"""
+from collections import OrderedDict
+
+import pytest
+from flask import jsonify
+
+import app
+
+CONTRACT = '0x' + 'c' * 40
+URL = f'/api/token-price/{CONTRACT}'
+
+
+@pytest.fixture
+def prices(clock, monkeypatch):
+    """An empty response cache and a token price the test can change; `prices.calls` counts lookups"""
+    monkeypatch.setattr(app, 'response_cache', OrderedDict())
+    
+    class Prices:
+        price = 1.5
+        calls = 0
+    
+    def lookup(contract, chain=app.DEFAULT_CHAIN):
+        Prices.calls += 1
+        return Prices.price
+    monkeypatch.setattr(app, 'get_token_price_by_contract', lookup)
+    return Prices
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_etag_and_304(prices, client):
+    first = client.get(URL)
+    assert first.status_code == 200
+    assert first.json['price_usd'] == 1.5
+    etag = first.headers['ETag']
+    assert f'max-age={app.TOKEN_PRICE_RESPONSE_TTL}' in first.headers['Cache-Control']
+    
+    again = client.get(URL, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert client.get(URL, headers={'If-None-Match': '"other"'}).status_code == 200
+    assert prices.calls == 1
+
+
+def test_ttl_expiry_recomputes(prices, client, clock):
+    first = client.get(URL)
+    clock.advance(app.TOKEN_PRICE_RESPONSE_TTL - 1)
+    assert client.get(URL).headers['Cache-Control'].startswith('public, max-age=1,')
+    assert prices.calls == 1
+    
+    # Expired but unchanged: recomputed once, same ETag and Last-Modified, still a 304
+    clock.advance(1)
+    unchanged = client.get(URL, headers={'If-None-Match': first.headers['ETag']})
+    assert unchanged.status_code == 304
+    assert client.get(URL).headers['Last-Modified'] == first.headers['Last-Modified']
+    assert prices.calls == 2
+    
+    # Expired and changed: a new body under a new ETag
+    prices.price = 2.0
+    clock.advance(app.TOKEN_PRICE_RESPONSE_TTL)
+    changed = client.get(URL, headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200
+    assert changed.json['price_usd'] == 2.0
+    assert changed.headers['ETag'] != first.headers['ETag']
+
+
+def test_query_string_is_part_of_key(prices, client):
+    client.get(URL)
+    client.get(URL + '?currency=usd')
+    assert prices.calls == 2
+
+
+@pytest.mark.parametrize('result', [
+    lambda: jsonify({'value': 1, 'partial': True}),
+    lambda: (jsonify({'error': 'upstream down'}), 502),
+])
+def test_errors_and_partial_results_are_not_cached(monkeypatch, result):
+    monkeypatch.setattr(app, 'response_cache', OrderedDict())
+    calls = []
+    @app.cached_response(60)
+    def view():
+        calls.append(1)
+        return result()
+    
+    for _ in range(2):
+        with app.app.test_request_context('/uncacheable'):
+            response = view()
+            assert response.headers['Cache-Control'] == 'no-store'
+            assert 'ETag' not in response.headers
+    assert len(calls) == 2
+    assert not app.response_cache
@@ -0,0 +1,55 @@
+"""single_flight: concurrent identical calls share one run, its result and its error"""
+import threading
+
+import app
+
+
+def run_concurrently(key, fn, callers):
+    """Call single_flight from `callers` threads while fn holds the first call open"""
+    results, errors = [], []
+    def call():
+        try:
+            results.append(app.single_flight(key, fn))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+def test_single_flight_coalesces_callers():
+    release = threading.Event()
+    calls = []
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+    
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    results, errors = run_concurrently('coalesce', fn, 5)
+    assert not errors and len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {'answer'}
+    # Once done the key is free: the next call runs fn again
+    assert app.single_flight('coalesce', fn) == ('answer', False)
+    assert len(calls) == 2
+
+
+def test_single_flight_propagates_errors_to_followers():
+    release = threading.Event()
+    calls = []
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        raise app.UpstreamError('boom')
+    
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    results, errors = run_concurrently('errors', fn, 4)
+    assert not results and len(calls) == 1
+    assert len(errors) == 4 and all(isinstance(e, app.UpstreamError) for e in errors)
+    assert 'errors' not in app.inflight_calls
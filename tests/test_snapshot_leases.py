@@ -0,0 +1,89 @@
+"""Snapshot leases: one process at a time refreshes a wallet, another takes over once it lapses"""
+import itertools
+
+import pytest
+
+import app
+
+OTHER_PID = 999_999_999
+wallet_numbers = itertools.count(1)
+
+
+@pytest.fixture
+def wallet():
+    return '0x' + f'{next(wallet_numbers):040x}'
+
+
+@pytest.fixture
+def other_process(monkeypatch):
+    """Run the rest of the test as if in another gunicorn worker"""
+    def switch():
+        monkeypatch.setattr(app.os, 'getpid', lambda: OTHER_PID)
+    return switch
+
+
+def lease(address):
+    return app.get_db().execute('SELECT owner, expires_at FROM snapshot_leases WHERE address = ?', (address,)).fetchone()
+
+
+def test_acquire_and_renew(wallet, clock):
+    assert app.claim_snapshot_lease(wallet)
+    assert lease(wallet) == (str(app.os.getpid()), clock.now + app.SNAPSHOT_LEASE_SECONDS)
+    clock.advance(10)
+    assert app.claim_snapshot_lease(wallet)
+    assert lease(wallet)[1] == clock.now + app.SNAPSHOT_LEASE_SECONDS
+
+
+def test_held_lease_refused_elsewhere(wallet, clock, other_process):
+    assert app.claim_snapshot_lease(wallet)
+    held = lease(wallet)
+    other_process()
+    clock.advance(app.SNAPSHOT_LEASE_SECONDS - 1)
+    assert not app.claim_snapshot_lease(wallet)
+    assert lease(wallet) == held
+
+
+def test_takeover_after_expiry(wallet, clock, monkeypatch, other_process):
+    getpid = app.os.getpid
+    assert app.claim_snapshot_lease(wallet)
+    clock.advance(app.SNAPSHOT_LEASE_SECONDS)
+    other_process()
+    assert app.claim_snapshot_lease(wallet)
+    assert lease(wallet) == (str(OTHER_PID), clock.now + app.SNAPSHOT_LEASE_SECONDS)
+    
+    # The first process lost it until the new holder lets it lapse
+    monkeypatch.setattr(app.os, 'getpid', getpid)
+    assert not app.claim_snapshot_lease(wallet)
+
+
+def test_pass_skips_wallets_leased_elsewhere(wallet, clock, monkeypatch, other_process):
+    mine = '0x' + f'{next(wallet_numbers):040x}'
+    getpid = app.os.getpid
+    other_process()
+    assert app.claim_snapshot_lease(wallet) and app.claim_snapshot_lease(mine)
+    clock.advance(app.SNAPSHOT_LEASE_SECONDS)
+    assert app.claim_snapshot_lease(wallet)  # Renewed; the lease on `mine` lapsed
+    monkeypatch.setattr(app.os, 'getpid', getpid)
+    
+    claimed = []
+    monkeypatch.setattr(app, 'select_hot_wallets', lambda: [wallet, mine])
+    monkeypatch.setattr(app, 'get_head_block', lambda: None)
+    monkeypatch.setattr(app, 'load_snapshot', lambda address, kind: claimed.append(address) or None)
+    monkeypatch.setattr(app, 'snapshot_due', lambda *args: False)
+    monkeypatch.setitem(app.snapshot_stats, 'leased_elsewhere', 0)
+    app.refresh_snapshots()
+    
+    assert app.snapshot_stats['leased_elsewhere'] == 1
+    assert set(claimed) == {mine}
+    assert lease(mine)[0] == str(getpid())
+    assert lease(wallet)[0] == str(OTHER_PID)
+
+
+def test_pass_with_nothing_owned_makes_no_upstream_calls(wallet, monkeypatch, other_process):
+    other_process()
+    assert app.claim_snapshot_lease(wallet)
+    monkeypatch.setattr(app.os, 'getpid', lambda: OTHER_PID + 1)
+    monkeypatch.setattr(app, 'select_hot_wallets', lambda: [wallet])
+    monkeypatch.setattr(app, 'get_head_block', lambda: pytest.fail('fetched the head block'))
+    app.refresh_snapshots()
+    assert app.snapshot_stats['leased_elsewhere'] == 1
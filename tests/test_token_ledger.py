@@ -0,0 +1,110 @@
+"""Two ingests of one wallet racing to persist its token ledger (compare-and-swap on last_block)"""
+import itertools
+
+import pytest
+
+import app
+
+TOKEN = '0x' + 'a' * 40
+OTHER = '0x' + 'b' * 40
+wallet_numbers = itertools.count(1)
+
+
+@pytest.fixture
+def wallet():
+    """A wallet no other test has a ledger for"""
+    return '0x' + f'{next(wallet_numbers):040x}'
+
+
+def transfers(wallet, blocks):
+    """One incoming tokentx row per block, worth the block number in raw units"""
+    return [{
+        'blockNumber': str(block),
+        'hash': f'0x{block:064x}',
+        'from': OTHER,
+        'to': wallet,
+        'value': str(block),
+        'contractAddress': TOKEN,
+        'tokenName': 'Token',
+        'tokenSymbol': 'TKN',
+        'tokenDecimal': '0',
+    } for block in blocks]
+
+
+def ingest(wallet, newest_block):
+    """An ingest state that has read the transfers after its ledger up to newest_block"""
+    state = app.begin_token_ingest(wallet)
+    app.ingest_token_chunk(state, transfers(wallet, range(state['last_block'] + 1, newest_block + 1)))
+    return state
+
+
+def raw_balance(holdings):
+    [holding] = holdings
+    return int(holding['balance_raw'])
+
+
+def ledger(wallet):
+    balances, last_block = app.load_token_ledger(wallet)
+    return balances[TOKEN].balance, last_block
+
+
+def total(last_block):
+    return sum(range(1, last_block + 1))
+
+
+def test_uncontended_save(wallet):
+    state = ingest(wallet, 100)
+    assert raw_balance(app.finish_token_ingest(state)) == total(100)
+    assert ledger(wallet) == (total(88), 100 - app.LEDGER_CONFIRMATIONS)
+
+
+def test_lost_race_behind_us_overwrites_their_ledger(wallet):
+    ours = ingest(wallet, 100)
+    theirs = ingest(wallet, 50)
+    app.finish_token_ingest(theirs)
+    assert ledger(wallet) == (total(38), 38)
+    
+    assert raw_balance(app.finish_token_ingest(ours)) == total(100)
+    assert ledger(wallet) == (total(88), 88)
+
+
+def test_lost_race_ahead_of_us_keeps_their_ledger(wallet):
+    ours = ingest(wallet, 55)  # Folded to 43, blocks 44-55 in the tail
+    theirs = ingest(wallet, 60)
+    app.finish_token_ingest(theirs)
+    
+    # Their ledger reaches 48: only our tail past it is added on top
+    assert raw_balance(app.finish_token_ingest(ours)) == total(55)
+    assert ledger(wallet) == (total(48), 48)
+
+
+def test_lost_race_from_persisted_ledger(wallet):
+    app.finish_token_ingest(ingest(wallet, 30))
+    first, second = ingest(wallet, 80), ingest(wallet, 70)
+    assert first['last_block'] == second['last_block'] == 18
+    
+    app.finish_token_ingest(second)
+    assert raw_balance(app.finish_token_ingest(first)) == total(80)
+    assert ledger(wallet) == (total(68), 68)
+    # The next ingest resumes from there without counting a transfer twice
+    assert raw_balance(app.finish_token_ingest(ingest(wallet, 90))) == total(90)
+
+
+def test_ledger_moves_again_while_retrying(wallet, monkeypatch):
+    ours = ingest(wallet, 100)
+    app.finish_token_ingest(ingest(wallet, 40))
+    
+    # A third worker saves between our failed swap and the retry
+    save = app.save_token_ledger
+    calls = []
+    def racing_save(*args):
+        calls.append(args[3])
+        if len(calls) == 2:
+            monkeypatch.setattr(app, 'save_token_ledger', save)
+            app.finish_token_ingest(ingest(wallet, 60))
+        return save(*args)
+    monkeypatch.setattr(app, 'save_token_ledger', racing_save)
+    
+    assert raw_balance(app.finish_token_ingest(ours)) == total(100)
+    assert calls == [-1, 28]
+    assert ledger(wallet) == (total(88), 88)